@@ -0,0 +1,202 @@
+import argparse
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+from typing import Dict, Any, List
+
+from traffic_simulator import TrafficSimulator, Intersection, build_grid
+from observer_agent import ObserverAgent
+from controller_agent import ControllerAgent
+from coordinator_agent import CoordinatorAgent
+from sessions import make_agents, control_step
+
+DEFAULT_SIZES = [1, 10, 100, 1000, 10000]
+DEFAULT_QUEUE_DEPTHS = [0, 100, 1000]
+DEFAULT_ARRIVAL_RATES = [0.005, 0.1, 0.5]
+
+
+def build_simulator(engine: str, intersections: int, queue_depth: int, arrival_rate: float, seed: int,
+                    network: bool = False):
+    """
+    Creates a seeded simulator with `queue_depth` vehicles pre-queued on every lane. With `network`,
+    the intersections form a linked square grid (python and event engines only).
+    """
+    if engine == "vectorized":
+        from vectorized_simulator import VectorizedTrafficSimulator
+        sim = VectorizedTrafficSimulator(seed=seed, capacity=intersections)
+    else:
+        sim = TrafficSimulator(event_driven=(engine == "event"), seed=seed)
+    sim.arrival_rate = arrival_rate
+    if network:
+        side = math.isqrt(intersections)
+        build_grid(sim, side, side, travel_time=10, green_duration=30, clearance_rate=0.5, manual_control=True)
+        for intersection in sim.intersections:
+            for approach in intersection.approaches:
+                for _ in range(queue_depth):
+                    intersection.add_vehicle(approach, 0)
+        return sim
+    for i in range(intersections):
+        intersection = Intersection(f"I{i + 1}", green_duration=30, clearance_rate=0.5, manual_control=True)
+        for approach in intersection.approaches:
+            for _ in range(queue_depth):
+                intersection.add_vehicle(approach, 0)
+        sim.add_intersection(intersection)
+    return sim
+
+
+def time_steps(step, min_time: float, min_steps: int = 3) -> List[float]:
+    """Calls step() until both min_time seconds and min_steps calls have elapsed; returns per-call seconds."""
+    samples = []
+    perf_counter = time.perf_counter
+    deadline = perf_counter() + min_time
+    while len(samples) < min_steps or perf_counter() < deadline:
+        start = perf_counter()
+        step()
+        samples.append(perf_counter() - start)
+    return samples
+
+
+def run_case(benchmark: str, engine: str, intersections: int, queue_depth: int, arrival_rate: float,
+             seed: int, min_time: float, network: bool = False) -> Dict[str, Any]:
+    sim = build_simulator(engine, intersections, queue_depth, arrival_rate, seed, network)
+
+    if benchmark == "sim_step":
+        step = sim.step
+    elif benchmark == "agent_loop_batch":
+        # Array observer and batched controller kernel
+        observer = ObserverAgent(sim)
+        controller = ControllerAgent(sim)
+        coordinator = CoordinatorAgent(controller)
+
+        def step():
+            sim.step()
+            observations = observer.observe_arrays(sim.current_time)
+            if sim.current_time % 5 == 0:
+                coordinator.coordinate(observations)
+            controller.decide_batch(observations.queues, observations.phase, observations.critical)
+    elif benchmark == "agent_loop":
+        # Full agent loop as run by the server's sessions in AI mode (event-driven agents)
+        _, observer, _, _ = make_agents(sim)
+
+        def step():
+            control_step(sim, "AI", observer, 30)
+    else:
+        # Per-intersection dict observations and decisions
+        observer = ObserverAgent(sim)
+        controller = ControllerAgent(sim)
+        coordinator = CoordinatorAgent(controller)
+
+        def step():
+            sim.step()
+            observations = observer.observe(sim.current_time)
+            if sim.current_time % 5 == 0:
+                coordinator.coordinate(observations)
+            controller.decide_many(observations)
+
+    samples = time_steps(step, min_time)
+    total = sum(samples)
+    return {
+        "key": f"{benchmark}/{engine}/n={intersections}/depth={queue_depth}/rate={arrival_rate}" + ("/grid" if network else ""),
+        "benchmark": benchmark,
+        "engine": engine,
+        "intersections": intersections,
+        "queue_depth": queue_depth,
+        "arrival_rate": arrival_rate,
+        "seed": seed,
+        "network": network,
+        "steps": len(samples),
+        "steps_per_sec": len(samples) / total if total else float("inf"),
+        "step_us": {
+            "mean": statistics.fmean(samples) * 1e6,
+            "p50": statistics.median(samples) * 1e6,
+            "p95": sorted(samples)[int(0.95 * (len(samples) - 1))] * 1e6,
+            "min": min(samples) * 1e6
+        }
+    }
+
+
+def build_cases(args) -> List[Dict[str, Any]]:
+    """Scaling in intersection count at default load, plus queue-depth and arrival-rate sweeps at a fixed size."""
+    cases = []
+    for benchmark in args.benchmarks:
+        for engine in args.engines:
+            for n in args.sizes:
+                cases.append(dict(benchmark=benchmark, engine=engine, intersections=n, queue_depth=0, arrival_rate=0.1))
+            for depth in args.queue_depths:
+                if depth:
+                    cases.append(dict(benchmark=benchmark, engine=engine, intersections=args.sweep_size,
+                                      queue_depth=depth, arrival_rate=0.1))
+            for rate in args.arrival_rates:
+                if rate != 0.1:
+                    cases.append(dict(benchmark=benchmark, engine=engine, intersections=args.sweep_size,
+                                      queue_depth=0, arrival_rate=rate))
+    return cases
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any], max_slowdown: float) -> List[str]:
+    """Returns a message for every case whose mean step time regressed by more than max_slowdown x."""
+    baseline_by_key = {r["key"]: r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        base = baseline_by_key.get(result["key"])
+        if base is None:
+            continue
+        ratio = result["step_us"]["mean"] / base["step_us"]["mean"]
+        if ratio > max_slowdown:
+            regressions.append(f"{result['key']}: {ratio:.2f}x slower "
+                               f"({base['step_us']['mean']:.1f}us -> {result['step_us']['mean']:.1f}us)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulator and agent-loop throughput benchmarks")
+    parser.add_argument("--benchmarks", nargs="+", default=["sim_step", "agent_loop"], choices=["sim_step", "agent_loop", "agent_loop_batch", "agent_loop_dict"])
+    parser.add_argument("--engines", nargs="+", default=["python"], choices=["python", "event", "vectorized"])
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--queue-depths", nargs="+", type=int, default=DEFAULT_QUEUE_DEPTHS)
+    parser.add_argument("--arrival-rates", nargs="+", type=float, default=DEFAULT_ARRIVAL_RATES)
+    parser.add_argument("--sweep-size", type=int, default=100, help="intersection count for the depth/rate sweeps")
+    parser.add_argument("--network", action="store_true",
+                        help="link the intersections into a square grid (sizes are rounded down to a square)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds to time each case for")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--compare", help="baseline JSON results to compare against")
+    parser.add_argument("--max-slowdown", type=float, default=1.25,
+                        help="fail if any case is this many times slower than the baseline")
+    args = parser.parse_args()
+    if args.network and "vectorized" in args.engines:
+        parser.error("--network is not supported by the vectorized engine")
+
+    results = []
+    for case in build_cases(args):
+        result = run_case(seed=args.seed, min_time=args.min_time, network=args.network, **case)
+        results.append(result)
+        print(f"{result['key']:<60} {result['steps_per_sec']:>12.1f} steps/s "
+              f"{result['step_us']['mean']:>12.1f} us/step (p95 {result['step_us']['p95']:.1f})")
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_slowdown)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
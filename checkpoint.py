@@ -0,0 +1,207 @@
+import itertools
+import math
+import operator
+import pickle
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Callable, Optional, Tuple, Union
+
+from traffic_simulator import TrafficSimulator, Intersection, RandomStream
+from observer_agent import ObserverAgent
+from controller_agent import ControllerAgent
+from coordinator_agent import CoordinatorAgent
+
+MAGIC = b"GFCK"
+VERSION = 4
+
+
+def _pack_lanes(lanes) -> Dict[str, Any]:
+    """
+    All lanes column-wise. The queues are concatenated into one array of int64 deltas between
+    consecutive arrival times: queues are in arrival order, so the deltas are small and compress well.
+    """
+    times = list(itertools.chain.from_iterable(lane.queue for lane in lanes))
+    return {
+        "ids": [lane.lane_id for lane in lanes],
+        "lengths": array('q', (lane.queued for lane in lanes)).tobytes(),
+        "times": array('q', map(operator.sub, times, itertools.chain((0,), times))).tobytes(),
+        "total_waiting_time": [lane.total_waiting_time for lane in lanes],
+        "vehicles_cleared": [lane.vehicles_cleared for lane in lanes]
+    }
+
+
+def _unpack_lanes(packed: Dict[str, Any], lanes):
+    lengths, deltas = array('q'), array('q')
+    lengths.frombytes(packed["lengths"])
+    deltas.frombytes(packed["times"])
+    times = list(itertools.accumulate(deltas))
+    start = 0
+    for lane, lane_id, length, total_waiting_time, vehicles_cleared in zip(
+            lanes, packed["ids"], lengths, packed["total_waiting_time"], packed["vehicles_cleared"]):
+        lane.lane_id = lane_id
+        lane.queue = times[start:start + length]  # also restores queued and arrival_time_sum
+        lane.total_waiting_time = total_waiting_time
+        lane.vehicles_cleared = vehicles_cleared
+        start += length
+
+
+def _pack_rng(stream: RandomStream) -> tuple:
+    """Mersenne Twister state as (version, uint32 words, gauss_next)."""
+    version, words, gauss_next = stream.getstate()
+    return version, array('I', words).tobytes(), gauss_next
+
+
+def _unpack_rng(stream: RandomStream, packed: tuple):
+    version, words, gauss_next = packed
+    stream.setstate((version, tuple(array('I', words)), gauss_next))
+
+
+def checkpoint(sim: TrafficSimulator, controller: Optional[ControllerAgent] = None, level: int = 1) -> bytes:
+    """
+    Serializes the full state of a simulator (time, every Intersection and Lane, links in transit,
+    the event queue of the event-driven mode, the random generators and the demand model) plus the
+    controller's context into a compact zlib-compressed binary blob. An attached logger is not included.
+    """
+    state = {
+        "current_time": sim.current_time,
+        "arrival_rate": sim.arrival_rate,
+        "seed": sim.seed,
+        "event_driven": sim.event_driven,
+        "intersections": [
+            (
+                i.intersection_id, i.current_phase_index, i.phase_timer, i.green_duration, i.clearance_rate,
+                i.manual_control, _pack_rng(i.rng)
+            )
+            for i in sim.intersections
+        ],
+        "arrivals": (sim._sampled_rate, sim._arrival_due if sim._sampled_rate is not None else None),
+        "lanes": _pack_lanes([lane for i in sim.intersections for lane in i.approaches.values()]),
+        "links": [
+            (link.from_id, link.to_id, link.approach, link.travel_time, link.from_handle is None or link.to_handle is None,
+             array('q', link.buckets).tobytes(), link.in_transit, link.vehicles_delivered)
+            for link in sim.links
+        ],
+        "demand": sim.demand,
+        "events": None,
+        "context": controller.context if controller is not None else None
+    }
+    if sim.event_driven:
+        state["events"] = (list(sim._events), sim._event_seq, sim._phase_version, sim._phase_started,
+                           sim._pending_departures, sim._scheduled_rate, sim._arrival_version)
+    return MAGIC + bytes([VERSION]) + zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL), level)
+
+
+def restore(data: bytes) -> Tuple[TrafficSimulator, Optional[Dict[str, Any]]]:
+    """Rebuilds a simulator from checkpoint() output. Returns (simulator, controller context or None)."""
+    if data[:4] != MAGIC or data[4] != VERSION:
+        raise ValueError("Not a GreenFlow checkpoint (or an unsupported version)")
+    state = pickle.loads(zlib.decompress(data[5:]))
+
+    # Build as a plain fixed-tick simulator, then install the saved mode and event queue
+    sim = TrafficSimulator(seed=state["seed"])
+    sim.arrival_rate = state["arrival_rate"]
+    for (intersection_id, phase_index, phase_timer, green_duration, clearance_rate, manual_control,
+         rng_state) in state["intersections"]:
+        intersection = Intersection(intersection_id, green_duration=green_duration,
+                                    clearance_rate=clearance_rate, manual_control=manual_control)
+        intersection.current_phase_index = phase_index
+        intersection.phase_timer = phase_timer
+        sim.add_intersection(intersection)
+        _unpack_rng(intersection.rng, rng_state)  # after add_intersection, which may draw the first arrivals
+    _unpack_lanes(state["lanes"], [lane for i in sim.intersections for lane in i.approaches.values()])
+
+    for from_id, to_id, approach, travel_time, boundary, buckets, in_transit, delivered in state["links"]:
+        add = sim.add_boundary_link if boundary else sim.add_link
+        link = add(from_id, to_id, approach, travel_time)
+        link.buckets = list(array('q', buckets))
+        link.in_transit = in_transit
+        link.vehicles_delivered = delivered
+
+    sim.current_time = state["current_time"]
+    sim.demand = state.get("demand")
+    sim._sampled_rate, arrival_due = state["arrivals"]
+    if arrival_due is not None:
+        sim._arrival_due = arrival_due
+        sim._next_arrival = [min(due.values(), default=math.inf) for due in arrival_due]
+    if state["event_driven"]:
+        events, event_seq, phase_version, phase_started, pending, scheduled_rate, arrival_version = state["events"]
+        sim.event_driven = True
+        sim._events = events  # saved as a heap, so still a valid heap
+        sim._event_seq = event_seq
+        sim._phase_version = phase_version
+        sim._phase_started = phase_started
+        sim._pending_departures = pending
+        sim._scheduled_rate = scheduled_rate
+        sim._arrival_version = arrival_version
+        for intersection in sim.intersections:
+            intersection.event_listener = sim
+    return sim, state["context"]
+
+
+def restore_agents(data: bytes) -> Tuple[TrafficSimulator, ObserverAgent, ControllerAgent, CoordinatorAgent]:
+    """Restores a checkpoint together with a fresh Observer/Coordinator and the saved Controller context."""
+    sim, context = restore(data)
+    observer = ObserverAgent(sim)
+    controller = ControllerAgent(sim)
+    controller.context = context or {}
+    coordinator = CoordinatorAgent(controller)
+    return sim, observer, controller, coordinator
+
+
+def run_policy(data: bytes, policy: str, steps: int) -> Dict[str, Any]:
+    """
+    Continues a checkpoint for `steps` steps under a built-in policy ("AI": the observe/coordinate/
+    decide loop of server.py, "BASELINE": fixed timer) and returns summary metrics.
+    """
+    sim, observer, controller, coordinator = restore_agents(data)
+    wait_sum = 0.0
+    queue_sum = 0
+    for _ in range(steps):
+        sim.step()
+        if policy == "AI":
+            observations = observer.observe(sim.current_time)
+            if sim.current_time % 5 == 0:
+                coordinator.coordinate(observations)
+            controller.decide_many(observations)
+        elif policy == "BASELINE":
+            for intersection in sim.intersections:
+                if intersection.phase_timer >= intersection.green_duration:
+                    intersection.switch_light()
+        else:
+            raise ValueError(f"Unknown policy {policy!r}")
+        for intersection in sim.intersections:
+            state = intersection.get_state(sim.current_time)
+            wait_sum += state["avg_waiting_time"]
+            queue_sum += sum(state["queues"].values())
+
+    samples = steps * len(sim.intersections)
+    lanes = [lane for intersection in sim.intersections for lane in intersection.approaches.values()]
+    return {
+        "policy": policy,
+        "start_time": sim.current_time - steps,
+        "end_time": sim.current_time,
+        "avg_wait": wait_sum / samples if samples else 0.0,
+        "avg_queue": queue_sum / samples if samples else 0.0,
+        "vehicles_cleared": sum(lane.vehicles_cleared for lane in lanes),
+        "checkpoint": checkpoint(sim, controller)
+    }
+
+
+def _run_branch(data: bytes, branch: Union[str, Callable], steps: int):
+    if isinstance(branch, str):
+        return run_policy(data, branch, steps)
+    return branch(data, steps)
+
+
+def fork(data: bytes, branches: Dict[str, Union[str, Callable]], steps: int,
+         max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Continues one checkpoint along several what-if branches in parallel processes. Each branch is
+    a built-in policy name (see run_policy) or a picklable function branch(checkpoint, steps).
+    Returns {branch name: result}. Every branch starts from the same random state, so differences
+    between them come from the policies rather than from the draws.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {name: executor.submit(_run_branch, data, branch, steps) for name, branch in branches.items()}
+        return {name: future.result() for name, future in futures.items()}
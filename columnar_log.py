@@ -0,0 +1,129 @@
+import json
+import os
+import numpy as np
+from typing import Dict, List
+
+# Column name -> NumPy dtype. 'intersection' and 'phase' hold dictionary codes into the
+# category lists stored in meta.json.
+COLUMNS = {
+    'step': np.int32,
+    'intersection': np.int32,
+    'phase': np.uint8,
+    'total_queue_length': np.float32,
+    'avg_waiting_time': np.float32
+}
+CATEGORICAL = ('intersection', 'phase')
+META_FILE = 'meta.json'
+
+
+class ColumnarMetricsWriter:
+    """
+    Writes run metrics as typed columns: one raw little-endian binary file per column inside
+    `path`, plus meta.json with the dtypes, row count and category dictionaries.
+    Rows are buffered and appended one chunk of `chunk_size` rows at a time.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 65536):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.rows = 0
+        self.categories: Dict[str, List[str]] = {name: [] for name in CATEGORICAL}
+        self._codes: Dict[str, Dict[str, int]] = {name: {} for name in CATEGORICAL}
+        self._pending: Dict[str, list] = {name: [] for name in COLUMNS}
+
+        if not os.path.exists(path):
+            os.makedirs(path)
+        self._files = {name: open(os.path.join(path, f"{name}.bin"), 'wb') for name in COLUMNS}
+        self._write_meta()
+
+    def _encode(self, column: str, value: str) -> int:
+        codes = self._codes[column]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+            self.categories[column].append(value)
+        return code
+
+    def append(self, step: int, intersection_id: str, phase: str, total_queue_length: float, avg_waiting_time: float):
+        pending = self._pending
+        pending['step'].append(step)
+        pending['intersection'].append(self._encode('intersection', intersection_id))
+        pending['phase'].append(self._encode('phase', phase))
+        pending['total_queue_length'].append(total_queue_length)
+        pending['avg_waiting_time'].append(avg_waiting_time)
+        if len(pending['step']) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Appends the buffered rows to the column files and updates meta.json."""
+        count = len(self._pending['step'])
+        if count == 0:
+            return
+        for name, dtype in COLUMNS.items():
+            np.asarray(self._pending[name], dtype=np.dtype(dtype).newbyteorder('<')).tofile(self._files[name])
+            self._files[name].flush()
+            self._pending[name] = []
+        self.rows += count
+        self._write_meta()
+
+    def close(self):
+        self.flush()
+        for f in self._files.values():
+            f.close()
+
+    def _write_meta(self):
+        meta = {
+            'rows': self.rows,
+            'dtypes': {name: np.dtype(dtype).newbyteorder('<').str for name, dtype in COLUMNS.items()},
+            'categories': self.categories
+        }
+        tmp_path = os.path.join(self.path, META_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.path, META_FILE))
+
+
+class MetricsTable:
+    """Columns loaded by load_metrics. Categorical columns hold codes; decode() maps them back."""
+
+    def __init__(self, columns: Dict[str, np.ndarray], categories: Dict[str, List[str]]):
+        self.columns = columns
+        self.categories = categories
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def __len__(self) -> int:
+        return len(self.columns['step'])
+
+    def decode(self, name: str) -> np.ndarray:
+        """Returns a categorical column as an array of its string values."""
+        return np.asarray(self.categories[name], dtype=object)[self.columns[name]]
+
+    def to_pandas(self):
+        """Builds a pandas DataFrame with the categorical columns as pandas Categoricals."""
+        import pandas as pd
+        data = {}
+        for name, values in self.columns.items():
+            if name in self.categories:
+                data[name] = pd.Categorical.from_codes(values, categories=self.categories[name])
+            else:
+                data[name] = values
+        return pd.DataFrame(data)
+
+
+def load_metrics(path: str, mmap: bool = True) -> MetricsTable:
+    """Loads a columnar metrics directory, memory-mapping the column files by default."""
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    rows = meta['rows']
+    columns = {}
+    for name, dtype in meta['dtypes'].items():
+        file_path = os.path.join(path, f"{name}.bin")
+        if rows == 0:
+            columns[name] = np.empty(0, dtype=dtype)
+        elif mmap:
+            columns[name] = np.memmap(file_path, dtype=dtype, mode='r', shape=(rows,))
+        else:
+            columns[name] = np.fromfile(file_path, dtype=dtype, count=rows)
+    return MetricsTable(columns, meta['categories'])
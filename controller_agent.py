@@ -1,18 +1,125 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from event_bus import OBSERVATION
+
+# Reason codes returned by decide_batch; REASONS[code] is the text decide() reports for the same rule
+REASON_NORMAL = 0
+REASON_CRITICAL_WAITING = 1
+REASON_CRITICAL_CLEARING = 2
+REASON_GREEN_EMPTY = 3
+REASON_COORDINATOR_BIAS = 4
+REASONS = ["Normal flow", "CRITICAL lane waiting", "CRITICAL lane clearing", "Green empty, Red piling up", "Coordinator Bias"]
+
+# Phase / bias codes used by the array form: phase 0 = NS_GREEN, 1 = EW_GREEN; lane columns are N, E, S, W
+BIAS_CODES = {'NS': 0, 'EW': 1}
 
 class ControllerAgent:
-    def __init__(self, simulator):
+    def __init__(self, simulator, green_threshold: int = 5, red_threshold: int = 15):
         self.sim = simulator
         self.context = {} # Stores context updates from Coordinator
+        # SWITCH when the green direction has fewer than green_threshold cars and red more than red_threshold
+        self.green_threshold = green_threshold
+        self.red_threshold = red_threshold
+        self.last_batch: Optional[Tuple[Any, Any]] = None  # event mode: (switch mask, reason codes) of the latest decision
 
     def decide(self, observation: Dict[str, Any]):
         """
         Receives a summary from the Observer.
         Rules:
-            If the current green lane has < 5 cars and red lane has > 15 cars, SWITCH.
+            If the current green lane has < 5 cars and red lane has > 15 cars, SWITCH (thresholds configurable).
             If 'CRITICAL' flag is raised, prioritize that lane immediately.
         Output: Call the execute_signal_change tool with your decision.
         """
+        result = self._evaluate(observation)
+        if result["decision"] == "SWITCH":
+            self.sim.execute_signal_change(result["intersection_id"], "SWITCH")
+        return result
+
+    def decide_many(self, observations: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Decides for every observation of a tick (as returned by ObserverAgent.observe)
+        and applies all SWITCH decisions with a single execute_signal_changes call.
+        """
+        results = [self._evaluate(obs) for obs in observations.values()]
+        switches = {r["intersection_id"]: "SWITCH" for r in results if r["decision"] == "SWITCH"}
+        if switches:
+            self.sim.execute_signal_changes(switches)
+        return results
+
+    def decide_batch(self, queues, phase, critical) -> Tuple[Any, Any]:
+        """
+        Array form of decide_many for every intersection at once. Row i is the intersection with
+        simulator handle i: queues is (n, 4) queue lengths (N, E, S, W), phase is (n,) phase
+        indices (0 = NS_GREEN, 1 = EW_GREEN) and critical is the (n, 4) mask of CRITICAL lanes.
+        Applies all SWITCH decisions with one execute_signal_switches call and returns
+        (switch mask, reason codes), see REASONS.
+        """
+        phase = np.asarray(phase)
+        bias = np.full(len(phase), -1, dtype=np.int8)
+        for intersection_id, context in self.context.items():
+            code = BIAS_CODES.get(context.get('bias'))
+            handle = self.sim.get_handle(intersection_id)
+            if code is not None and handle is not None and handle < len(bias):
+                bias[handle] = code
+
+        switch, reasons = self.evaluate_batch(queues, phase, critical, bias, self.green_threshold, self.red_threshold)
+        handles = np.flatnonzero(switch)
+        if len(handles):
+            self.sim.execute_signal_switches(handles)
+        return switch, reasons
+
+    def describe_batch(self, handles, queues, phase, critical, switch, reasons) -> List[Dict[str, Any]]:
+        """
+        decide()-style results for some rows of a decide_batch call (its arguments and return
+        values), so that only the decisions that are logged or shown are turned into dicts.
+        """
+        results = []
+        for handle in handles:
+            lanes = queues[handle]
+            ns, ew = int(lanes[0] + lanes[2]), int(lanes[1] + lanes[3])
+            green_queue, red_queue = (ns, ew) if phase[handle] == 0 else (ew, ns)
+            results.append({
+                "intersection_id": self.sim.intersections[handle].intersection_id,
+                "decision": "SWITCH" if switch[handle] else "HOLD",
+                "reasoning": REASONS[reasons[handle]],
+                "observation": f"Green: {green_queue}, Red: {red_queue}, Critical: {bool(critical[handle].any())}"
+            })
+        return results
+
+    @staticmethod
+    def evaluate_batch(queues, phase, critical, bias=None, green_threshold: int = 5,
+                       red_threshold: int = 15) -> Tuple[Any, Any]:
+        """The rules of _evaluate as one NumPy pass; bias holds BIAS_CODES per row (-1 for none). Executes nothing."""
+        queues = np.asarray(queues)
+        critical = np.asarray(critical, dtype=bool)
+        ns_green = np.asarray(phase) == 0
+
+        ns_queue = queues[:, 0] + queues[:, 2]
+        ew_queue = queues[:, 1] + queues[:, 3]
+        green_queue = np.where(ns_green, ns_queue, ew_queue)
+        red_queue = np.where(ns_green, ew_queue, ns_queue)
+
+        critical_ns = critical[:, 0] | critical[:, 2]
+        critical_ew = critical[:, 1] | critical[:, 3]
+        any_critical = critical_ns | critical_ew
+        critical_in_red = np.where(ns_green, critical_ew, critical_ns)
+
+        # Same precedence as _evaluate: CRITICAL, then green empty / red piling up, then coordinator bias
+        conditions = [any_critical & critical_in_red, any_critical,
+                      (green_queue < green_threshold) & (red_queue > red_threshold)]
+        choices = [REASON_CRITICAL_WAITING, REASON_CRITICAL_CLEARING, REASON_GREEN_EMPTY]
+        if bias is not None:
+            red_direction = np.where(ns_green, BIAS_CODES['EW'], BIAS_CODES['NS'])
+            conditions.append(np.asarray(bias) == red_direction)
+            choices.append(REASON_COORDINATOR_BIAS)
+        reasons = np.select(conditions, choices, REASON_NORMAL).astype(np.int8)
+        switch = (reasons == REASON_CRITICAL_WAITING) | (reasons == REASON_GREEN_EMPTY) | (reasons == REASON_COORDINATOR_BIAS)
+        return switch, reasons
+
+    def _evaluate(self, observation: Dict[str, Any]) -> Dict[str, Any]:
+        """Applies the decision rules to one observation without executing anything."""
         intersection_id = observation['intersection_id']
         status = observation['status']
         critical = observation['critical']
@@ -60,7 +167,7 @@ class ControllerAgent:
                 reason = "CRITICAL lane clearing"
         
         # Rule: Green < 5 and Red > 15
-        elif green_queue < 5 and red_queue > 15:
+        elif green_queue < self.green_threshold and red_queue > self.red_threshold:
             decision = "SWITCH"
             reason = "Green empty, Red piling up"
             
@@ -70,10 +177,6 @@ class ControllerAgent:
                  decision = "SWITCH"
                  reason = "Coordinator Bias"
         
-        # Execute Decision
-        if decision == "SWITCH":
-            self.sim.execute_signal_change(intersection_id, "SWITCH")
-        
         return {
             "intersection_id": intersection_id,
             "decision": decision,
@@ -83,3 +186,17 @@ class ControllerAgent:
 
     def update_context(self, intersection_id: str, context: Dict[str, Any]):
         self.context[intersection_id] = context
+
+    # --- Event-driven mode ---
+    def subscribe(self, bus):
+        """
+        Decides on every OBSERVATION event (published by ObserverAgent.observe_arrays with this bus)
+        instead of being called with each observation. Runs after the handlers of the step's other
+        events, so Coordinator context set by them applies; the result is kept in last_batch.
+        """
+        # on_observation is looked up per event, so a wrapper installed on it later (e.g. by the profiler) applies
+        bus.subscribe(OBSERVATION, lambda event: self.on_observation(event))
+
+    def on_observation(self, event: Dict[str, Any]):
+        arrays = event['observations']
+        self.last_batch = self.decide_batch(arrays.queues, arrays.phase, arrays.critical)
@@ -1,14 +1,28 @@
 from typing import Dict, Any, List
 
+from event_bus import QUEUE_CROSSING, PHASE_CHANGE, SPILLBACK
+
+# Axis whose green phase serves each approach
+APPROACH_AXIS = {'N': 'NS', 'S': 'NS', 'E': 'EW', 'W': 'EW'}
+
 class CoordinatorAgent:
-    def __init__(self, controller):
+    def __init__(self, controller, wave_horizon: int = 10, wave_threshold: int = 5):
         self.controller = controller
+        self.wave_horizon = wave_horizon  # seconds of link travel to look ahead
+        self.wave_threshold = wave_threshold  # vehicles arriving within the horizon that warrant a bias
+        self._wave_sources: Dict[str, tuple] = {}  # event mode: downstream id -> (upstream id, axis) of the wave released towards it
+        self._spillbacks: Dict[str, set] = {}  # event mode: intersection id -> approaches backed up
 
     def coordinate(self, observations: Dict[str, Any]):
         """
         Manages two different intersections (e.g., Main St. & 1st Ave).
         Logic: If Main St. releases a huge wave of cars, the Coordinator tells 1st Ave to prepare.
+        On a road network the wave is read from link occupancy instead (see coordinate_network).
         """
+        if getattr(self.controller.sim, 'links', None):
+            self.coordinate_network(observations)
+            return
+
         # Example Logic:
         # If I1 (Main St) has high North Queue, tell I2 (1st Ave) to bias North?
         # Or if I1 is congested, tell I2 to hold back?
@@ -23,12 +37,90 @@ class CoordinatorAgent:
         # If I1 North Queue > 15, tell I2 to bias 'NS' (prepare for flow).
         
         if 'I1' in observations:
-            i1_obs = observations['I1']
-            status = i1_obs['status']
-            
-            if status['north_queue'] > 15:
-                # Inject context to I2
-                self.controller.update_context('I2', {'bias': 'NS'})
-            else:
-                # Clear context
-                self.controller.update_context('I2', {})
+            self.coordinate_pair(observations['I1']['status']['north_queue'])
+
+    def coordinate_pair(self, north_queue: int):
+        """
+        The I1/I2 rule on its own, given I1's north queue. A partitioned run calls it in the
+        partition that owns I2, with the queue relayed from I1's partition.
+        """
+        if north_queue > 15:
+            # Inject context to I2
+            self.controller.update_context('I2', {'bias': 'NS'})
+        else:
+            # Clear context
+            self.controller.update_context('I2', {})
+
+    def coordinate_network(self, observations: Dict[str, Any]):
+        """
+        Biases every intersection towards the axis (NS or EW) with the larger wave of vehicles
+        arriving over its incoming links within wave_horizon seconds.
+        """
+        incoming = self.controller.sim.get_incoming_traffic_many(self.wave_horizon)
+        for i_id in observations:
+            arriving = incoming.get(i_id)
+            context = {}
+            if arriving:
+                ns = arriving.get('N', 0) + arriving.get('S', 0)
+                ew = arriving.get('E', 0) + arriving.get('W', 0)
+                if max(ns, ew) >= self.wave_threshold and ns != ew:
+                    context = {'bias': 'NS' if ns > ew else 'EW'}
+            self.controller.update_context(i_id, context)
+
+    # --- Event-driven mode ---
+    def subscribe(self, bus, queue_threshold: int = 15):
+        """
+        Reacts to EventBus events instead of being polled with coordinate(). Without a road network
+        this is the I1/I2 rule, triggered only when I1's north queue crosses queue_threshold. On a
+        network the coordinator listens to phase changes (an upstream green releases a wave towards
+        its downstream neighbours) and spillback (a backed-up lane gets priority).
+        """
+        # on_event is looked up per event, so a wrapper installed on it later (e.g. by the profiler) applies
+        handler = lambda event: self.on_event(event)
+        if getattr(self.controller.sim, 'links', None):
+            bus.subscribe(PHASE_CHANGE, handler)
+            bus.subscribe(SPILLBACK, handler)
+        else:
+            bus.subscribe(QUEUE_CROSSING, handler, 'I1', approach='N', threshold=queue_threshold)
+
+    def on_event(self, event: Dict[str, Any]):
+        if event['type'] == QUEUE_CROSSING:
+            # I1 north queue crossed the threshold: bias I2 towards NS while it stays above
+            self.controller.update_context('I2', {'bias': 'NS'} if event['above'] else {})
+        elif event['type'] == PHASE_CHANGE:
+            self._on_phase_change(event)
+        elif event['type'] == SPILLBACK:
+            self._on_spillback(event)
+
+    def _on_phase_change(self, event: Dict[str, Any]):
+        """Biases the neighbours a large queue is now released towards; lifts biases this intersection set before."""
+        source = event['intersection_id']
+        axis = event['phase'].split('_')[0]
+        for approach, link in self.controller.sim.get_outgoing_links(source).items():
+            if APPROACH_AXIS[approach] == axis and event['queues'][approach] >= self.wave_threshold:
+                self._wave_sources[link.to_id] = (source, axis)
+                self._update(link.to_id)
+            elif self._wave_sources.get(link.to_id, (None,))[0] == source:
+                del self._wave_sources[link.to_id]
+                self._update(link.to_id)
+
+    def _on_spillback(self, event: Dict[str, Any]):
+        """Gives a backed-up lane's axis priority until it clears, so the queue stops blocking its upstream neighbour."""
+        backed_up = self._spillbacks.setdefault(event['intersection_id'], set())
+        if event['active']:
+            backed_up.add(event['approach'])
+        else:
+            backed_up.discard(event['approach'])
+        self._update(event['intersection_id'])
+
+    def _update(self, intersection_id: str):
+        """Recomputes one intersection's bias: a spillback first, then an incoming wave, else none."""
+        backed_up = self._spillbacks.get(intersection_id)
+        wave = self._wave_sources.get(intersection_id)
+        if backed_up:
+            axis = APPROACH_AXIS[min(backed_up)]
+        elif wave:
+            axis = wave[1]
+        else:
+            axis = None
+        self.controller.update_context(intersection_id, {'bias': axis} if axis else {})
@@ -24,12 +24,10 @@ def action_callback(action: dict):
     # Since this runs in the main thread (mostly), we can access session_state.sim
     if 'sim' in st.session_state:
         sim = st.session_state.sim
-        # Find intersection (sim.intersections is a list, we should probably have made it a dict)
-        for i in sim.intersections:
-            if i.intersection_id == intersection_id:
-                if action['action'] == 'SWITCH':
-                    i.switch_phase()
-                break
+        # Find intersection via the simulator's ID registry
+        i = sim.get_intersection(intersection_id)
+        if i is not None and action['action'] == 'SWITCH':
+            i.switch_phase()
 
 def init_simulation():
     """Initializes the simulation state."""
@@ -0,0 +1,230 @@
+import bisect
+import csv
+import heapq
+import itertools
+import math
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+from traffic_simulator import sample_trials
+
+DAY = 86400
+
+# A schedule is a constant rate or a list of (time of day, rate) breakpoints
+Schedule = Union[float, List[Tuple[Union[int, str], float]]]
+
+
+def parse_time(value: Union[int, float, str]) -> int:
+    """Seconds from a number or an "HH:MM" / "HH:MM:SS" time of day."""
+    if isinstance(value, str) and ":" in value:
+        hours, minutes, seconds = ([int(part) for part in value.split(":")] + [0])[:3]
+        return hours * 3600 + minutes * 60 + seconds
+    return int(float(value))
+
+
+def _schedule(value: Schedule) -> Tuple[List[int], List[float]]:
+    """Normalizes a schedule into sorted (breakpoint seconds of day, rates)."""
+    points = [(0, value)] if isinstance(value, (int, float)) else [(parse_time(t), rate) for t, rate in value]
+    if not points:
+        raise ValueError("A schedule needs at least one breakpoint")
+    points.sort()
+    for _, rate in points:
+        if not 0 <= rate <= 1:
+            raise ValueError(f"Arrival rate {rate} is not a per-second probability in [0, 1]")
+    return [t for t, _ in points], [float(rate) for _, rate in points]
+
+
+class DemandProfile:
+    """
+    Time-of-day arrival rates per lane, used instead of TrafficSimulator.arrival_rate
+    (sim.set_demand(profile)). Rates are vehicles per second per lane, as arrival_rate.
+
+    Every schedule is a constant rate or a list of (time of day, rate) breakpoints, e.g.
+    [("00:00", 0.02), ("07:00", 0.2), ("09:30", 0.08), ("16:30", 0.18), ("19:00", 0.05)]: the rate
+    holds until the next breakpoint and the day repeats every `period` seconds (the rate before the
+    first breakpoint is the last one of the previous day). `lanes` overrides the `default` schedule
+    by key "I1.N" (one lane) or "I1" (every approach of an intersection); with no default, the other
+    lanes use the simulator's arrival_rate. Simulation second 0 is time of day `start`.
+
+    Each lane's next arrival is drawn ahead from its intersection's random stream and kept in a
+    heap, so a step only touches lanes with an arrival and every lane is redrawn when any rate
+    changes. The profile keeps per-simulator state: use one instance per simulator.
+    """
+
+    def __init__(self, default: Optional[Schedule] = None, lanes: Optional[Dict[str, Schedule]] = None,
+                 start: Union[int, str] = 0, period: int = DAY, scale: float = 1.0):
+        self.default = _schedule(default) if default is not None else None
+        self.lanes = {key: _schedule(value) for key, value in (lanes or {}).items()}
+        self.start = parse_time(start)
+        self.period = period
+        self.scale = scale
+        schedules = [self.default, *self.lanes.values()]
+        # Seconds of day at which some rate changes (a single breakpoint never changes anything)
+        self._changes = sorted({t % period for s in schedules if s and len(s[0]) > 1 for t in s[0]})
+
+        self._size = 0  # intersections the schedule covers
+        self._rates: Dict[Tuple[int, str], float] = {}
+        self._due: List[Tuple[int, int, str]] = []  # heap of (time, handle, approach)
+        self._next_change = 0
+
+    def rate(self, intersection_id: str, approach: str, time_of_day: int, arrival_rate: float = 0.0) -> float:
+        """Arrival rate of one lane at a time of day (seconds)."""
+        schedule = self.lanes.get(f"{intersection_id}.{approach}") or self.lanes.get(intersection_id) or self.default
+        if schedule is None:
+            return arrival_rate * self.scale
+        times, rates = schedule
+        return min(rates[bisect.bisect_right(times, time_of_day % self.period) - 1] * self.scale, 1.0)
+
+    def add_arrivals(self, sim, current_time: int):
+        """Adds this second's arrivals to sim's lanes that are not fed by a link."""
+        if current_time >= self._next_change:
+            self._redraw(sim, current_time)
+        elif len(sim.intersections) != self._size:
+            for handle in range(self._size, len(sim.intersections)):
+                self._draw_lanes(sim, handle, current_time)
+            self._size = len(sim.intersections)
+
+        due = self._due
+        intersections = sim.intersections
+        while due and due[0][0] <= current_time:
+            _, handle, approach = heapq.heappop(due)
+            if approach not in sim._arrival_approaches[handle]:
+                continue  # the lane is fed by a link now
+            intersection = intersections[handle]
+            intersection.add_vehicle(approach, current_time)
+            self._schedule(handle, approach, current_time, intersection.rng)
+
+    def _redraw(self, sim, current_time: int):
+        """Rates changed: redraws every lane's next arrival (draws are memoryless, so this is exact)."""
+        self._due = []
+        for handle in range(len(sim.intersections)):
+            self._draw_lanes(sim, handle, current_time)
+        self._size = len(sim.intersections)
+        time_of_day = self.start + current_time
+        self._next_change = min(
+            (current_time + ((change - time_of_day) % self.period or self.period) for change in self._changes),
+            default=math.inf)
+
+    def _draw_lanes(self, sim, handle: int, current_time: int):
+        intersection = sim.intersections[handle]
+        for approach in sim._arrival_approaches[handle]:
+            self._rates[(handle, approach)] = self.rate(intersection.intersection_id, approach,
+                                                        self.start + current_time, sim.arrival_rate)
+            # The current second is still open: it is the first trial
+            self._schedule(handle, approach, current_time - 1, intersection.rng)
+
+    def _schedule(self, handle: int, approach: str, after: int, rng):
+        trials = sample_trials(self._rates[(handle, approach)], rng)
+        if trials is not None:
+            heapq.heappush(self._due, (after + trials, handle, approach))
+
+
+class TraceReplay:
+    """
+    Replays recorded arrivals from a CSV file (sim.set_demand(TraceReplay(path))), e.g. detector
+    counts. Columns (header row required, any order): time, intersection_id, approach, count and
+    optionally interval. A row adds `count` vehicles to one lane at `time` (simulation seconds, or an
+    "HH:MM[:SS]" time of day with simulation second 0 at time of day `start`); with an interval of
+    more than one second its vehicles are spread uniformly over [time, time + interval).
+
+    Rows must be in time order. The file is read lazily, chunk_size rows at a time, so only the
+    rows around the current time are in memory. Vehicles before simulation second 0 (e.g. recorded
+    before `start`) and rows for unknown intersections or lanes fed by a link are counted in `skipped`. A checkpointed replay reopens the file and skips the rows
+    already replayed.
+    """
+
+    def __init__(self, path: str, start: Union[int, str] = 0, chunk_size: int = 10000):
+        self.path = path
+        self.start = parse_time(start)
+        self.chunk_size = chunk_size
+        self.rows_replayed = 0
+        self.vehicles = 0
+        self.skipped = 0
+        self._pending: Dict[int, List[Tuple[int, str]]] = {}  # second -> lanes of spread vehicles
+        self._last_time = -math.inf
+        self._file = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = dict(self.__dict__)
+        for name in ('_file', '_rows', '_chunk', '_columns', '_next'):
+            state.pop(name, None)
+        state['_file'] = None
+        return state
+
+    def _open(self):
+        self._file = open(self.path, newline='')
+        self._rows = csv.reader(self._file)
+        header = [name.strip() for name in next(self._rows)]
+        missing = {'time', 'intersection_id', 'approach', 'count'} - set(header)
+        if missing:
+            raise ValueError(f"Trace {self.path} lacks the columns {sorted(missing)}")
+        self._columns = [header.index(name) for name in ('time', 'intersection_id', 'approach', 'count')]
+        self._columns.append(header.index('interval') if 'interval' in header else None)
+        self._rows = itertools.islice(self._rows, self.rows_replayed, None)  # resuming from a checkpoint
+        self._chunk = iter(())
+        self._next = None
+
+    def _peek(self) -> Optional[tuple]:
+        """The next unreplayed row as (time, intersection_id, approach, count, interval), or None at the end."""
+        if self._next is None:
+            row = next(self._chunk, None)
+            if row is None:
+                chunk = list(itertools.islice(self._rows, self.chunk_size))
+                if not chunk:
+                    return None
+                self._chunk = iter(chunk)
+                row = next(self._chunk)
+            time_column, id_column, approach_column, count_column, interval_column = self._columns
+            value = row[time_column].strip()
+            time = parse_time(value) - self.start if ":" in value else parse_time(value)
+            if time < self._last_time:
+                raise ValueError(f"Trace {self.path} is not in time order at row {self.rows_replayed + 2}")
+            self._last_time = time
+            interval = int(row[interval_column]) if interval_column is not None and row[interval_column] else 1
+            self._next = (time, row[id_column].strip(), row[approach_column].strip(), int(row[count_column]), interval)
+        return self._next
+
+    def add_arrivals(self, sim, current_time: int):
+        """Adds the recorded arrivals up to this second."""
+        if self._file is None:
+            self._open()
+        while True:
+            row = self._peek()
+            if row is None or row[0] > current_time:
+                break
+            self._next = None
+            self.rows_replayed += 1
+            time, intersection_id, approach, count, interval = row
+            handle = sim.index.get(intersection_id)
+            if handle is None or approach not in sim._arrival_approaches[handle] or time + interval <= 0:
+                self.skipped += count
+                continue
+            intersection = sim.intersections[handle]
+            for _ in range(count):
+                second = time + intersection.rng.randrange(interval) if interval > 1 else time
+                if second < 0:
+                    self.skipped += 1  # spread to before the start of the simulation
+                elif second <= current_time:
+                    intersection.add_vehicle(approach, current_time)
+                    self.vehicles += 1
+                else:
+                    self._pending.setdefault(second, []).append((handle, approach))
+
+        for handle, approach in self._pending.pop(current_time, ()):
+            sim.intersections[handle].add_vehicle(approach, current_time)
+            self.vehicles += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def demand_from_config(config: Dict[str, Any]):
+    """
+    Builds a demand model from a JSON-style config: {"trace": path, "start": ..., "chunk_size": ...}
+    for a TraceReplay, otherwise the DemandProfile keyword arguments.
+    """
+    if "trace" in config:
+        options = dict(config)
+        return TraceReplay(options.pop("trace"), **options)
+    return DemandProfile(**config)
@@ -33,6 +33,7 @@ def main():
             print(f"Step {step}: INT_01 Phase={state1['phase']} Queues={state1['queues']} AvgWait={state1['avg_waiting_time']:.2f}s")
 
     sim.logger.save_json()
+    sim.logger.close()
     print("Simulation Complete.")
     print(f"Logs saved to {logger.log_dir}")
 
@@ -0,0 +1,64 @@
+from collections import defaultdict
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+# Event types. Every event is a dict with at least 'type', 'intersection_id' and 'step'.
+QUEUE_CROSSING = "queue_crossing"  # a watched lane's queue crossed a subscriber's threshold (+ approach, threshold, queue, above)
+PHASE_CHANGE = "phase_change"      # an intersection's green phase changed (+ phase, queues)
+SPILLBACK = "spillback"            # a link-fed lane backed up past the spillback threshold, or cleared (+ approach, queue, active, upstream)
+OBSERVATION = "observation"        # a new observation of every intersection, published last (+ observations); intersection_id is None
+EVENT_TYPES = (QUEUE_CROSSING, PHASE_CHANGE, SPILLBACK, OBSERVATION)
+
+
+class EventBus:
+    """
+    Synchronous publish/subscribe channel between the agents.
+
+    Subscribers register for an event type, optionally for one intersection and with extra filters
+    that must match the event's fields (e.g. approach and threshold for QUEUE_CROSSING). The
+    ObserverAgent publishes events only when a condition changes, so subscribers run in proportion
+    to the number of events rather than to intersections x steps.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[Tuple[str, Optional[str]], List[tuple]] = defaultdict(list)
+        self.version = 0  # bumped on every (un)subscribe, so publishers can rebuild what they watch
+        self.published = 0
+
+    def subscribe(self, event_type: str, callback: Callable[[Dict[str, Any]], None],
+                  intersection_id: Optional[str] = None, **filters):
+        """
+        Calls callback(event) for every matching event. intersection_id=None subscribes to all
+        intersections. QUEUE_CROSSING subscriptions need an intersection, approach and threshold.
+        """
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"Unknown event type {event_type!r}")
+        if event_type == QUEUE_CROSSING and (intersection_id is None or 'approach' not in filters or 'threshold' not in filters):
+            raise ValueError("QUEUE_CROSSING subscriptions need intersection_id, approach and threshold")
+        self._subscribers[(event_type, intersection_id)].append((callback, filters))
+        self.version += 1
+
+    def unsubscribe(self, event_type: str, callback: Callable, intersection_id: Optional[str] = None):
+        key = (event_type, intersection_id)
+        self._subscribers[key] = [s for s in self._subscribers[key] if s[0] != callback]
+        self.version += 1
+
+    def has_subscribers(self, event_type: str) -> bool:
+        return any(subs for (kind, _), subs in self._subscribers.items() if kind == event_type)
+
+    def queue_watches(self) -> List[Tuple[str, str, int]]:
+        """Distinct (intersection_id, approach, threshold) conditions that QUEUE_CROSSING subscribers watch."""
+        watches = set()
+        for (kind, intersection_id), subs in self._subscribers.items():
+            if kind == QUEUE_CROSSING:
+                for _, filters in subs:
+                    watches.add((intersection_id, filters['approach'], filters['threshold']))
+        return sorted(watches)
+
+    def publish(self, event: Dict[str, Any]):
+        """Calls the subscribers of this intersection, then those of all intersections, each in subscription order."""
+        self.published += 1
+        keys = ((event['type'], event['intersection_id']), (event['type'], None))
+        for key in keys if event['intersection_id'] is not None else keys[1:]:
+            for callback, filters in self._subscribers.get(key, ()):
+                if all(event.get(field) == value for field, value in filters.items()):
+                    callback(event)
@@ -0,0 +1,132 @@
+import time
+from typing import Dict, Any, Tuple
+
+# Bucket i counts durations in [2^(i-1), 2^i) microseconds; bucket 0 is < 1us.
+NUM_BUCKETS = 32
+
+
+class LatencyHistogram:
+    """Log2-bucketed latency histogram with constant memory and O(1) record()."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.buckets = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.buckets[min(int(seconds * 1e6).bit_length(), NUM_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percentile: float) -> float:
+        """Upper bound (in seconds) of the bucket holding the given percentile."""
+        if self.count == 0:
+            return 0.0
+        rank = percentile / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return min((1 << i) / 1e6, self.max)
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'total_ms': self.total * 1e3,
+            'mean_ms': self.total / self.count * 1e3 if self.count else 0.0,
+            'min_ms': self.min * 1e3 if self.count else 0.0,
+            'max_ms': self.max * 1e3,
+            'p50_ms': self.percentile(50) * 1e3,
+            'p95_ms': self.percentile(95) * 1e3,
+            'p99_ms': self.percentile(99) * 1e3,
+            # [bucket upper bound in microseconds, count] for non-empty buckets
+            'buckets_us': [[1 << i, n] for i, n in enumerate(self.buckets) if n]
+        }
+
+
+class Profiler:
+    """
+    Per-phase latency recorder for the simulation hot path.
+
+    instrument() registers a method under a label. While the profiler is enabled the method is
+    shadowed on that instance by a timing wrapper; when it is disabled the wrapper is removed,
+    so calls go straight to the original method and profiling costs nothing.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self._targets: Dict[str, Tuple[Any, str]] = {}  # label -> (object, method name)
+
+    def instrument(self, obj, method_name: str, label: str):
+        """Times obj.method_name under `label`. Re-instrumenting a label replaces its old target."""
+        if label in self._targets:
+            self._unpatch(label)
+        self._targets[label] = (obj, method_name)
+        self.histograms.setdefault(label, LatencyHistogram())
+        if self.enabled:
+            self._patch(label)
+
+    def enable(self):
+        if not self.enabled:
+            self.enabled = True
+            for label in self._targets:
+                self._patch(label)
+
+    def disable(self):
+        if self.enabled:
+            self.enabled = False
+            for label in self._targets:
+                self._unpatch(label)
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'enabled': self.enabled,
+            'phases': {label: histogram.snapshot() for label, histogram in self.histograms.items()}
+        }
+
+    def _patch(self, label: str):
+        obj, method_name = self._targets[label]
+        method = getattr(obj, method_name)
+        histogram = self.histograms[label]
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                histogram.record(perf_counter() - start)
+
+        timed.__wrapped__ = method
+        setattr(obj, method_name, timed)
+
+    def _unpatch(self, label: str):
+        obj, method_name = self._targets[label]
+        current = getattr(obj, method_name)
+        original = getattr(current, '__wrapped__', None)
+        if original is None:
+            return
+        if getattr(original, '__self__', None) is obj and method_name in vars(obj):
+            # Bound method of the instance: dropping the shadowing attribute restores it
+            delattr(obj, method_name)
+        else:
+            setattr(obj, method_name, original)
+
+
+# Shared profiler for the server's simulation loop
+profiler = Profiler()
@@ -1,39 +1,60 @@
 import csv
 import json
 import os
+import textwrap
+from collections import deque
 from typing import Dict, List, Any
 
 class SimulationLogger:
-    def __init__(self, log_dir: str = "logs", run_id: str = "sim_run"):
+    def __init__(self, log_dir: str = "logs", run_id: str = "sim_run", flush_interval: int = 100,
+                 buffer_size: int = 64 * 1024, history_size: int = 0, columnar: bool = False,
+                 columnar_chunk_size: int = 65536):
+        """
+        Streams per-step metrics to CSV and JSON Lines through one open handle per file.
+        flush_interval: flush the files every N logged steps (0 = only on flush()/close()).
+        buffer_size: write buffer size in bytes for each file.
+        history_size: keep the most recent N entries in memory (self.logs); 0 keeps none.
+        columnar: also write typed binary columns to {run_id}_metrics.columns/ (requires NumPy),
+            in chunks of columnar_chunk_size rows. Load them with columnar_log.load_metrics.
+        """
         self.log_dir = log_dir
         self.run_id = run_id
         self.csv_file_path = os.path.join(log_dir, f"{run_id}_metrics.csv")
+        self.jsonl_file_path = os.path.join(log_dir, f"{run_id}_metrics.jsonl")
         self.json_file_path = os.path.join(log_dir, f"{run_id}_metrics.json")
-        self.logs: List[Dict[str, Any]] = []
-        
+        self.flush_interval = flush_interval
+        self.logs = deque(maxlen=history_size)  # Opt-in ring buffer of recent entries
+        self._steps_since_flush = 0
+        self.closed = False
+
         if not os.path.exists(log_dir):
             os.makedirs(log_dir)
-            
+
         # Initialize CSV with headers
         self.headers = ['step', 'intersection_id', 'phase', 'total_queue_length', 'avg_waiting_time']
-        with open(self.csv_file_path, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=self.headers)
-            writer.writeheader()
+        self._csv_file = open(self.csv_file_path, 'w', newline='', buffering=buffer_size)
+        self._csv_writer = csv.DictWriter(self._csv_file, fieldnames=self.headers)
+        self._csv_writer.writeheader()
+        self._jsonl_file = open(self.jsonl_file_path, 'w', buffering=buffer_size)
+
+        self.profile_file_path = os.path.join(log_dir, f"{run_id}_profile.json")
+        self.profiler = None
+
+        self.columnar_path = None
+        self._columnar = None
+        if columnar:
+            from columnar_log import ColumnarMetricsWriter
+            self.columnar_path = os.path.join(log_dir, f"{run_id}_metrics.columns")
+            self._columnar = ColumnarMetricsWriter(self.columnar_path, chunk_size=columnar_chunk_size)
 
     def log_step(self, step: int, intersection_states: List[Dict[str, Any]]):
         """Logs the state of the simulation at a given step."""
-        step_logs = []
+        keep_history = self.logs.maxlen != 0
         for state in intersection_states:
             # Calculate aggregate metrics for the intersection
             queues = state['queues']
             total_queue = sum(queues.values())
-            
-            # We need waiting time from the state, but currently get_state only returns queues.
-            # We should update Intersection.get_state to return more info or pass objects.
-            # For now, let's assume state has what we need or we calculate it.
-            # Actually, let's update Intersection.get_state in traffic_simulator.py first.
-            # But for now, I'll just log what I have and extend later.
-            
+
             log_entry = {
                 'step': step,
                 'intersection_id': state['id'],
@@ -41,15 +62,65 @@ class SimulationLogger:
                 'total_queue_length': total_queue,
                 'avg_waiting_time': state.get('avg_waiting_time', 0.0)
             }
-            step_logs.append(log_entry)
-            self.logs.append(log_entry)
+            self._csv_writer.writerow(log_entry)
+            self._jsonl_file.write(json.dumps(log_entry) + '\n')
+            if keep_history:
+                self.logs.append(log_entry)
+            if self._columnar:
+                self._columnar.append(step, log_entry['intersection_id'], log_entry['phase'],
+                                      total_queue, log_entry['avg_waiting_time'])
+
+        self._steps_since_flush += 1
+        if self.flush_interval and self._steps_since_flush >= self.flush_interval:
+            self.flush()
+
+    def attach_profiler(self, profiler):
+        """Includes the profiler's latency histograms in the run output (written on close)."""
+        self.profiler = profiler
+
+    def save_profile(self):
+        """Writes the attached profiler's per-phase latency snapshot to {run_id}_profile.json."""
+        if self.profiler is None:
+            return
+        with open(self.profile_file_path, 'w') as f:
+            json.dump(self.profiler.snapshot(), f, indent=2)
+
+    def flush(self):
+        if self.closed:
+            return
+        self._csv_file.flush()
+        self._jsonl_file.flush()
+        self._steps_since_flush = 0
+
+    def close(self):
+        if self.closed:
+            return
+        self.flush()
+        if self.profiler is not None and self.profiler.enabled:
+            self.save_profile()
+        self._csv_file.close()
+        self._jsonl_file.close()
+        if self._columnar:
+            self._columnar.close()
+        self.closed = True
+
+    def __enter__(self):
+        return self
 
-        # Write to CSV
-        with open(self.csv_file_path, 'a', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=self.headers)
-            writer.writerows(step_logs)
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def save_json(self):
-        """Saves all logs to a JSON file."""
-        with open(self.json_file_path, 'w') as f:
-            json.dump(self.logs, f, indent=2)
+        """
+        Saves all logs to a JSON file (same layout as json.dump(..., indent=2)).
+        Entries are streamed from the JSON Lines file one at a time, so memory stays bounded.
+        """
+        self.flush()
+        with open(self.jsonl_file_path) as src, open(self.json_file_path, 'w') as dst:
+            dst.write('[')
+            first = True
+            for line in src:
+                dst.write('\n' if first else ',\n')
+                dst.write(textwrap.indent(json.dumps(json.loads(line), indent=2), '  '))
+                first = False
+            dst.write('\n]' if not first else ']')
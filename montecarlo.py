@@ -0,0 +1,208 @@
+import argparse
+import math
+import random
+import statistics
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Any, Iterator, List, Optional
+
+from traffic_simulator import TrafficSimulator, Intersection
+from demand import demand_from_config
+from sessions import make_agents, control_step
+
+# Scenario parameters for one replication. Missing keys fall back to these values.
+DEFAULT_SCENARIO = {
+    "intersections": 2,
+    "arrival_rate": 0.1,
+    "green_duration": 30,
+    "clearance_rate": 0.5,
+    "mode": "AI",  # "AI" (Observer/Coordinator/Controller), "BASELINE" (static timer) or "TIMED" (timing plan)
+    "steps": 600,
+    "controller": {},  # AI parameters: critical_threshold (Observer), green_threshold / red_threshold (Controller)
+    "timing": {},  # TIMED plan per intersection id: [NS green seconds, EW green seconds, offset seconds]
+    "demand": None  # time-of-day profile or trace replay instead of arrival_rate (see demand.demand_from_config)
+}
+
+OBSERVER_PARAMS = ("critical_threshold",)
+CONTROLLER_PARAMS = ("green_threshold", "red_threshold")
+
+METRICS = ["avg_wait", "avg_queue", "vehicles_cleared", "avg_cleared_wait"]
+
+
+def replication_seeds(master_seed: int, replications: int) -> List[int]:
+    """Derives the per-replication seeds from a master seed, so a batch is reproducible."""
+    rng = random.Random(master_seed)
+    return [rng.getrandbits(63) for _ in range(replications)]
+
+
+def run_replication(scenario: Dict[str, Any], seed: int, replication: int = 0) -> Dict[str, Any]:
+    """
+    Runs one seeded simulation of a scenario and returns its summary metrics. AI and BASELINE steps
+    are those of the server's sessions (sessions.control_step); TIMED runs the scenario's timing plans.
+    """
+    config = {**DEFAULT_SCENARIO, **scenario}
+    sim = TrafficSimulator(seed=seed)
+    sim.arrival_rate = config["arrival_rate"]
+    for i in range(config["intersections"]):
+        sim.add_intersection(Intersection(f"I{i + 1}", green_duration=config["green_duration"],
+                                          clearance_rate=config["clearance_rate"], manual_control=True))
+    if config["demand"]:
+        sim.set_demand(demand_from_config(config["demand"]))
+    params = config["controller"]
+    _, observer, _, _ = make_agents(sim, {k: v for k, v in params.items() if k in OBSERVER_PARAMS},
+                                    {k: v for k, v in params.items() if k in CONTROLLER_PARAMS})
+    green = config["green_duration"]
+    plans = [config["timing"].get(i.intersection_id, (green, green, 0)) for i in sim.intersections]
+
+    wait_sum = 0.0
+    queue_sum = 0
+    for _ in range(config["steps"]):
+        if config["mode"] == "TIMED":
+            sim.step()
+            # Fixed cycle of NS green then EW green, shifted by the offset
+            for intersection, (ns_green, ew_green, offset) in zip(sim.intersections, plans):
+                in_cycle = (sim.current_time + offset) % (ns_green + ew_green)
+                intersection.switch_light('NS' if in_cycle < ns_green else 'EW')
+        else:
+            control_step(sim, config["mode"], observer, config["green_duration"])
+
+        for intersection in sim.intersections:
+            state = intersection.get_state(sim.current_time)
+            wait_sum += state["avg_waiting_time"]
+            queue_sum += sum(state["queues"].values())
+
+    samples = config["steps"] * config["intersections"]
+    lanes = [lane for intersection in sim.intersections for lane in intersection.approaches.values()]
+    cleared = sum(lane.vehicles_cleared for lane in lanes)
+    return {
+        "replication": replication,
+        "seed": seed,
+        "mode": config["mode"],
+        "avg_wait": wait_sum / samples if samples else 0.0,
+        "avg_queue": queue_sum / samples if samples else 0.0,
+        "vehicles_cleared": cleared,
+        "avg_cleared_wait": sum(lane.total_waiting_time for lane in lanes) / cleared if cleared else 0.0
+    }
+
+
+def run_batch(scenario: Dict[str, Any], replications: int, master_seed: int = 0,
+              max_workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Fans seeded replications of a scenario out over a process pool and yields each run's summary
+    as soon as it finishes (completion order, not replication order).
+    """
+    seeds = replication_seeds(master_seed, replications)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_replication, scenario, seed, i) for i, seed in enumerate(seeds)]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+# Up to this many degrees of freedom the t quantile is solved from the exact distribution function;
+# above it the Cornish-Fisher expansion is accurate to better than 1e-6
+EXACT_T_MAX_DF = 200
+
+
+def _t_coverage(theta: float, df: int) -> float:
+    """P(|T| <= sqrt(df) * tan(theta)) for Student's t with integer df (closed form, Abramowitz & Stegun 26.7.3-4)."""
+    sin, cos2 = math.sin(theta), math.cos(theta) ** 2
+    if df % 2:
+        term, total = math.cos(theta), 0.0
+        for k in range(1, (df - 1) // 2 + 1):
+            total += term
+            term *= cos2 * 2 * k / (2 * k + 1)
+        return 2 / math.pi * (theta + sin * total)
+    term, total = 1.0, 0.0
+    for k in range(1, df // 2 + 1):
+        total += term
+        term *= cos2 * (2 * k - 1) / (2 * k)
+    return sin * total
+
+
+def t_critical(df: int, confidence: float = 0.95) -> float:
+    """Two-sided Student-t critical value: bisection on the exact distribution function for small df."""
+    if df <= 0:
+        return float("inf")
+    if df > EXACT_T_MAX_DF:
+        z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+        return (z
+                + (z ** 3 + z) / (4 * df)
+                + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+                + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3))
+    low, high = 0.0, math.pi / 2  # t = sqrt(df) * tan(theta)
+    for _ in range(60):
+        mid = (low + high) / 2
+        if _t_coverage(mid, df) < confidence:
+            low = mid
+        else:
+            high = mid
+    return math.sqrt(df) * math.tan((low + high) / 2)
+
+
+def confidence_interval(values: List[float], confidence: float = 0.95) -> Dict[str, float]:
+    n = len(values)
+    mean = statistics.fmean(values) if n else 0.0
+    stdev = statistics.stdev(values) if n > 1 else 0.0
+    half_width = t_critical(n - 1, confidence) * stdev / math.sqrt(n) if n > 1 else float("inf")
+    return {"n": n, "mean": mean, "stdev": stdev, "ci_low": mean - half_width, "ci_high": mean + half_width}
+
+
+def summarize(results: List[Dict[str, Any]], confidence: float = 0.95) -> Dict[str, Dict[str, float]]:
+    """Mean and confidence interval of every metric over a batch of replications."""
+    ordered = sorted(results, key=lambda r: r["replication"])
+    return {metric: confidence_interval([r[metric] for r in ordered], confidence) for metric in METRICS}
+
+
+def compare(results_a: List[Dict[str, Any]], results_b: List[Dict[str, Any]], metric: str = "avg_wait",
+            confidence: float = 0.95) -> Dict[str, float]:
+    """
+    Paired confidence interval for metric(A) - metric(B). Batches run from the same master seed share
+    their per-replication seeds, so pairing by replication removes most of the seed-to-seed noise.
+    """
+    b_by_replication = {r["replication"]: r[metric] for r in results_b}
+    diffs = [r[metric] - b_by_replication[r["replication"]] for r in results_a if r["replication"] in b_by_replication]
+    return confidence_interval(diffs, confidence)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo comparison of traffic control modes")
+    parser.add_argument("--replications", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0, help="master seed")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--steps", type=int, default=DEFAULT_SCENARIO["steps"])
+    parser.add_argument("--intersections", type=int, default=DEFAULT_SCENARIO["intersections"])
+    parser.add_argument("--arrival-rate", type=float, default=DEFAULT_SCENARIO["arrival_rate"])
+    parser.add_argument("--green-duration", type=int, default=DEFAULT_SCENARIO["green_duration"])
+    parser.add_argument("--clearance-rate", type=float, default=DEFAULT_SCENARIO["clearance_rate"])
+    parser.add_argument("--modes", nargs="+", default=["AI", "BASELINE"])
+    args = parser.parse_args()
+
+    batches = {}
+    for mode in args.modes:
+        scenario = {
+            "intersections": args.intersections,
+            "arrival_rate": args.arrival_rate,
+            "green_duration": args.green_duration,
+            "clearance_rate": args.clearance_rate,
+            "mode": mode,
+            "steps": args.steps
+        }
+        print(f"Running {args.replications} replications of mode {mode}...")
+        results = []
+        for result in run_batch(scenario, args.replications, args.seed, args.workers):
+            results.append(result)
+            print(f"  [{len(results)}/{args.replications}] seed={result['seed']} "
+                  f"avg_wait={result['avg_wait']:.2f}s avg_queue={result['avg_queue']:.2f}")
+        batches[mode] = results
+
+        for metric, ci in summarize(results).items():
+            print(f"  {metric}: {ci['mean']:.3f} (95% CI {ci['ci_low']:.3f} .. {ci['ci_high']:.3f})")
+
+    if len(args.modes) == 2:
+        a, b = args.modes
+        for metric in ("avg_wait", "avg_queue"):
+            ci = compare(batches[a], batches[b], metric)
+            print(f"{metric} {a} - {b}: {ci['mean']:.3f} (95% CI {ci['ci_low']:.3f} .. {ci['ci_high']:.3f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,127 @@
-import json
-from typing import Dict, Any
+from collections.abc import Mapping
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from event_bus import QUEUE_CROSSING, PHASE_CHANGE, SPILLBACK, OBSERVATION
+
+# Lane columns of the observation arrays (same order as Intersection.approaches) and their status keys
+LANES = ('N', 'E', 'S', 'W')
+STATUS_KEYS = ('north_queue', 'east_queue', 'south_queue', 'west_queue')
+# Order of the queue keys in get_status(), which is the order observe() lists critical lanes in
+STATUS_ORDER = (0, 2, 1, 3)
+PHASES = ('NS_GREEN', 'EW_GREEN')
+
+
+class ObservationArrays(Mapping):
+    """
+    Observations of every intersection as preallocated arrays, rewritten in place by each
+    ObserverAgent.observe_arrays call (row = simulator handle):
+
+        queues   (n, 4) queue lengths, lanes N, E, S, W
+        phase    (n,)   0 = NS_GREEN, 1 = EW_GREEN
+        critical (n, 4) CRITICAL lanes
+        wait     (n, 4) average wait of the vehicles currently queued
+
+    It is also a read-only mapping {intersection_id: summary} with the same summaries as observe(),
+    built only when accessed (for logging, the dashboard or the dict-based agents). Summaries
+    reflect the arrays at the time of access.
+    """
+
+    def __init__(self, size: int):
+        self.step = 0
+        self.size = size
+        self.ids = []
+        self.index = {}
+        self.queues = np.zeros((size, 4), dtype=np.int32)
+        self.phase = np.zeros(size, dtype=np.int8)
+        self.critical = np.zeros((size, 4), dtype=bool)
+        self.wait = np.zeros((size, 4), dtype=np.float64)
+        self.critical_on = np.zeros(size, dtype=np.int32)  # lane turns CRITICAL above this queue length...
+        self.critical_off = np.zeros(size, dtype=np.int32)  # ...and stays CRITICAL while above this one
+        self._scratch = np.zeros((size, 4), dtype=bool)
+
+    def __getitem__(self, intersection_id: str) -> Dict[str, Any]:
+        handle = self.index[intersection_id]
+        queues = self.queues[handle]
+        status = {STATUS_KEYS[lane]: int(queues[lane]) for lane in STATUS_ORDER}
+        status['current_green_lane'] = PHASES[self.phase[handle]]
+        critical_lanes = [STATUS_KEYS[lane] for lane in STATUS_ORDER if self.critical[handle, lane]]
+        return {
+            "intersection_id": intersection_id,
+            "step": self.step,
+            "status": status,
+            "critical": len(critical_lanes) > 0,
+            "critical_lanes": critical_lanes,
+            "wait_times": {LANES[lane]: float(self.wait[handle, lane]) for lane in range(4)}
+        }
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def to_dicts(self) -> Dict[str, Dict[str, Any]]:
+        """Materializes every summary, e.g. for logging."""
+        return {intersection_id: self[intersection_id] for intersection_id in self.ids}
+
 
 class ObserverAgent:
-    def __init__(self, simulator):
+    def __init__(self, simulator, critical_threshold: int = 20, clear_threshold: Optional[int] = None,
+                 bus=None, spillback_threshold: int = 30):
         self.sim = simulator
+        # A lane is CRITICAL when its queue exceeds critical_threshold. It then stays CRITICAL until
+        # the queue drops to clear_threshold (hysteresis; defaults to no hysteresis), in both modes.
+        # Each mode keeps its own CRITICAL state.
+        self.critical_threshold = critical_threshold
+        self.clear_threshold = critical_threshold if clear_threshold is None else clear_threshold
+        self.thresholds: Dict[str, tuple] = {}  # per-intersection (critical, clear) overrides
+        self.arrays: Optional[ObservationArrays] = None
+        self._critical: Dict[str, list] = {}  # observe(): CRITICAL lanes of the previous observation
+
+        # Event publishing (array mode): with an EventBus, observe_arrays compares each observation
+        # with the previous one and publishes QUEUE_CROSSING / PHASE_CHANGE / SPILLBACK events, then
+        # the observation itself (OBSERVATION) for agents that decide on every one, e.g. the Controller.
+        self.bus = bus
+        self.spillback_threshold = spillback_threshold  # queue on a link-fed lane that backs up into the upstream intersection
+        self._event_state = None
+
+    def set_thresholds(self, intersection_id: str, critical_threshold: int, clear_threshold: Optional[int] = None):
+        """Overrides the CRITICAL thresholds of one intersection."""
+        clear_threshold = critical_threshold if clear_threshold is None else clear_threshold
+        self.thresholds[intersection_id] = (critical_threshold, clear_threshold)
+        if self.arrays is not None and intersection_id in self.arrays.index:
+            handle = self.arrays.index[intersection_id]
+            self.arrays.critical_on[handle] = critical_threshold
+            self.arrays.critical_off[handle] = clear_threshold
+
+    def get_threshold(self, intersection_id: str) -> int:
+        return self.thresholds.get(intersection_id, (self.critical_threshold,))[0]
 
     def observe(self, step: int) -> Dict[str, Any]:
         """
         Reads queue lengths using get_traffic_status.
-        If any queue is > 20 cars, flag it as 'CRITICAL'.
+        If any queue exceeds the CRITICAL threshold (20 cars by default), flag it as 'CRITICAL'
+        (it stays flagged until the queue drops to the clear threshold).
         Returns a structured summary.
         """
         observations = {}
         
-        for intersection in self.sim.intersections:
-            i_id = intersection.intersection_id
-            status = self.sim.get_traffic_status(i_id)
+        # One batch tool call for every intersection instead of a lookup per ID
+        for i_id, status in self.sim.get_traffic_status_many().items():
             
             # Check for CRITICAL flag
+            on, off = self.thresholds.get(i_id, (self.critical_threshold, self.clear_threshold))
+            was_critical = self._critical.get(i_id, ())
             critical_lanes = []
             for lane, length in status.items():
-                if lane.endswith('_queue') and length > 20:
+                if lane.endswith('_queue') and (length > on or (length > off and lane in was_critical)):
                     critical_lanes.append(lane)
+            if critical_lanes:
+                self._critical[i_id] = critical_lanes
+            elif was_critical:
+                del self._critical[i_id]
             
             summary = {
                 "intersection_id": i_id,
@@ -33,3 +133,99 @@ class ObserverAgent:
             observations[i_id] = summary
             
         return observations
+
+    def observe_arrays(self, current_time: int) -> ObservationArrays:
+        """
+        Array form of observe() for large networks: refreshes the reused ObservationArrays in place
+        with one fill_traffic_arrays tool call and returns it, without building any dicts.
+        """
+        arrays = self.arrays
+        intersections = self.sim.intersections
+        n = len(intersections)
+        if arrays is None or arrays.size != n:
+            # Intersections were added: reallocate at the new size, keeping the CRITICAL state
+            previous = arrays
+            arrays = ObservationArrays(n)
+            for handle in range(n):
+                intersection_id = intersections[handle].intersection_id
+                arrays.ids.append(intersection_id)
+                arrays.index[intersection_id] = handle
+                on, off = self.thresholds.get(intersection_id, (self.critical_threshold, self.clear_threshold))
+                arrays.critical_on[handle] = on
+                arrays.critical_off[handle] = off
+            if previous is not None:
+                arrays.critical[:previous.size] = previous.critical
+            self.arrays = arrays
+
+        arrays.step = current_time
+        self.sim.fill_traffic_arrays(arrays.queues, arrays.phase, arrays.wait, current_time)
+
+        # Hysteresis: stay CRITICAL while above the clear threshold, become CRITICAL above the critical one
+        np.greater(arrays.queues, arrays.critical_off[:, None], out=arrays._scratch)
+        arrays.critical &= arrays._scratch
+        np.greater(arrays.queues, arrays.critical_on[:, None], out=arrays._scratch)
+        arrays.critical |= arrays._scratch
+
+        if self.bus is not None:
+            self._publish_events(arrays)
+        return arrays
+
+    def _publish_events(self, arrays: ObservationArrays):
+        """Publishes an event for every condition that changed since the previous observation."""
+        bus, state, step = self.bus, self._event_state, arrays.step
+        links = getattr(self.sim, 'links', ())
+        if state is None or state['size'] != arrays.size or state['links'] != len(links) or state['version'] != bus.version:
+            # (Re)build what is watched. Phases start from the current ones, watched queues and
+            # spillback from "below", so a condition that already holds fires once.
+            watches = [(arrays.index[i_id], LANES.index(approach), threshold, i_id, approach)
+                       for i_id, approach, threshold in bus.queue_watches() if i_id in arrays.index]
+            upstream = {}
+            for link in links:
+                if link.to_handle is not None:
+                    upstream[(link.to_handle, LANES.index(link.approach))] = link.from_id
+            fed = np.zeros((arrays.size, 4), dtype=bool)
+            for handle, lane in upstream:
+                fed[handle, lane] = True
+            state = self._event_state = {
+                'size': arrays.size,
+                'links': len(links),
+                'version': bus.version,
+                'phase': arrays.phase.copy(),
+                'watches': watches,
+                'watch_handles': np.array([w[0] for w in watches], dtype=np.intp),
+                'watch_lanes': np.array([w[1] for w in watches], dtype=np.intp),
+                'watch_thresholds': np.array([w[2] for w in watches], dtype=np.int64),
+                'watch_above': np.zeros(len(watches), dtype=bool),
+                'upstream': upstream,
+                'fed': fed,
+                'spilled': np.zeros((arrays.size, 4), dtype=bool)
+            }
+
+        if state['watches']:
+            above = arrays.queues[state['watch_handles'], state['watch_lanes']] > state['watch_thresholds']
+            for w in np.flatnonzero(above != state['watch_above']):
+                handle, lane, threshold, i_id, approach = state['watches'][w]
+                bus.publish({'type': QUEUE_CROSSING, 'intersection_id': i_id, 'step': step, 'approach': approach,
+                             'threshold': threshold, 'queue': int(arrays.queues[handle, lane]), 'above': bool(above[w])})
+            state['watch_above'] = above
+
+        changed = np.flatnonzero(arrays.phase != state['phase'])
+        if len(changed):
+            state['phase'][changed] = arrays.phase[changed]
+            if bus.has_subscribers(PHASE_CHANGE):
+                for handle in changed:
+                    queues = arrays.queues[handle]
+                    bus.publish({'type': PHASE_CHANGE, 'intersection_id': arrays.ids[handle], 'step': step,
+                                 'phase': PHASES[arrays.phase[handle]],
+                                 'queues': {LANES[lane]: int(queues[lane]) for lane in range(4)}})
+
+        if state['upstream']:
+            spilled = (arrays.queues > self.spillback_threshold) & state['fed']
+            for handle, lane in zip(*np.nonzero(spilled != state['spilled'])):
+                bus.publish({'type': SPILLBACK, 'intersection_id': arrays.ids[handle], 'step': step,
+                             'approach': LANES[lane], 'queue': int(arrays.queues[handle, lane]),
+                             'active': bool(spilled[handle, lane]), 'upstream': state['upstream'][(handle, lane)]})
+            state['spilled'] = spilled
+
+        if bus.has_subscribers(OBSERVATION):
+            bus.publish({'type': OBSERVATION, 'intersection_id': None, 'step': step, 'observations': arrays})
@@ -0,0 +1,211 @@
+import argparse
+import json
+import random
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+from montecarlo import DEFAULT_SCENARIO, run_replication, replication_seeds, confidence_interval
+
+# Searchable AI parameters: (name, low, high). The defaults are the Observer's and Controller's.
+AI_SPACE = [("critical_threshold", 5, 60), ("green_threshold", 1, 20), ("red_threshold", 2, 60)]
+AI_DEFAULTS = {"critical_threshold": 20, "green_threshold": 5, "red_threshold": 15}
+
+# Bounds of the TIMED plan of every intersection, in seconds
+GREEN_RANGE = (5, 90)
+OFFSET_RANGE = (0, 120)
+
+
+def search_space(scenario: Dict[str, Any], mode: str) -> List[Tuple[str, int, int]]:
+    """Integer parameters searched for a mode: AI thresholds, or per-intersection green splits and offsets."""
+    if mode == "AI":
+        return AI_SPACE
+    if mode == "TIMED":
+        space = []
+        for i in range(scenario["intersections"]):
+            intersection_id = f"I{i + 1}"
+            space += [(f"{intersection_id}.ns_green", *GREEN_RANGE), (f"{intersection_id}.ew_green", *GREEN_RANGE),
+                      (f"{intersection_id}.offset", *OFFSET_RANGE)]
+        return space
+    raise ValueError(f"Unknown mode {mode!r} (expected 'AI' or 'TIMED')")
+
+
+def default_params(scenario: Dict[str, Any], mode: str) -> Dict[str, int]:
+    """The configuration in use today: default thresholds, or the fixed green_duration timer."""
+    if mode == "AI":
+        return dict(AI_DEFAULTS)
+    params = {}
+    for name, _, _ in search_space(scenario, mode):
+        params[name] = 0 if name.endswith(".offset") else scenario["green_duration"]
+    return params
+
+
+def to_scenario(scenario: Dict[str, Any], mode: str, params: Dict[str, int]) -> Dict[str, Any]:
+    """The montecarlo scenario that runs a candidate configuration."""
+    if mode == "AI":
+        return {**scenario, "mode": "AI", "controller": params}
+    timing = {}
+    for name, value in params.items():
+        intersection_id, field = name.split(".")
+        timing.setdefault(intersection_id, [0, 0, 0])[("ns_green", "ew_green", "offset").index(field)] = value
+    return {**scenario, "mode": "TIMED", "timing": timing}
+
+
+def _sample(rng: random.Random, space, mean: Dict[str, float], std: Dict[str, float]) -> Dict[str, int]:
+    return {name: min(max(round(rng.gauss(mean[name], std[name])), low), high) for name, low, high in space}
+
+
+def _race(executor, scenario: Dict[str, Any], mode: str, candidates: List[Dict[str, int]], seeds: List[int],
+          metric: str, race_round: int, keep: int, confidence: float) -> Tuple[Dict[int, List[float]], int]:
+    """
+    Evaluates candidates on the shared seeds, race_round replications at a time. After each round,
+    a candidate is dropped when its paired difference to the current leader is positive (worse) at
+    the given confidence, as long as at least `keep` candidates remain. Returns ({candidate index:
+    costs by replication} for the candidates still running at the end, simulations run).
+    """
+    alive = list(range(len(candidates)))
+    costs = {c: [] for c in alive}
+    runs = 0
+    for start in range(0, len(seeds), race_round):
+        futures = {
+            (c, r): executor.submit(run_replication, to_scenario(scenario, mode, candidates[c]), seeds[r], r)
+            for c in alive for r in range(start, min(start + race_round, len(seeds)))
+        }
+        for (c, r), future in sorted(futures.items()):
+            costs[c].append(future.result()[metric])
+        runs += len(futures)
+
+        if len(costs[alive[0]]) < 2 or len(alive) <= keep:
+            continue
+        leader = min(alive, key=lambda c: statistics.fmean(costs[c]))
+        worse = {
+            c for c in alive if c != leader and
+            confidence_interval([a - b for a, b in zip(costs[c], costs[leader])], confidence)["ci_low"] > 0
+        }
+        # Never drop below `keep` candidates: drop the worst of the clearly worse ones first
+        droppable = sorted(worse, key=lambda c: statistics.fmean(costs[c]), reverse=True)[:len(alive) - keep]
+        alive = [c for c in alive if c not in droppable]
+    return {c: costs[c] for c in alive}, runs
+
+
+def optimize(scenario: Optional[Dict[str, Any]] = None, mode: str = "AI", generations: int = 6, population: int = 12,
+             elite_fraction: float = 0.25, replications: int = 6, race_round: int = 2, smoothing: float = 0.7,
+             metric: str = "avg_wait", master_seed: int = 0, max_workers: Optional[int] = None,
+             race_confidence: float = 0.8, confidence: float = 0.95, progress=None) -> Dict[str, Any]:
+    """
+    Cross-entropy search for the configuration of `mode` that minimizes `metric`:
+    AI thresholds (critical / green / red), or per-intersection TIMED green splits and offsets.
+
+    Every generation samples `population` candidates from independent Gaussians per parameter
+    (starting at the current defaults, which are also evaluated as the first candidate), runs them
+    in parallel on the same replication seeds (common random numbers, so candidates are compared on
+    identical traffic) and races them: candidates worse than the leader at race_confidence stop early.
+    The distribution then moves towards the elite. Returns the best configuration found with its
+    cost over all replications, the cost of the defaults, the simulations run and per-generation history.
+    """
+    scenario = {**DEFAULT_SCENARIO, **(scenario or {})}
+    space = search_space(scenario, mode)
+    seeds = replication_seeds(master_seed, replications)
+    rng = random.Random(master_seed)
+    defaults = default_params(scenario, mode)
+    mean = {name: float(defaults[name]) for name, _, _ in space}
+    std = {name: (high - low) / 4 for name, low, high in space}
+    keep = max(1, round(population * elite_fraction))
+
+    best = None
+    incumbent = None
+    history = []
+    total_runs = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for generation in range(generations):
+            candidates = [_sample(rng, space, mean, std) for _ in range(population)]
+            if generation == 0:
+                candidates[0] = defaults
+            finished, runs = _race(executor, scenario, mode, candidates, seeds, metric, race_round, keep, race_confidence)
+            total_runs += runs
+
+            ranked = sorted(finished, key=lambda c: statistics.fmean(finished[c]))
+            if generation == 0 and 0 in finished:
+                incumbent = confidence_interval(finished[0], confidence)
+            top = ranked[0]
+            top_cost = confidence_interval(finished[top], confidence)
+            if best is None or top_cost["mean"] < best["cost"]["mean"]:
+                best = {"params": candidates[top], "cost": top_cost}
+
+            elite = [candidates[c] for c in ranked[:keep]]
+            for name, _, _ in space:
+                values = [candidate[name] for candidate in elite]
+                mean[name] = smoothing * statistics.fmean(values) + (1 - smoothing) * mean[name]
+                spread = statistics.pstdev(values) if len(values) > 1 else 0.0
+                std[name] = smoothing * spread + (1 - smoothing) * std[name]
+
+            history.append({"generation": generation, "best": top_cost["mean"], "best_so_far": best["cost"]["mean"],
+                            "finished": len(finished), "simulations": runs})
+            if progress:
+                progress(history[-1], best)
+            if all(s < 0.5 for s in std.values()):
+                break  # the distribution has collapsed onto one integer configuration
+
+    return {
+        "mode": mode,
+        "metric": metric,
+        "params": best["params"],
+        "scenario": to_scenario(scenario, mode, best["params"]),
+        "cost": best["cost"],
+        "default_params": defaults,
+        "default_cost": incumbent,  # None if the defaults were dropped by the race
+        "simulations": total_runs,
+        "full_budget": len(history) * population * replications,
+        "history": history
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-entropy search for signal timing and controller parameters")
+    parser.add_argument("--mode", choices=["AI", "TIMED"], default="AI")
+    parser.add_argument("--generations", type=int, default=6)
+    parser.add_argument("--population", type=int, default=12)
+    parser.add_argument("--replications", type=int, default=6)
+    parser.add_argument("--race-round", type=int, default=2, help="replications between early-termination checks")
+    parser.add_argument("--race-confidence", type=float, default=0.8,
+                        help="confidence that a candidate is worse than the leader before it is dropped")
+    parser.add_argument("--metric", default="avg_wait", choices=["avg_wait", "avg_queue", "avg_cleared_wait"])
+    parser.add_argument("--seed", type=int, default=0, help="master seed")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--steps", type=int, default=300)
+    parser.add_argument("--intersections", type=int, default=DEFAULT_SCENARIO["intersections"])
+    parser.add_argument("--arrival-rate", type=float, default=DEFAULT_SCENARIO["arrival_rate"])
+    parser.add_argument("--green-duration", type=int, default=DEFAULT_SCENARIO["green_duration"])
+    parser.add_argument("--clearance-rate", type=float, default=DEFAULT_SCENARIO["clearance_rate"])
+    parser.add_argument("--output", help="write the result as JSON to this file")
+    args = parser.parse_args()
+
+    scenario = {
+        "intersections": args.intersections,
+        "arrival_rate": args.arrival_rate,
+        "green_duration": args.green_duration,
+        "clearance_rate": args.clearance_rate,
+        "steps": args.steps
+    }
+
+    def progress(entry, best):
+        print(f"Generation {entry['generation']}: best {entry['best']:.3f} (so far {entry['best_so_far']:.3f}), "
+              f"{entry['finished']} finished the race, {entry['simulations']} simulations")
+
+    result = optimize(scenario, args.mode, args.generations, args.population, replications=args.replications,
+                      race_round=args.race_round, metric=args.metric, master_seed=args.seed,
+                      race_confidence=args.race_confidence,
+                      max_workers=args.workers, progress=progress)
+
+    print(f"Best {args.mode} configuration: {result['params']}")
+    print(f"  {args.metric}: {result['cost']['mean']:.3f} (95% CI {result['cost']['ci_low']:.3f} .. {result['cost']['ci_high']:.3f})")
+    if result["default_cost"]:
+        print(f"  defaults {result['default_params']}: {result['default_cost']['mean']:.3f}")
+    print(f"  {result['simulations']} simulations (full budget without early termination: {result['full_budget']})")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
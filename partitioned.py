@@ -0,0 +1,233 @@
+import bisect
+import multiprocessing
+import traceback
+from multiprocessing import shared_memory
+from typing import Dict, Any, List, Optional
+
+from traffic_simulator import TrafficSimulator, Intersection
+from observer_agent import ObserverAgent
+from controller_agent import ControllerAgent
+from coordinator_agent import CoordinatorAgent
+
+
+def network_spec(sim: TrafficSimulator) -> Dict[str, Any]:
+    """Picklable description of a fresh simulator's intersections and links, used to rebuild its partitions in workers."""
+    if sim.current_time != 0 or sim.event_driven:
+        raise ValueError("Partitioning needs a fixed-tick simulator that has not been stepped yet")
+    return {
+        "seed": sim.seed,
+        "arrival_rate": sim.arrival_rate,
+        "demand": sim.demand,
+        "intersections": [
+            {
+                "intersection_id": i.intersection_id,
+                "green_duration": i.green_duration,
+                "clearance_rate": i.clearance_rate,
+                "manual_control": i.manual_control
+            }
+            for i in sim.intersections
+        ],
+        "links": [(link.from_id, link.to_id, link.approach, link.travel_time) for link in sim.links]
+    }
+
+
+def partition_bounds(intersections: int, partitions: int) -> List[int]:
+    """
+    Splits intersection handles into `partitions` contiguous ranges: partition k owns handles
+    bounds[k] to bounds[k + 1] - 1. build_grid registers intersections row by row, so on a grid
+    these are horizontal stripes and only the links between neighbouring stripes cross partitions.
+    """
+    return [intersections * k // partitions for k in range(partitions + 1)]
+
+
+def _run_partition(spec: Dict[str, Any], bounds: List[int], part: int, shm_name: str, slots: int,
+                   barrier, conn, mode: Optional[str]):
+    """Worker process: simulates one partition (and its agents) in lockstep with the others."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    counts = shm.buf.cast('i')
+    try:
+        index = {config["intersection_id"]: handle for handle, config in enumerate(spec["intersections"])}
+
+        def owner(intersection_id):
+            return bisect.bisect_right(bounds, index[intersection_id]) - 1
+
+        sim = TrafficSimulator(seed=spec["seed"])
+        sim.arrival_rate = spec["arrival_rate"]
+        for config in spec["intersections"][bounds[part]:bounds[part + 1]]:
+            sim.add_intersection(Intersection(**config))
+
+        # Boundary links are numbered in spec order; slot s of each half of the shared buffer
+        # carries the vehicles that entered boundary link s during a step. The last slot of each
+        # half relays I1's north queue for the coordinator's I1/I2 rule (networks without links).
+        outgoing, incoming = [], []
+        slot = 0
+        for from_id, to_id, approach, travel_time in spec["links"]:
+            from_part, to_part = owner(from_id), owner(to_id)
+            if from_part == to_part:
+                if from_part == part:
+                    sim.add_link(from_id, to_id, approach, travel_time)
+                continue
+            if from_part == part:
+                outgoing.append((slot, sim.add_boundary_link(from_id, to_id, approach, travel_time)))
+            elif to_part == part:
+                incoming.append((slot, sim.add_boundary_link(from_id, to_id, approach, travel_time)))
+            slot += 1
+        half = slots + 1
+        if spec["demand"] is not None:
+            sim.set_demand(spec["demand"])
+
+        observer = ObserverAgent(sim)
+        controller = ControllerAgent(sim)
+        coordinator = CoordinatorAgent(controller)
+        network = bool(spec["links"])
+        # I1 and I2 may be owned by different partitions: I1's owner publishes the queue the rule
+        # reads and I2's owner applies it, so no partition touches another one's intersections
+        pair = mode == "AI" and not network and "I1" in index
+        relay_from = pair and owner("I1") == part
+        relay_to = pair and "I2" in index and owner("I2") == part
+        conn.send(("ready", None))
+
+        while True:
+            command, arg = conn.recv()
+            if command == "run":
+                for _ in range(arg):
+                    sim.step()
+                    t = sim.current_time
+                    # Double-buffered by step parity: a partition can't come back to this half
+                    # before every partition has passed the next barrier, i.e. finished reading it.
+                    offset = (t % 2) * half
+                    for s, link in outgoing:
+                        counts[offset + s] = link.pop(t)
+                    if relay_from and t % 5 == 0:
+                        counts[offset + slots] = sim.get_intersection("I1").north_queue
+                    barrier.wait()
+                    for s, link in incoming:
+                        if counts[offset + s]:
+                            link.push(t, counts[offset + s])
+
+                    # Same sequence as a single-process run; every input is local to the partition
+                    if mode == "AI":
+                        observations = observer.observe(t)
+                        if t % 5 == 0:
+                            if network:
+                                coordinator.coordinate_network(observations)
+                            elif relay_to:
+                                coordinator.coordinate_pair(counts[offset + slots])
+                        controller.decide_many(observations)
+                    elif mode == "BASELINE":
+                        for intersection in sim.intersections:
+                            if intersection.phase_timer >= intersection.green_duration:
+                                intersection.switch_light()
+                conn.send(("ok", sim.current_time))
+            elif command == "states":
+                conn.send(("ok", {i.intersection_id: i.get_state(sim.current_time) for i in sim.intersections}))
+            elif command == "links":
+                conn.send(("ok", [link.get_state(sim.current_time) for link in sim.links if link.to_handle is not None]))
+            else:
+                break
+    except Exception:
+        barrier.abort()  # release partitions waiting on this one
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        counts.release()
+        shm.close()
+        conn.close()
+
+
+class PartitionedExecutor:
+    """
+    Steps a linked network of fixed-tick intersections across worker processes.
+
+    The intersections are split into `partitions` contiguous ranges (see partition_bounds), each
+    simulated by one process together with its own Observer/Controller/Coordinator. After every
+    step, partitions exchange only the number of vehicles that entered each link crossing a
+    partition boundary, through a shared-memory buffer and a barrier. Links have a travel time of
+    at least one second, so a step never depends on another partition's current step. Without
+    links, the coordinator's I1/I2 rule is relayed the same way: I1's partition publishes I1's north
+    queue after each step and I2's partition applies the rule to it.
+
+    Each intersection draws from its own substream of the simulator's seed (TrafficSimulator.seed),
+    so for a given seed the results are identical for any partition count, and identical to stepping the
+    original simulator in a single process with the same agent sequence.
+    """
+
+    def __init__(self, sim: TrafficSimulator, partitions: int, mode: Optional[str] = "AI"):
+        if mode not in ("AI", "BASELINE", None):
+            raise ValueError(f"Unknown mode {mode!r}")
+        spec = network_spec(sim)
+        partitions = max(1, min(partitions, len(spec["intersections"])))
+        self.partitions = partitions
+        self.bounds = partition_bounds(len(spec["intersections"]), partitions)
+        self.current_time = 0
+
+        index = {config["intersection_id"]: handle for handle, config in enumerate(spec["intersections"])}
+        owners = [bisect.bisect_right(self.bounds, h) - 1 for h in range(len(index))]
+        self.boundary_links = sum(1 for from_id, to_id, _, _ in spec["links"] if owners[index[from_id]] != owners[index[to_id]])
+
+        self._shm = shared_memory.SharedMemory(create=True, size=2 * (self.boundary_links + 1) * 4)
+        barrier = multiprocessing.Barrier(partitions)
+        self._conns = []
+        self._workers = []
+        for part in range(partitions):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=_run_partition, daemon=True,
+                                             args=(spec, self.bounds, part, self._shm.name, self.boundary_links,
+                                                   barrier, child_conn, mode))
+            worker.start()
+            child_conn.close()
+            self._conns.append(parent_conn)
+            self._workers.append(worker)
+        self._collect()
+
+    def _collect(self) -> List[Any]:
+        """Waits for every partition's reply; raises if any of them failed."""
+        replies = [conn.recv() for conn in self._conns]
+        errors = [payload for status, payload in replies if status == "error"]
+        if errors:
+            self.close()
+            raise RuntimeError(f"Partition worker failed:\n{errors[0]}")
+        return [payload for _, payload in replies]
+
+    def _broadcast(self, command: str, arg=None) -> List[Any]:
+        for conn in self._conns:
+            conn.send((command, arg))
+        return self._collect()
+
+    def run(self, steps: int):
+        self.current_time = self._broadcast("run", steps)[0]
+
+    def get_states(self) -> Dict[str, Dict]:
+        """Per-intersection state (as Intersection.get_state) for the whole network."""
+        states = {}
+        for partition_states in self._broadcast("states"):
+            states.update(partition_states)
+        return states
+
+    def get_link_states(self) -> List[Dict]:
+        """State of every link (as Link.get_state), reported by the partition of its downstream end."""
+        return [state for partition_links in self._broadcast("links") for state in partition_links]
+
+    def close(self):
+        for conn in self._conns:
+            try:
+                conn.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+        for worker in self._workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        for conn in self._conns:
+            conn.close()
+        self._conns = []
+        self._workers = []
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,210 @@
+import argparse
+import random
+import time
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from traffic_simulator import TrafficSimulator, Intersection
+from vectorized_simulator import VectorizedTrafficSimulator
+from observer_agent import ObserverAgent
+from montecarlo import DEFAULT_SCENARIO
+
+# Action per intersection: index into ACTIONS, passed on to execute_signal_change
+ACTIONS = ("HOLD", "SWITCH")
+
+# Observation features per intersection: queue lengths (N, E, S, W), average waits of the queued
+# vehicles (N, E, S, W), CRITICAL flags (N, E, S, W), phase (0 = NS_GREEN, 1 = EW_GREEN), phase timer
+FEATURES = ("queue_N", "queue_E", "queue_S", "queue_W", "wait_N", "wait_E", "wait_S", "wait_W",
+            "critical_N", "critical_E", "critical_S", "critical_W", "phase", "phase_timer")
+
+
+def _fill_observation(obs, arrays, phase_timer):
+    """Copies the Observer's arrays into an observation array (..., n, len(FEATURES))."""
+    obs[..., 0:4] = arrays.queues.reshape(obs.shape[:-1] + (4,))
+    obs[..., 4:8] = arrays.wait.reshape(obs.shape[:-1] + (4,))
+    obs[..., 8:12] = arrays.critical.reshape(obs.shape[:-1] + (4,))
+    obs[..., 12] = arrays.phase.reshape(obs.shape[:-1])
+    obs[..., 13] = phase_timer.reshape(obs.shape[:-1])
+
+
+class TrafficEnv:
+    """
+    Gym-style environment around a TrafficSimulator (same reset/step signatures and return values as
+    the Gymnasium API, without depending on it). The scenario keys are those of montecarlo.py.
+
+    Observation: float32 array (intersections, len(FEATURES)) built from the ObserverAgent's
+    observe_arrays. Action: one index into ACTIONS per intersection (a plain int is accepted for
+    a single intersection), executed with execute_signal_change. Reward: minus the vehicle-seconds
+    of delay during the step, i.e. the number of queued vehicles summed over the simulated seconds.
+    An episode is truncated after scenario["steps"] seconds; it never terminates.
+    """
+
+    def __init__(self, scenario: Optional[Dict[str, Any]] = None, decision_interval: int = 1,
+                 critical_threshold: int = 20, seed: Optional[int] = None):
+        self.scenario = {**DEFAULT_SCENARIO, **(scenario or {})}
+        self.decision_interval = decision_interval
+        self.critical_threshold = critical_threshold
+        self.max_steps = self.scenario["steps"]
+        self.observation_shape = (self.scenario["intersections"], len(FEATURES))
+        self.sim: Optional[TrafficSimulator] = None
+        self.observer: Optional[ObserverAgent] = None
+        self._seeds = random.Random(seed)  # episode seeds when reset() is not given one
+
+    def reset(self, seed: Optional[int] = None, options: Optional[Dict[str, Any]] = None):
+        """Starts a new episode. Returns (observation, info)."""
+        if seed is not None:
+            self._seeds.seed(seed)
+        self.sim = TrafficSimulator(seed=self._seeds.getrandbits(63))
+        self.sim.arrival_rate = self.scenario["arrival_rate"]
+        for i in range(self.scenario["intersections"]):
+            self.sim.add_intersection(Intersection(f"I{i + 1}", green_duration=self.scenario["green_duration"],
+                                                   clearance_rate=self.scenario["clearance_rate"], manual_control=True))
+        self.observer = ObserverAgent(self.sim, critical_threshold=self.critical_threshold)
+        self._ids = [intersection.intersection_id for intersection in self.sim.intersections]
+        self._obs = np.zeros(self.observation_shape, dtype=np.float32)
+        self._phase_timer = np.zeros(self.observation_shape[0], dtype=np.int64)
+        return self._observe(), {"seed": self.sim.seed}
+
+    def _observe(self):
+        arrays = self.observer.observe_arrays(self.sim.current_time)
+        for handle, intersection in enumerate(self.sim.intersections):
+            self._phase_timer[handle] = intersection.phase_timer
+        _fill_observation(self._obs, arrays, self._phase_timer)
+        return self._obs.copy()
+
+    def step(self, action) -> Tuple[Any, float, bool, bool, Dict[str, Any]]:
+        """Applies one action per intersection and advances decision_interval seconds."""
+        if self.sim is None:
+            raise RuntimeError("Call reset() before step()")
+        for intersection_id, a in zip(self._ids, np.atleast_1d(action).tolist()):
+            if a:
+                self.sim.execute_signal_change(intersection_id, ACTIONS[a])
+
+        delay = 0
+        for _ in range(self.decision_interval):
+            self.sim.step()
+            delay += sum(lane.queued for intersection in self.sim.intersections
+                         for lane in intersection.approaches.values())
+        truncated = self.sim.current_time >= self.max_steps
+        return self._observe(), float(-delay), False, truncated, {"time": self.sim.current_time}
+
+
+class VectorTrafficEnv:
+    """
+    num_envs independent copies of a scenario stepped in lockstep, for policy training.
+
+    All copies live in one VectorizedTrafficSimulator (environment e owns the intersection rows
+    e * intersections .. (e + 1) * intersections - 1), so a step is a few NumPy operations over
+    every environment instead of a Python loop. Observations have shape (num_envs, intersections,
+    len(FEATURES)), actions (num_envs, intersections) and rewards (num_envs,), with the same
+    meaning as in TrafficEnv.
+
+    Environments whose episode ends are reset automatically: step() returns the first observation
+    of the new episode for them and their last observation in info["final_observation"].
+    """
+
+    def __init__(self, num_envs: int, scenario: Optional[Dict[str, Any]] = None, decision_interval: int = 1,
+                 critical_threshold: int = 20, seed: Optional[int] = None):
+        self.num_envs = num_envs
+        self.scenario = {**DEFAULT_SCENARIO, **(scenario or {})}
+        self.decision_interval = decision_interval
+        self.critical_threshold = critical_threshold
+        self.max_steps = self.scenario["steps"]
+        self.observation_shape = (num_envs, self.scenario["intersections"], len(FEATURES))
+        self.sim: Optional[VectorizedTrafficSimulator] = None
+        self.observer: Optional[ObserverAgent] = None
+        self._seeds = random.Random(seed)
+
+    def reset(self, seed: Optional[int] = None, options: Optional[Dict[str, Any]] = None):
+        """Starts a new episode in every environment. Returns (observations, info)."""
+        if seed is not None:
+            self._seeds.seed(seed)
+        episode_seed = self._seeds.getrandbits(63)
+        per_env = self.scenario["intersections"]
+        self.sim = VectorizedTrafficSimulator(seed=episode_seed, capacity=self.num_envs * per_env)
+        self.sim.arrival_rate = self.scenario["arrival_rate"]
+        for e in range(self.num_envs):
+            for i in range(per_env):
+                self.sim.add_intersection(intersection_id=f"E{e}.I{i + 1}", green_duration=self.scenario["green_duration"],
+                                          clearance_rate=self.scenario["clearance_rate"], manual_control=True)
+        self.observer = ObserverAgent(self.sim, critical_threshold=self.critical_threshold)
+        self.elapsed = np.zeros(self.num_envs, dtype=np.int64)  # seconds into each environment's episode
+        return self._observe(), {"seed": episode_seed}
+
+    def _observe(self):
+        arrays = self.observer.observe_arrays(self.sim.current_time)
+        obs = np.empty(self.observation_shape, dtype=np.float32)
+        _fill_observation(obs, arrays, self.sim.phase_timer[:self.sim.size])
+        return obs
+
+    def step(self, actions):
+        """
+        Applies actions (num_envs, intersections) of ACTIONS indices and advances every environment
+        decision_interval seconds. Returns (observations, rewards, terminated, truncated, info).
+        """
+        if self.sim is None:
+            raise RuntimeError("Call reset() before step()")
+        actions = np.asarray(actions).reshape(-1)
+        self.sim.execute_signal_switches(np.flatnonzero(actions == ACTIONS.index("SWITCH")))
+
+        n = self.sim.size
+        delay = np.zeros(self.num_envs, dtype=np.int64)
+        for _ in range(self.decision_interval):
+            self.sim.step()
+            delay += self.sim.queue[:n].reshape(self.num_envs, -1).sum(axis=1)
+        self.elapsed += self.decision_interval
+
+        obs = self._observe()
+        rewards = (-delay).astype(np.float64)
+        terminated = np.zeros(self.num_envs, dtype=bool)
+        truncated = self.elapsed >= self.max_steps
+        info = {}
+        if truncated.any():
+            info["final_observation"] = obs.copy()
+            info["_final_observation"] = truncated.copy()
+            self.reset_envs(np.flatnonzero(truncated))
+            obs[truncated] = 0.0  # a reset environment is empty, in NS_GREEN, at phase timer 0
+        return obs, rewards, terminated, truncated, info
+
+    def reset_envs(self, envs):
+        """Restarts the episodes of the given environment indices (their next observation is all zeros)."""
+        envs = np.asarray(envs, dtype=np.intp)
+        per_env = self.scenario["intersections"]
+        rows = (envs[:, None] * per_env + np.arange(per_env)).reshape(-1)
+        self.sim.reset_intersections(rows)
+        if self.observer.arrays is not None:
+            self.observer.arrays.critical[rows] = False
+        self.elapsed[envs] = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures environment steps per second with random actions")
+    parser.add_argument("--envs", type=int, default=1024, help="environments of the vectorized variant")
+    parser.add_argument("--intersections", type=int, default=DEFAULT_SCENARIO["intersections"])
+    parser.add_argument("--steps", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    scenario = {"intersections": args.intersections, "steps": args.steps}
+    rng = np.random.default_rng(args.seed)
+
+    env = TrafficEnv(scenario, seed=args.seed)
+    env.reset()
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        env.step(rng.integers(0, len(ACTIONS), args.intersections))
+    elapsed = time.perf_counter() - start
+    print(f"TrafficEnv: {args.steps / elapsed:,.0f} env-steps/s")
+
+    vec_env = VectorTrafficEnv(args.envs, scenario, seed=args.seed)
+    vec_env.reset()
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        vec_env.step(rng.integers(0, len(ACTIONS), (args.envs, args.intersections)))
+    elapsed = time.perf_counter() - start
+    print(f"VectorTrafficEnv ({args.envs} envs): {args.steps * args.envs / elapsed:,.0f} env-steps/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import math
+import threading
+import time
+from typing import Dict, Any, Optional
+
+CLOCK_MODES = ('realtime', 'speedup', 'max')
+
+
+class SimulationClock:
+    """
+    Paces a simulation loop independently of how often the UI is updated.
+
+    Modes:
+        realtime - one simulated second per wall-clock second
+        speedup  - `speed` simulated seconds per wall-clock second (N x real time)
+        max      - as fast as the simulator can go
+
+    A driver (the SessionManager's dispatcher) asks seconds_until_due() when the next batch is due
+    and take_batch() how many steps to run in it before the next UI update, then feeds the batch's
+    wall time back with record(). At most `ui_rate` batches are produced per second, so faster
+    speeds run several steps per update instead of publishing every step.
+    """
+
+    def __init__(self, mode: str = 'speedup', speed: float = 10.0, ui_rate: float = 10.0, max_batch: int = 10000):
+        self.mode = 'speedup'
+        self.speed = 10.0
+        self.ui_rate = ui_rate
+        self.max_batch = max_batch
+        self._running = threading.Event()
+        self._next_due = time.monotonic()
+        self._step_time: Optional[float] = None  # moving average of wall seconds per step
+        self.configure(mode, speed)
+
+    @property
+    def running(self) -> bool:
+        return self._running.is_set()
+
+    def start(self):
+        self._next_due = time.monotonic()
+        self._running.set()
+
+    def stop(self):
+        self._running.clear()
+
+    def configure(self, mode: str, speed: Optional[float] = None):
+        if mode not in CLOCK_MODES:
+            raise ValueError(f"Unknown clock mode {mode!r}, expected one of {CLOCK_MODES}")
+        if speed is not None:
+            if isinstance(speed, bool) or not isinstance(speed, (int, float)) or not 0 < speed < math.inf:
+                raise ValueError("speed must be a positive number")
+            self.speed = float(speed)
+        self.mode = mode
+        self._next_due = time.monotonic()
+
+    def steps_per_second(self) -> float:
+        if self.mode == 'realtime':
+            return 1.0
+        if self.mode == 'speedup':
+            return self.speed
+        return math.inf
+
+    def seconds_until_due(self) -> Optional[float]:
+        """Time until the next batch may run (0 if due now), or None while stopped."""
+        if not self.running:
+            return None
+        if self.mode == 'max':
+            return 0.0
+        return max(0.0, self._next_due - time.monotonic())
+
+    def take_batch(self) -> int:
+        """Returns the batch size if one is due now and schedules the following one, else 0."""
+        if not self.running:
+            return 0
+        if self.mode == 'max':
+            if self._step_time is None:
+                return 1
+            return max(1, min(self.max_batch, int(1 / self.ui_rate / max(self._step_time, 1e-9))))
+
+        now = time.monotonic()
+        if now < self._next_due:
+            return 0
+        rate = self.steps_per_second()
+        batch = max(1, min(self.max_batch, math.ceil(rate / self.ui_rate)))
+        # Schedule the following batch; if the simulator can't keep up, don't try to catch up in a burst
+        self._next_due = max(self._next_due + batch / rate, now)
+        return batch
+
+    def record(self, steps: int, elapsed: float):
+        """Feeds back how long a batch took, used to size batches in 'max' mode."""
+        if steps <= 0:
+            return
+        per_step = elapsed / steps
+        self._step_time = per_step if self._step_time is None else 0.8 * self._step_time + 0.2 * per_step
+
+    def describe(self) -> Dict[str, Any]:
+        steps_per_second = self.steps_per_second()
+        return {
+            "mode": self.mode,
+            "speed": self.speed,
+            "steps_per_second": None if math.isinf(steps_per_second) else steps_per_second
+        }
@@ -1,158 +1,179 @@
-from flask import Flask, render_template, jsonify, request
-import threading
-import time
-import json
-import queue
-from traffic_simulator import TrafficSimulator, Intersection
+from flask import Flask, render_template, jsonify, request, Response
+import os
+from traffic_simulator import TrafficSimulator
 from observer_agent import ObserverAgent
 from controller_agent import ControllerAgent
 from coordinator_agent import CoordinatorAgent
+from logger import SimulationLogger
+from instrumentation import profiler
+from state_stream import format_sse
+from sessions import SessionManager, SimulationSession, SessionError
 
 app = Flask(__name__)
 
-# Global State
-simulation_state = {
-    "running": False,
-    "mode": "AI", # "AI" or "BASELINE"
-    "step": 0,
-    "intersections": {},
-    "history": [],
-    "logs": []
-}
-
-sim_lock = threading.Lock()
-sim_thread = None
-
-# Agents & Sim
-sim = None
-observer = None
-controller = None
-coordinator = None
-
-# --- Simulation Setup ---
-def init_simulation():
-    global sim, observer, controller, coordinator
-    sim = TrafficSimulator()
-    
-    # Create Intersections
-    # Manual control is True so agents can switch lights. 
-    # In Baseline mode, we might want auto-switch or manual switch by timer.
-    i1 = Intersection("I1", green_duration=30, manual_control=True)
-    i2 = Intersection("I2", green_duration=30, manual_control=True)
-    sim.add_intersection(i1)
-    sim.add_intersection(i2)
-    
-    # Initialize Agents
-    observer = ObserverAgent(sim)
-    controller = ControllerAgent(sim)
-    coordinator = CoordinatorAgent(controller)
-    
-    # Reset state
-    simulation_state["step"] = 0
-    simulation_state["intersections"] = {}
-    simulation_state["history"] = []
-    simulation_state["logs"] = []
-
-# Initialize once
-init_simulation()
-
-# --- Simulation Loop ---
-def run_simulation_loop():
-    while True:
-        if simulation_state["running"]:
-            with sim_lock:
-                # 1. Start Step (Add random cars)
-                sim.step()
-                simulation_state["step"] = sim.current_time
-                
-                # Inject traffic (Scenario)
-                if sim.current_time % 10 == 0:
-                    sim.intersections[0].add_vehicle('N', sim.current_time)
-                    sim.intersections[0].add_vehicle('N', sim.current_time)
-
-                # 2. Observe Step & 3. Decide Step
-                if simulation_state["mode"] == "AI":
-                    # Observer
-                    observations = observer.observe(sim.current_time)
-                    
-                    # Coordinator (Every 5 steps)
-                    if sim.current_time % 5 == 0:
-                        coordinator.coordinate(observations)
-                    
-                    # Controller (Decide for each intersection)
-                    for i_id, obs in observations.items():
-                        decision_data = controller.decide(obs)
-                        
-                        # Log Decision
-                        log_entry = {
-                            "step": sim.current_time,
-                            "agent": f"Controller_{i_id}",
-                            "observation": decision_data['observation'],
-                            "decision": decision_data['decision'],
-                            "reasoning": decision_data['reasoning']
-                        }
-                        simulation_state["logs"].append(log_entry)
-                        if len(simulation_state["logs"]) > 100:
-                            simulation_state["logs"].pop(0)
-
-                elif simulation_state["mode"] == "BASELINE":
-                    # Static Timer Logic
-                    # Switch every 30 seconds
-                    for intersection in sim.intersections:
-                        # We used manual_control=True, so we must switch manually
-                        if intersection.phase_timer >= 30:
-                            intersection.switch_light()
-                            
-                # 4. Metric Step (Update State for UI)
-                for intersection in sim.intersections:
-                    state = intersection.get_state(sim.current_time)
-                    simulation_state["intersections"][intersection.intersection_id] = state
-                    
-                    # History for Chart (I1 only for simplicity)
-                    if intersection.intersection_id == "I1":
-                        simulation_state["history"].append({
-                            "step": sim.current_time,
-                            "avg_wait": state['avg_waiting_time'],
-                            "total_queue": sum(state['queues'].values())
-                        })
-                        if len(simulation_state["history"]) > 100:
-                            simulation_state["history"].pop(0)
-                            
-        time.sleep(0.1) # 10 steps per second max
-
-# Start Background Thread
-sim_thread = threading.Thread(target=run_simulation_loop, daemon=True)
-sim_thread.start()
+# Sessions: independent scenarios stepped by a shared worker pool.
+# The dashboard and the unprefixed /api/* routes use the pinned "default" session.
+DEFAULT_SESSION = "default"
+manager = SessionManager(
+    max_sessions=int(os.environ.get("GREENFLOW_MAX_SESSIONS", 16)),
+    max_workers=int(os.environ.get("GREENFLOW_WORKERS", 4)),
+    idle_timeout=float(os.environ.get("GREENFLOW_IDLE_TIMEOUT", 1800))
+)
+manager.create(session_id=DEFAULT_SESSION, pinned=True)
+
+# Hot-path timers (no-ops unless profiling is enabled). Instrumented on the classes so that
+# every session's simulator and agents are covered.
+profiler.instrument(TrafficSimulator, 'step', 'sim.step')
+profiler.instrument(ObserverAgent, 'observe_arrays', 'observer.observe')  # includes the handlers of the events it publishes
+profiler.instrument(CoordinatorAgent, 'on_event', 'coordinator.coordinate')
+profiler.instrument(ControllerAgent, 'decide_batch', 'controller.decide')
+profiler.instrument(SimulationLogger, 'log_step', 'logger.log_step')
+profiler.instrument(SimulationSession, 'update_dashboard_state', 'metrics.snapshot')
+if os.environ.get("GREENFLOW_PROFILE"):
+    profiler.enable()
+
+@app.errorhandler(SessionError)
+def handle_session_error(e):
+    return jsonify({"status": "error", "message": str(e)}), e.status
 
 # --- Routes ---
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def state_response(session: SimulationSession):
+    snapshot = session.snapshot
+    # Unchanged since the client's copy: no serialization, no body
+    if request.if_none_match.contains(snapshot.etag):
+        response = Response(status=304)
+    else:
+        response = Response(snapshot.payload, mimetype='application/json')
+    response.set_etag(snapshot.etag)
+    response.headers['X-Sim-Step'] = str(snapshot.step)
+    return response
+
+def stream_response(session: SimulationSession):
+    """
+    Server-Sent Events push channel. Sends a full 'snapshot' event first, then one delta per batch
+    (changed intersections, history points of every intersection for the batch's steps, new log
+    entries), each with "epoch:seq" as the event id. Reconnecting clients send Last-Event-ID and
+    receive only the deltas they missed; an id from another epoch (e.g. before a server restart)
+    gets a fresh snapshot.
+    """
+    broadcaster = session.broadcaster
+    last_seq = broadcaster.parse_event_id(request.headers.get('Last-Event-ID') or request.args.get('since'))
+
+    def generate(last_seq):
+        while not session.closed:
+            session.touch()  # an open stream keeps the session alive
+            deltas = broadcaster.wait(last_seq, timeout=15) if last_seq is not None else None
+            if deltas is None:
+                snapshot = session.snapshot
+                last_seq = snapshot.seq
+                yield format_sse(snapshot.payload.decode(), event="snapshot", event_id=broadcaster.event_id(last_seq))
+            elif not deltas:
+                yield ": keep-alive\n\n"
+            else:
+                for seq, payload in deltas:
+                    yield format_sse(payload, event_id=broadcaster.event_id(seq))
+                last_seq = deltas[-1][0]
+
+    return Response(generate(last_seq), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def control_response(session: SimulationSession):
+    data = request.json
+    action = data.get('action')
+    session.control(action, data)
+    manager.wake()
+
+    return jsonify({"status": "ok", "running": session.state["running"], "mode": session.state["mode"]})
+
+def history_response(session: SimulationSession):
+    """
+    History of one intersection from the session's time-series store. Query parameters:
+    intersection (default: the first), start / end (simulation seconds), resolution (1, 10 or 60)
+    and max_points (at most sessions.MAX_HISTORY_POINTS).
+    """
+    args = {}
+    for name in ('start', 'end', 'resolution', 'max_points'):
+        if name in request.args:
+            args[name] = request.args.get(name, type=int)
+            if args[name] is None:
+                raise SessionError(f"{name} must be an integer")
+    return jsonify(session.query_history(request.args.get('intersection'), **args))
+
 @app.route('/api/state')
 def get_state():
-    return jsonify(simulation_state)
+    return state_response(manager.get(DEFAULT_SESSION))
+
+@app.route('/api/stream')
+def stream_state():
+    return stream_response(manager.get(DEFAULT_SESSION))
+
+@app.route('/api/history')
+def get_history():
+    return history_response(manager.get(DEFAULT_SESSION))
 
 @app.route('/api/control', methods=['POST'])
 def control():
-    data = request.json
-    action = data.get('action')
-    
-    if action == 'start':
-        simulation_state["running"] = True
-    elif action == 'stop':
-        simulation_state["running"] = False
-    elif action == 'reset':
-        with sim_lock:
-            init_simulation()
-            simulation_state["running"] = False
-    elif action == 'set_mode':
-        mode = data.get('mode')
-        if mode in ['AI', 'BASELINE']:
-            simulation_state["mode"] = mode
-            # Reset on mode change? Maybe better to let user reset.
-            
-    return jsonify({"status": "ok", "running": simulation_state["running"], "mode": simulation_state["mode"]})
+    return control_response(manager.get(DEFAULT_SESSION))
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Per-phase latency histograms of the simulation loop (all sessions)."""
+    return jsonify(profiler.snapshot())
+
+@app.route('/api/metrics', methods=['POST'])
+def configure_metrics():
+    """Turns the process-wide profiler on or off. Body: {"enabled": true|false, "reset": true|false}."""
+    data = request.get_json(silent=True) or {}
+    if 'enabled' in data:
+        if data['enabled']:
+            profiler.enable()
+        else:
+            profiler.disable()
+    if data.get('reset'):
+        profiler.reset()
+    return jsonify(profiler.snapshot())
+
+# --- Session API ---
+@app.route('/api/sessions', methods=['GET'])
+def list_sessions():
+    return jsonify(manager.list())
+
+@app.route('/api/sessions', methods=['POST'])
+def create_session():
+    """Creates a session. Body: scenario config (see sessions.DEFAULT_CONFIG), e.g. {"intersections": 4, "seed": 7}."""
+    session = manager.create(request.get_json(silent=True) or {})
+    return jsonify(session.describe()), 201
+
+@app.route('/api/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    return jsonify(manager.get(session_id).describe())
+
+@app.route('/api/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    if session_id == DEFAULT_SESSION:
+        raise SessionError("The default session cannot be deleted", 403)
+    manager.delete(session_id)
+    return jsonify({"status": "ok"})
+
+@app.route('/api/sessions/<session_id>/state')
+def get_session_state(session_id):
+    return state_response(manager.get(session_id))
+
+@app.route('/api/sessions/<session_id>/stream')
+def stream_session_state(session_id):
+    return stream_response(manager.get(session_id))
+
+@app.route('/api/sessions/<session_id>/history')
+def get_session_history(session_id):
+    return history_response(manager.get(session_id))
+
+@app.route('/api/sessions/<session_id>/control', methods=['POST'])
+def control_session(session_id):
+    return control_response(manager.get(session_id))
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000, use_reloader=False)
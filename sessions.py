@@ -0,0 +1,501 @@
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from traffic_simulator import TrafficSimulator, Intersection
+from demand import DemandProfile
+from observer_agent import ObserverAgent
+from controller_agent import ControllerAgent
+from coordinator_agent import CoordinatorAgent
+from event_bus import EventBus
+from state_stream import StateBroadcaster, make_snapshot
+from timeseries import TimeSeriesStore, DEFAULT_MAX_POINTS, history_nbytes
+from scheduler import SimulationClock
+
+# Scenario configuration of a session. Missing keys fall back to these values.
+DEFAULT_CONFIG = {
+    "intersections": 2,
+    "green_duration": 30,
+    "clearance_rate": 0.5,
+    "arrival_rate": 0.1,
+    "mode": "AI",  # "AI" or "BASELINE"
+    "seed": None,
+    # Time-of-day arrival rates per lane (demand.DemandProfile arguments; None for arrival_rate everywhere).
+    # The default makes I1's N approach the busy one (0.3 vehicles/s) for the agents to react to.
+    "demand": {"lanes": {"I1.N": 0.3}},
+    "clock_mode": "speedup",
+    "speed": 10.0
+}
+
+logger = logging.getLogger(__name__)
+
+MAX_HISTORY_POINTS = 2000  # cap on the points of one history response
+MAX_LOGS = 100  # decision log entries kept for the dashboard
+RECENT_HISTORY_POINTS = 100  # newest history points of the first intersection kept in the /api/state snapshot
+MAX_DELTA_HISTORY_STEPS = 60  # steps of history points a stream delta carries; clients reload after larger batches
+
+# Rough per-object costs used to estimate a session's memory footprint
+BYTES_PER_QUEUED_VEHICLE = 8  # long queues store 4-byte arrival times (see Lane)
+BYTES_PER_INTERSECTION = 8 * 1024  # simulator and agent state; the dashboard history is counted exactly
+
+
+class SessionError(Exception):
+    """Raised for session API misuse; carries the HTTP status to return."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def _check_number(config: Dict[str, Any], key: str, low: float, high: float = math.inf, integer: bool = False):
+    """Raises SessionError unless config[key] is a number (an integer if `integer`) with low <= value <= high."""
+    value = config[key]
+    kinds = int if integer else (int, float)
+    if isinstance(value, bool) or not isinstance(value, kinds) or not low <= value <= high:
+        kind = "an integer" if integer else "a number"
+        bounds = f">= {low}" if high == math.inf else f"in [{low}, {high}]"
+        raise SessionError(f"{key} must be {kind} {bounds}")
+
+
+def make_agents(sim: TrafficSimulator, observer_params: Optional[Dict[str, Any]] = None,
+                controller_params: Optional[Dict[str, Any]] = None):
+    """
+    Observer, Controller and Coordinator of a simulator, wired on a new EventBus.
+    The Observer publishes threshold crossings on the bus; the Coordinator only runs when they fire.
+    The Controller decides on the observation event the Observer publishes after them.
+    Returns (bus, observer, controller, coordinator).
+    """
+    bus = EventBus()
+    observer = ObserverAgent(sim, bus=bus, **(observer_params or {}))
+    controller = ControllerAgent(sim, **(controller_params or {}))
+    coordinator = CoordinatorAgent(controller)
+    coordinator.subscribe(bus)
+    controller.subscribe(bus)
+    return bus, observer, controller, coordinator
+
+
+def control_step(sim: TrafficSimulator, mode: str, observer: ObserverAgent, green_duration: int):
+    """
+    Advances the simulation one second under a control mode. AI: array observation, which the agents
+    of make_agents() react to (every intersection decided in one batch). BASELINE: static timer, each
+    light switches once its green has lasted green_duration. Returns the AI observation arrays, else None.
+    """
+    sim.step()
+    if mode == "AI":
+        return observer.observe_arrays(sim.current_time)
+    # Static Timer Logic: intersections use manual_control=True, so we must switch manually
+    for intersection in sim.intersections:
+        if intersection.phase_timer >= green_duration:
+            intersection.switch_light()
+    return None
+
+
+class SimulationSession:
+    """One independent scenario: simulator, agents, dashboard state, SSE deltas and clock."""
+
+    def __init__(self, session_id: str, config: Optional[Dict[str, Any]] = None):
+        self.session_id = session_id
+        self.config = {**DEFAULT_CONFIG, **(config or {})}
+        if self.config["mode"] not in ("AI", "BASELINE"):
+            raise SessionError(f"Unknown mode {self.config['mode']!r}")
+        _check_number(self.config, "intersections", 1, integer=True)
+        _check_number(self.config, "green_duration", 1, integer=True)
+        _check_number(self.config, "arrival_rate", 0, 1)
+        _check_number(self.config, "clearance_rate", 0, 1)
+        seed = self.config["seed"]
+        if seed is not None and (isinstance(seed, bool) or not isinstance(seed, (int, str))):
+            raise SessionError("seed must be an integer, a string or null")
+        try:
+            # Profiles only: a session config comes from the HTTP API, so it cannot name trace files
+            DemandProfile(**(self.config["demand"] or {}))
+        except (TypeError, ValueError) as e:
+            raise SessionError(f"Invalid demand: {e}")
+        self.created = time.time()
+        self.last_access = time.time()
+        self.closed = False
+        self.paused_reason = None
+
+        self.lock = threading.Lock()
+        self.broadcaster = StateBroadcaster()
+        try:
+            self.clock = SimulationClock(mode=self.config["clock_mode"], speed=self.config["speed"])
+        except ValueError as e:
+            raise SessionError(str(e))
+        self.state = {
+            "session_id": session_id,
+            "running": False,
+            "mode": self.config["mode"],
+            "clock": self.clock.describe(),
+            "step": 0,
+            "intersections": {},
+            "history": [],
+            "logs": []
+        }
+        self.init_simulation()
+        # Latest immutable, pre-serialized state; readers never take self.lock
+        self.snapshot = make_snapshot(0, self.state, self.broadcaster.epoch)
+
+    # --- Simulation Setup ---
+    def init_simulation(self):
+        # Own random streams, restarted from the seed on every reset
+        self.sim = TrafficSimulator(seed=self.config["seed"])
+        self.sim.arrival_rate = self.config["arrival_rate"]
+
+        # Manual control is True so agents (or the baseline timer below) switch the lights
+        for i in range(self.config["intersections"]):
+            self.sim.add_intersection(Intersection(f"I{i + 1}", green_duration=self.config["green_duration"],
+                                                   clearance_rate=self.config["clearance_rate"], manual_control=True))
+        if self.config["demand"]:
+            self.sim.set_demand(DemandProfile(**self.config["demand"]))
+
+        # Initialize Agents (event-driven, see make_agents)
+        self.bus, self.observer, self.controller, self.coordinator = make_agents(self.sim)
+
+        # Per-step total queue and average wait of every intersection, at 1 s / 10 s / 1 min resolution
+        self.history = TimeSeriesStore([i.intersection_id for i in self.sim.intersections])
+        self._sample = np.zeros((len(self.sim.intersections), 2))
+
+        # Reset state
+        self.state["step"] = 0
+        self.state["intersections"] = {}
+        self.state["history"] = []
+        self.state["logs"] = []
+        self._dashboard_step = 0  # step of the last update_dashboard_state
+
+    def touch(self):
+        self.last_access = time.time()
+
+    # --- Simulation Loop ---
+    def simulate_step(self, new_logs):
+        sim = self.sim
+        # 1. Start Step (Add random cars), 2. Observe Step & 3. Decide Step
+        observations = control_step(sim, self.state["mode"], self.observer, self.config["green_duration"])
+        self.state["step"] = sim.current_time
+        self.record_history(observations)
+
+        if self.state["mode"] == "AI":
+
+            # Only the newest MAX_LOGS entries are kept, so only the last intersections' decisions are described
+            switch, reasons = self.controller.last_batch
+            n = len(reasons)
+            logged = range(max(0, n - MAX_LOGS), n)
+            for decision_data in self.controller.describe_batch(logged, observations.queues, observations.phase,
+                                                                observations.critical, switch, reasons):
+                log_entry = {
+                    "step": sim.current_time,
+                    "agent": f"Controller_{decision_data['intersection_id']}",
+                    "observation": decision_data['observation'],
+                    "decision": decision_data['decision'],
+                    "reasoning": decision_data['reasoning']
+                }
+                self.state["logs"].append(log_entry)
+                new_logs.append(log_entry)
+                if len(self.state["logs"]) > MAX_LOGS:
+                    self.state["logs"].pop(0)
+
+    def record_history(self, observations=None):
+        """Adds this step's total queue and average wait of every intersection to the history."""
+        sample = self._sample
+        if observations is not None:
+            # Reuse the Observer's arrays of this step
+            total = observations.queues.sum(axis=1)
+            sample[:, 0] = total
+            sample[:, 1] = 0.0
+            np.divide((observations.queues * observations.wait).sum(axis=1), total, out=sample[:, 1], where=total > 0)
+        else:
+            t = self.sim.current_time
+            totals, waits = [], []
+            for intersection in self.sim.intersections:
+                queued = arrival_time_sum = 0
+                for lane in intersection.approaches.values():
+                    queued += lane.queued
+                    arrival_time_sum += lane.arrival_time_sum
+                totals.append(queued)
+                waits.append((queued * t - arrival_time_sum) / queued if queued else 0.0)
+            sample[:, 0] = totals
+            sample[:, 1] = waits
+        self.history.record(self.sim.current_time, sample)
+
+    def query_history(self, intersection_id: Optional[str] = None, start: Optional[int] = None,
+                      end: Optional[int] = None, resolution: Optional[int] = None,
+                      max_points: int = DEFAULT_MAX_POINTS) -> Dict[str, Any]:
+        """
+        History of one intersection (the first by default); see TimeSeriesStore.query. Does not take
+        self.lock: the store has its own, held only while points are copied out, so a large query
+        and a batch of steps don't wait for each other.
+        """
+        history = self.history
+        intersection_id = intersection_id or history.ids[0]
+        if intersection_id not in history.index:
+            raise SessionError(f"Intersection {intersection_id} not found", 404)
+        try:
+            return history.query(intersection_id, start, end, resolution, min(max_points, MAX_HISTORY_POINTS))
+        except ValueError as e:
+            raise SessionError(str(e))
+
+    def recent_history(self) -> List[Dict[str, Any]]:
+        """The newest RECENT_HISTORY_POINTS points of the first intersection, for the snapshot's "history"."""
+        intersection_id = self.history.ids[0]
+        times, values = self.history.recent(RECENT_HISTORY_POINTS, 0)
+        queues = values[:, 0].astype(np.int64).tolist()
+        waits = np.round(values[:, 1].astype(np.float64), 3).tolist()
+        return [{"step": t, "intersection_id": intersection_id, "total_queue": queue, "avg_wait": wait}
+                for t, queue, wait in zip(times.tolist(), queues, waits)]
+
+    def update_dashboard_state(self):
+        """Refreshes the dashboard state and returns what changed: (changed intersection states, new history points)."""
+        sim = self.sim
+        elapsed = sim.current_time - self._dashboard_step
+        changed = {}
+        for intersection in sim.intersections:
+            state = intersection.get_state(sim.current_time)
+            previous = self.state["intersections"].get(intersection.intersection_id)
+            self.state["intersections"][intersection.intersection_id] = state
+            # Clients advance phase_timer by the steps since the intersection was last sent, so it only
+            # has to be sent when it did not simply keep counting (e.g. the phase switched and back)
+            if (previous is None or state['phase_timer'] != previous['phase_timer'] + elapsed
+                    or any(previous[k] != v for k, v in state.items() if k != 'phase_timer')):
+                changed[intersection.intersection_id] = state
+
+        new_history = self.new_history(elapsed)
+        # Short window for /api/state pollers, which don't get the stream's points
+        self.state["history"] = self.recent_history()
+        self._dashboard_step = sim.current_time
+        return changed, new_history
+
+    def new_history(self, steps: int) -> Dict[str, Any]:
+        """
+        History points of every intersection for the last `steps` steps (at most MAX_DELTA_HISTORY_STEPS),
+        by column: {"t": [...], metric: {intersection_id: [...]}}; older ones are served by query_history.
+        """
+        history = self.history
+        times, values = history.recent(min(steps, MAX_DELTA_HISTORY_STEPS))
+        values = np.round(values.astype(np.float64), 3)
+        points = {"t": times.tolist()}
+        for column, metric in enumerate(history.metrics):
+            points[metric] = dict(zip(history.ids, values[:, :, column].T.tolist()))
+        return points
+
+    def run_batch(self, steps: int):
+        """Runs `steps` sim steps and publishes one delta for the dashboard."""
+        started = time.perf_counter()
+        with self.lock:
+            if self.closed:
+                return
+            new_logs = deque(maxlen=MAX_LOGS)
+            for _ in range(steps):
+                self.simulate_step(new_logs)
+
+            # 4. Metric Step (Update State for UI), once per batch
+            changed, new_history = self.update_dashboard_state()
+            self.publish_update({
+                "type": "delta",
+                "step": self.sim.current_time,
+                "running": self.state["running"],
+                "mode": self.state["mode"],
+                "intersections": changed,
+                "history": new_history,
+                "logs": list(new_logs)
+            })
+        self.clock.record(steps, time.perf_counter() - started)
+
+    def publish_update(self, delta):
+        """Publishes a delta to stream clients and swaps in the matching full snapshot. Call with self.lock held."""
+        seq = self.broadcaster.publish(delta)
+        self.snapshot = make_snapshot(seq, self.state, self.broadcaster.epoch)
+
+    def publish_status(self, event_type: str = "status"):
+        """Pushes a run-status change (or a 'reset', which makes clients resync) to stream clients."""
+        self.publish_update({
+            "type": event_type,
+            "step": self.state["step"],
+            "running": self.state["running"],
+            "mode": self.state["mode"],
+            "clock": self.state["clock"]
+        })
+
+    # --- Control ---
+    def control(self, action: str, data: Dict[str, Any]):
+        if action == 'start':
+            self.paused_reason = None
+            self.clock.start()
+            with self.lock:
+                self.state["running"] = True
+                self.publish_status()
+        elif action == 'stop':
+            self.clock.stop()
+            with self.lock:
+                self.state["running"] = False
+                self.publish_status()
+        elif action == 'reset':
+            self.clock.stop()
+            with self.lock:
+                self.init_simulation()
+                self.state["running"] = False
+                self.publish_status("reset")
+        elif action == 'set_mode':
+            mode = data.get('mode')
+            if mode in ['AI', 'BASELINE']:
+                with self.lock:
+                    self.state["mode"] = mode
+                    self.publish_status()
+        elif action == 'set_speed':
+            # {"clock_mode": "realtime" | "speedup" | "max", "speed": N}
+            try:
+                self.clock.configure(data.get('clock_mode', 'speedup'), data.get('speed'))
+            except ValueError as e:
+                raise SessionError(str(e))
+            with self.lock:
+                self.state["clock"] = self.clock.describe()
+                self.publish_status()
+
+    def pause(self, reason: str):
+        self.paused_reason = reason
+        self.control('stop', {})
+
+    def estimated_memory(self) -> int:
+        """Approximate bytes held by the session (queued vehicles dominate under saturation)."""
+        vehicles = sum(intersection.north_queue + intersection.south_queue +
+                       intersection.east_queue + intersection.west_queue
+                       for intersection in self.sim.intersections)
+        return (vehicles * BYTES_PER_QUEUED_VEHICLE + len(self.sim.intersections) * BYTES_PER_INTERSECTION
+                + self.history.nbytes + len(self.snapshot.payload))
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "config": self.config,
+            "running": self.state["running"],
+            "step": self.state["step"],
+            "clock": self.state["clock"],
+            "paused_reason": self.paused_reason,
+            "created": self.created,
+            "idle_seconds": time.time() - self.last_access,
+            "estimated_memory": self.estimated_memory()
+        }
+
+
+class SessionManager:
+    """
+    Hosts many sessions on a shared worker pool instead of a thread per simulation.
+
+    A dispatcher thread hands each running session's due batches to the pool, never more than one
+    at a time per session, so a heavy scenario occupies at most one worker and every batch is
+    bounded by the session clock's per-UI-update slice. Sessions idle longer than idle_timeout are
+    evicted; session count and estimated memory are capped.
+    """
+
+    def __init__(self, max_sessions: int = 16, max_workers: int = 4, idle_timeout: float = 1800.0,
+                 session_memory_limit: int = 256 * 1024 * 1024, total_memory_limit: int = 1024 * 1024 * 1024):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.session_memory_limit = session_memory_limit
+        self.total_memory_limit = total_memory_limit
+        self.sessions: Dict[str, SimulationSession] = {}
+        self.pinned = set()  # sessions exempt from idle eviction (e.g. the default session)
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        self._wake = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sim-worker")
+        self._last_sweep = time.monotonic()
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self._dispatcher.start()
+
+    def create(self, config: Optional[Dict[str, Any]] = None, session_id: Optional[str] = None,
+               pinned: bool = False) -> SimulationSession:
+        with self._lock:
+            if len(self.sessions) >= self.max_sessions:
+                raise SessionError("Session limit reached", 429)
+            if self._total_memory() >= self.total_memory_limit:
+                raise SessionError("Server memory budget exhausted", 503)
+            intersections = (config or {}).get("intersections", DEFAULT_CONFIG["intersections"])
+            if not isinstance(intersections, int) or intersections < 1:
+                raise SessionError("intersections must be a positive integer")
+            if intersections * BYTES_PER_INTERSECTION + history_nbytes(intersections) > self.session_memory_limit:
+                raise SessionError("Scenario exceeds the per-session memory limit", 413)
+            session_id = session_id or uuid.uuid4().hex[:8]
+            if session_id in self.sessions:
+                raise SessionError(f"Session {session_id} already exists", 409)
+            session = SimulationSession(session_id, config)
+            self.sessions[session_id] = session
+            if pinned:
+                self.pinned.add(session_id)
+        return session
+
+    def get(self, session_id: str) -> SimulationSession:
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise SessionError(f"Session {session_id} not found", 404)
+        session.touch()
+        return session
+
+    def delete(self, session_id: str):
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+            self.pinned.discard(session_id)
+        if session is None:
+            raise SessionError(f"Session {session_id} not found", 404)
+        session.clock.stop()
+        session.closed = True
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [session.describe() for session in list(self.sessions.values())]
+
+    def wake(self):
+        """Tells the dispatcher to re-check clocks now (after start/configure)."""
+        self._wake.set()
+
+    def _total_memory(self) -> int:
+        return sum(session.estimated_memory() for session in self.sessions.values())
+
+    def _dispatch_loop(self):
+        while True:
+            self._wake.clear()
+            next_due = 1.0
+            for session in list(self.sessions.values()):
+                if session.session_id in self._in_flight:
+                    continue
+                delay = session.clock.seconds_until_due()
+                if delay is None:
+                    continue
+                if delay > 0:
+                    next_due = min(next_due, delay)
+                    continue
+                steps = session.clock.take_batch()
+                if steps:
+                    self._in_flight.add(session.session_id)
+                    self._pool.submit(self._run, session, steps)
+            if time.monotonic() - self._last_sweep > 5.0:
+                self._sweep()
+            self._wake.wait(next_due)
+
+    def _run(self, session: SimulationSession, steps: int):
+        try:
+            session.run_batch(steps)
+            if session.estimated_memory() > self.session_memory_limit:
+                session.pause("memory limit exceeded")
+        except Exception as e:
+            # Nothing waits on the pool's future: stop the session visibly instead of losing the error
+            logger.exception("Session %s failed while stepping", session.session_id)
+            session.pause(f"error: {type(e).__name__}: {e}")
+        finally:
+            self._in_flight.discard(session.session_id)
+            self._wake.set()
+
+    def _sweep(self):
+        """Evicts idle sessions."""
+        self._last_sweep = time.monotonic()
+        now = time.time()
+        for session_id, session in list(self.sessions.items()):
+            if session_id not in self.pinned and now - session.last_access > self.idle_timeout:
+                try:
+                    self.delete(session_id)
+                except SessionError:
+                    pass
@@ -0,0 +1,79 @@
+import json
+import threading
+import uuid
+from collections import deque
+from typing import Dict, Any, List, NamedTuple, Optional
+
+
+class StateBroadcaster:
+    """
+    Sequenced fan-out of per-step dashboard deltas to any number of Server-Sent Events clients.
+
+    Every published delta gets the next sequence number. The most recent `backlog` deltas are kept
+    already JSON-encoded, so a client that reconnects (or falls briefly behind) replays only what it
+    missed; a client further behind than the backlog is told to resync from a full snapshot. SSE
+    event ids are "epoch:seq", so an id from before a server restart never matches the current
+    sequence numbers.
+    """
+
+    def __init__(self, backlog: int = 256):
+        self.epoch = uuid.uuid4().hex[:12]  # distinguishes sequence numbers across server restarts
+        self.seq = 0
+        self._deltas = deque(maxlen=backlog)  # (seq, encoded delta)
+        self._cond = threading.Condition()
+
+    def publish(self, delta: Dict[str, Any]) -> int:
+        with self._cond:
+            self.seq += 1
+            delta["seq"] = self.seq
+            self._deltas.append((self.seq, json.dumps(delta)))
+            self._cond.notify_all()
+            return self.seq
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.epoch}:{seq}"
+
+    def parse_event_id(self, event_id: Optional[str]) -> Optional[int]:
+        """Sequence number of a client's Last-Event-ID, or None if it is missing, malformed or from another epoch."""
+        epoch, _, seq = (event_id or "").partition(":")
+        return int(seq) if epoch == self.epoch and seq.isdigit() else None
+
+    def since(self, last_seq: int) -> Optional[List[tuple]]:
+        """Deltas after last_seq, or None if some of them have already left the backlog."""
+        with self._cond:
+            return self._since(last_seq)
+
+    def wait(self, last_seq: int, timeout: float) -> Optional[List[tuple]]:
+        """Blocks until there is a delta after last_seq (or timeout). None means the client must resync."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq != last_seq, timeout)
+            return self._since(last_seq)
+
+    def _since(self, last_seq: int) -> Optional[List[tuple]]:
+        if last_seq == self.seq:
+            return []
+        if last_seq > self.seq or not self._deltas or self._deltas[0][0] > last_seq + 1:
+            return None
+        return [item for item in self._deltas if item[0] > last_seq]
+
+
+def format_sse(data: str, event: Optional[str] = None, event_id: Optional[str] = None) -> str:
+    message = ""
+    if event:
+        message += f"event: {event}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message + f"data: {data}\n\n"
+
+
+class StateSnapshot(NamedTuple):
+    """Immutable, pre-serialized dashboard state. Readers only ever swap in a whole new one."""
+    seq: int
+    step: int
+    payload: bytes
+    etag: str
+
+
+def make_snapshot(seq: int, state: Dict[str, Any], epoch: str = "") -> StateSnapshot:
+    payload = json.dumps({**state, "seq": seq}).encode()
+    return StateSnapshot(seq, state.get("step", 0), payload, f"{epoch}-{seq}")
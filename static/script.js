@@ -1,10 +1,101 @@
 let waitChart = null;
 
+// Local mirror of the server's dashboard state, kept current by the /api/stream deltas
+let state = null;
+let lastSeq = 0;
+let resyncing = false;
+let pendingDeltas = [];
+const MAX_ENTRIES = 100; // Same log window as the server
+
+// Chart: history of the selected intersection from /api/history, extended by the stream's points
+const CHART_POINTS = 300; // Points requested per history query
+const HISTORY_REFRESH_MS = 2000; // Reload interval of downsampled views (they can't be extended point by point)
+let chartHistory = null; // {intersection, range, resolution, t, queue, peak, wait}
+let historyLoadedAt = 0;
+let historyLoading = false;
+let latestStep = 0;
+
 document.addEventListener('DOMContentLoaded', () => {
     initChart();
-    setInterval(pollState, 100); // Poll every 100ms
+    if (window.EventSource) {
+        connectStream();
+    } else {
+        setInterval(pollState, 100); // Poll every 100ms
+        setInterval(() => {
+            if (Date.now() - historyLoadedAt > HISTORY_REFRESH_MS) loadHistory();
+        }, HISTORY_REFRESH_MS);
+    }
 });
 
+function connectStream() {
+    const source = new EventSource('/api/stream');
+
+    // Full state: sent on connect, and whenever we fell too far behind the server's delta backlog
+    source.addEventListener('snapshot', (e) => {
+        setState(JSON.parse(e.data));
+    });
+
+    source.onmessage = (e) => {
+        const delta = JSON.parse(e.data);
+        if (resyncing) {
+            pendingDeltas.push(delta);
+        } else if (!state || delta.type === 'reset' || delta.seq !== lastSeq + 1) {
+            resync();
+        } else {
+            applyDelta(delta);
+            updateUI(state);
+        }
+    };
+}
+
+async function resync() {
+    resyncing = true;
+    pendingDeltas = [];
+    try {
+        const response = await fetch('/api/state');
+        setState(await response.json());
+        pendingDeltas.filter(d => d.seq > lastSeq).forEach(d => applyDelta(d));
+        updateUI(state);
+    } catch (e) {
+        console.error("Resync error:", e);
+    } finally {
+        resyncing = false;
+        pendingDeltas = [];
+    }
+}
+
+function setState(snapshot) {
+    state = snapshot;
+    lastSeq = snapshot.seq;
+    Object.values(state.intersections).forEach(i => { i._step = state.step; });
+    updateUI(state);
+    loadHistory();
+}
+
+function applyDelta(delta) {
+    lastSeq = delta.seq;
+    state.step = delta.step;
+    state.running = delta.running;
+    state.mode = delta.mode;
+    if (delta.clock) state.clock = delta.clock;
+    Object.entries(delta.intersections || {}).forEach(([id, intersection]) => {
+        intersection._step = delta.step;
+        state.intersections[id] = intersection;
+    });
+    if (delta.history && delta.history.t.length) {
+        appendHistory(delta.history, delta.step);
+    }
+    if (delta.logs && delta.logs.length) {
+        state.logs = state.logs.concat(delta.logs).slice(-MAX_ENTRIES);
+    }
+}
+
+function phaseTimer(intersection, step) {
+    // Deltas omit intersections whose phase timer only advanced one per step since they were last sent
+    if (intersection._step === undefined) return intersection.phase_timer;
+    return intersection.phase_timer + (step - intersection._step);
+}
+
 function initChart() {
     const ctx = document.getElementById('waitChart').getContext('2d');
     waitChart = new Chart(ctx, {
@@ -25,6 +116,15 @@ function initChart() {
                     borderColor: '#3498db',
                     tension: 0.1,
                     yAxisID: 'y1'
+                },
+                {
+                    label: 'Peak Cars Waiting',
+                    data: [],
+                    borderColor: '#e67e22',
+                    borderDash: [4, 4],
+                    pointRadius: 0,
+                    tension: 0.1,
+                    yAxisID: 'y'
                 }
             ]
         },
@@ -57,6 +157,90 @@ function initChart() {
     });
 }
 
+async function loadHistory() {
+    const intersection = document.getElementById('historyIntersection').value;
+    if (!intersection || historyLoading) return;
+    const range = Number(document.getElementById('historyRange').value);
+    historyLoading = true;
+    historyLoadedAt = Date.now();
+    try {
+        const params = new URLSearchParams({
+            intersection,
+            start: Math.max(0, latestStep - range),
+            max_points: CHART_POINTS
+        });
+        const response = await fetch(`/api/history?${params}`);
+        const data = await response.json();
+        chartHistory = {
+            intersection,
+            range,
+            resolution: data.resolution,
+            t: data.t,
+            queue: data.total_queue.mean,
+            peak: data.total_queue.max,
+            wait: data.avg_wait.mean
+        };
+        renderChart();
+    } catch (e) {
+        console.error("History error:", e);
+    } finally {
+        historyLoading = false;
+    }
+}
+
+function appendHistory(points, step) {
+    // points: {t: [...], total_queue: {id: [...]}, avg_wait: {id: [...]}}, one column entry per step
+    if (!chartHistory || chartHistory.resolution !== 1) {
+        if (Date.now() - historyLoadedAt > HISTORY_REFRESH_MS) loadHistory();
+        return;
+    }
+    const h = chartHistory;
+    const queue = points.total_queue[h.intersection];
+    const wait = points.avg_wait[h.intersection];
+    if (!queue) return;
+    const last = h.t.length ? h.t[h.t.length - 1] : -1;
+    if (last >= 0 && points.t[0] > last + 1) {
+        // Steps are missing (a batch longer than a delta carries): reload the range instead
+        loadHistory();
+        return;
+    }
+    points.t.forEach((t, k) => {
+        if (t <= last) return;
+        h.t.push(t);
+        h.queue.push(queue[k]);
+        h.peak.push(queue[k]);
+        h.wait.push(wait[k]);
+    });
+    const cutoff = step - h.range;
+    while (h.t.length && h.t[0] < cutoff) {
+        h.t.shift();
+        h.queue.shift();
+        h.peak.shift();
+        h.wait.shift();
+    }
+    renderChart();
+}
+
+function renderChart() {
+    const h = chartHistory;
+    waitChart.data.labels = h.t;
+    waitChart.data.datasets[0].data = h.queue;
+    waitChart.data.datasets[1].data = h.wait;
+    // Peaks only differ from the averages in downsampled views
+    waitChart.data.datasets[2].data = h.resolution > 1 ? h.peak : [];
+    waitChart.update('none');
+    document.getElementById('historyResolution').textContent =
+        h.resolution > 1 ? `${h.resolution}s averages` : '';
+}
+
+function updateIntersectionSelect(ids) {
+    const select = document.getElementById('historyIntersection');
+    if (Array.from(select.options).map(o => o.value).join() === ids.join()) return;
+    const selected = select.value;
+    select.innerHTML = ids.map(id => `<option value="${id}">${id}</option>`).join('');
+    if (ids.includes(selected)) select.value = selected;
+}
+
 async function controlSim(action) {
     await fetch('/api/control', {
         method: 'POST',
@@ -77,11 +261,31 @@ async function setMode(mode) {
     document.getElementById('modeBaseBtn').classList.toggle('active', mode === 'BASELINE');
 }
 
+async function setSpeed(value) {
+    const body = (value === 'realtime' || value === 'max')
+        ? { action: 'set_speed', clock_mode: value }
+        : { action: 'set_speed', clock_mode: 'speedup', speed: Number(value) };
+    await fetch('/api/control', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(body)
+    });
+}
+
 async function pollState() {
     try {
         const response = await fetch('/api/state');
         const data = await response.json();
         updateUI(data);
+        // The snapshot carries the newest points of the first intersection
+        if (data.history && data.history.length) {
+            const id = data.history[0].intersection_id;
+            appendHistory({
+                t: data.history.map(p => p.step),
+                total_queue: { [id]: data.history.map(p => p.total_queue) },
+                avg_wait: { [id]: data.history.map(p => p.avg_wait) }
+            }, data.step);
+        }
     } catch (e) {
         console.error("Polling error:", e);
     }
@@ -91,11 +295,18 @@ function updateUI(data) {
     // Update Status
     document.getElementById('status').textContent = `Status: ${data.running ? 'Running' : 'Stopped'}`;
     document.getElementById('step').textContent = `Step: ${data.step}`;
+    latestStep = data.step;
 
     // Update Mode Buttons (sync with server state)
     document.getElementById('modeAiBtn').classList.toggle('active', data.mode === 'AI');
     document.getElementById('modeBaseBtn').classList.toggle('active', data.mode === 'BASELINE');
 
+    // Sync speed selector with the server clock
+    const speedSelect = document.getElementById('speedSelect');
+    if (data.clock && speedSelect && document.activeElement !== speedSelect) {
+        speedSelect.value = data.clock.mode === 'speedup' ? String(data.clock.speed) : data.clock.mode;
+    }
+
     // Render Intersections
     const container = document.getElementById('intersections');
 
@@ -120,7 +331,7 @@ function updateUI(data) {
             <h3>${intersection.id}</h3>
             <div class="traffic-light ${phaseClass}">
                 ${intersection.phase}<br>
-                ${intersection.phase_timer}s
+                ${phaseTimer(intersection, data.step)}s
             </div>
             <div class="queues">
                 <div class="queue-item">N: ${queues.N || 0}</div>
@@ -132,17 +343,8 @@ function updateUI(data) {
         `;
     });
 
-    // Update Chart
-    if (data.history.length > 0) {
-        const labels = data.history.map(h => h.step);
-        const waitValues = data.history.map(h => h.avg_wait);
-        const queueValues = data.history.map(h => h.total_queue);
-
-        waitChart.data.labels = labels;
-        waitChart.data.datasets[0].data = queueValues;
-        waitChart.data.datasets[1].data = waitValues;
-        waitChart.update('none');
-    }
+    // Chart intersection choices
+    updateIntersectionSelect(Object.keys(data.intersections));
 
     // Render Logs
     const logsContainer = document.getElementById('logsContainer');
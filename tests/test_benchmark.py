@@ -0,0 +1,40 @@
+import argparse
+
+import pytest
+
+from benchmark import build_simulator, run_case, build_cases, compare
+
+
+@pytest.mark.parametrize("benchmark", ["sim_step", "agent_loop", "agent_loop_batch", "agent_loop_dict"])
+@pytest.mark.parametrize("engine", ["python", "event", "vectorized"])
+def test_cases_run(benchmark, engine):
+    result = run_case(benchmark, engine, intersections=4, queue_depth=2, arrival_rate=0.1, seed=0, min_time=0.0)
+    assert result["key"] == f"{benchmark}/{engine}/n=4/depth=2/rate=0.1"
+    assert result["steps"] == 3
+    assert result["steps_per_sec"] > 0
+    assert result["step_us"]["min"] <= result["step_us"]["p50"] <= result["step_us"]["p95"]
+
+
+def test_simulators_are_seeded_and_prequeued():
+    a, b = build_simulator("python", 9, 5, 0.3, seed=7, network=True), build_simulator("python", 9, 5, 0.3, seed=7, network=True)
+    assert len(a.links) == 24
+    assert all(lane.queued == 5 for i in a.intersections for lane in i.approaches.values())
+    a.run(50)
+    b.run(50)
+    assert [i.get_state(50) for i in a.intersections] == [i.get_state(50) for i in b.intersections]
+
+
+def test_build_cases():
+    args = argparse.Namespace(benchmarks=["sim_step"], engines=["python"], sizes=[1, 10], queue_depths=[0, 100],
+                              arrival_rates=[0.1, 0.5], sweep_size=50)
+    assert [(c["intersections"], c["queue_depth"], c["arrival_rate"]) for c in build_cases(args)] == \
+        [(1, 0, 0.1), (10, 0, 0.1), (50, 100, 0.1), (50, 0, 0.5)]
+
+
+def test_compare_flags_slowdowns():
+    def result(key, mean):
+        return {"key": key, "step_us": {"mean": mean}}
+
+    baseline = {"results": [result("a", 10.0), result("b", 10.0)]}
+    regressions = compare([result("a", 12.0), result("b", 13.0), result("new", 99.0)], baseline, 1.25)
+    assert len(regressions) == 1 and regressions[0].startswith("b: 1.30x slower")
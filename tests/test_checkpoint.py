@@ -0,0 +1,93 @@
+import pytest
+
+from traffic_simulator import TrafficSimulator, Intersection, build_grid
+from checkpoint import checkpoint, restore, restore_agents, run_policy, fork
+from controller_agent import ControllerAgent
+from demand import DemandProfile
+
+
+def states(sim):
+    return [intersection.get_state(sim.current_time) for intersection in sim.intersections]
+
+
+def lane_counters(sim):
+    return [(lane.queue, lane.queued, lane.arrival_time_sum, lane.total_waiting_time, lane.vehicles_cleared)
+            for intersection in sim.intersections for lane in intersection.approaches.values()]
+
+
+def build(event_driven=False, arrival_rate=0.2):
+    sim = TrafficSimulator(event_driven=event_driven, seed=11)
+    sim.arrival_rate = arrival_rate
+    for i in range(4):
+        sim.add_intersection(Intersection(f"I{i + 1}", green_duration=12, clearance_rate=0.3))
+    return sim
+
+
+@pytest.mark.parametrize("event_driven", [False, True])
+@pytest.mark.parametrize("arrival_rate", [0.02, 0.2])
+def test_restore_continues_identically(event_driven, arrival_rate):
+    sim = build(event_driven, arrival_rate)
+    sim.run(300)
+    copy, context = restore(checkpoint(sim))
+    assert context is None
+    assert copy.current_time == sim.current_time
+    assert lane_counters(copy) == lane_counters(sim)
+
+    sim.run(400)
+    copy.run(400)
+    assert states(copy) == states(sim)
+    assert lane_counters(copy) == lane_counters(sim)
+
+
+def test_restore_after_settings_change_in_event_mode():
+    sim = build(event_driven=True)
+    sim.run(100)
+    sim.arrival_rate = 0.05
+    sim.intersections[0].green_duration = 4
+    sim.run(50)
+    copy, _ = restore(checkpoint(sim))
+    sim.run(300)
+    copy.run(300)
+    assert states(copy) == states(sim)
+
+
+def test_restore_network_and_demand():
+    sim = TrafficSimulator(seed=4)
+    build_grid(sim, 2, 3, travel_time=5, green_duration=10)
+    sim.set_demand(DemandProfile(default=[(0, 0.05), (200, 0.3)], lanes={"R0C0.N": 0.5}, period=400))
+    sim.run(250)
+    copy, _ = restore(checkpoint(sim))
+    assert [link.buckets for link in copy.links] == [link.buckets for link in sim.links]
+    sim.run(300)
+    copy.run(300)
+    assert states(copy) == states(sim)
+    assert [link.vehicles_delivered for link in copy.links] == [link.vehicles_delivered for link in sim.links]
+
+
+def test_controller_context_round_trip():
+    sim = build()
+    controller = ControllerAgent(sim)
+    controller.update_context("I2", {"bias": "NS"})
+    _, _, restored, _ = restore_agents(checkpoint(sim, controller))
+    assert restored.context == controller.context
+
+
+def test_rejects_foreign_data():
+    with pytest.raises(ValueError):
+        restore(b"not a checkpoint")
+
+
+def test_fork_matches_in_process_runs():
+    sim = build()
+    sim.run(200)
+    data = checkpoint(sim)
+    results = fork(data, {"ai": "AI", "baseline": "BASELINE"}, steps=200, max_workers=2)
+    for name, policy in (("ai", "AI"), ("baseline", "BASELINE")):
+        expected = run_policy(data, policy, 200)
+        assert {k: v for k, v in results[name].items() if k != "checkpoint"} == \
+               {k: v for k, v in expected.items() if k != "checkpoint"}
+        assert results[name]["start_time"] == 200 and results[name]["end_time"] == 400
+
+    # A branch's checkpoint continues like the branch itself
+    continued, _ = restore(results["baseline"]["checkpoint"])
+    assert continued.current_time == 400
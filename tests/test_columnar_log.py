@@ -0,0 +1,47 @@
+import numpy as np
+
+from columnar_log import ColumnarMetricsWriter, load_metrics
+from logger import SimulationLogger
+
+
+def test_round_trip_in_chunks(tmp_path):
+    path = str(tmp_path / "metrics.columns")
+    writer = ColumnarMetricsWriter(path, chunk_size=4)
+    for step in range(5):
+        for i_id in ("I1", "I2"):
+            writer.append(step, i_id, "NS_GREEN" if step < 3 else "EW_GREEN", step * 1.5, step / 4)
+    # Two full chunks are on disk, the rest is still buffered
+    assert len(load_metrics(path)) == 8
+    writer.close()
+
+    table = load_metrics(path)
+    assert len(table) == 10
+    assert isinstance(table["step"], np.memmap)
+    assert table["step"].dtype == np.int32 and table["phase"].dtype == np.uint8
+    assert table["total_queue_length"].dtype == np.float32
+    assert table["step"].tolist() == [step for step in range(5) for _ in range(2)]
+    assert table["intersection"].tolist() == [0, 1] * 5
+    assert table.decode("intersection").tolist() == ["I1", "I2"] * 5
+    assert table.decode("phase").tolist() == ["NS_GREEN"] * 6 + ["EW_GREEN"] * 4
+    assert table["avg_waiting_time"][-1] == 1.0
+
+    copy = load_metrics(path, mmap=False)
+    assert not isinstance(copy["step"], np.memmap)
+    assert copy["total_queue_length"].tolist() == table["total_queue_length"].tolist()
+
+
+def test_empty_log(tmp_path):
+    path = str(tmp_path / "metrics.columns")
+    ColumnarMetricsWriter(path).close()
+    table = load_metrics(path)
+    assert len(table) == 0 and table["phase"].dtype == np.uint8
+
+
+def test_logger_writes_columns(tmp_path):
+    with SimulationLogger(str(tmp_path), "run", columnar=True, columnar_chunk_size=3) as logger:
+        for step in range(1, 4):
+            logger.log_step(step, [{"id": "I1", "phase": "NS_GREEN", "queues": {"N": step, "E": 1}, "avg_waiting_time": 2.5}])
+    table = load_metrics(logger.columnar_path)
+    assert table["step"].tolist() == [1, 2, 3]
+    assert table["total_queue_length"].tolist() == [2.0, 3.0, 4.0]
+    assert table.decode("intersection").tolist() == ["I1"] * 3
@@ -0,0 +1,146 @@
+import pytest
+
+from traffic_simulator import TrafficSimulator, Intersection
+from demand import DemandProfile, TraceReplay, parse_time, demand_from_config
+from checkpoint import checkpoint, restore
+
+
+def build(intersections=1, demand=None):
+    # No departures, so every replayed vehicle stays in its lane
+    sim = TrafficSimulator(seed=5)
+    for i in range(intersections):
+        sim.add_intersection(Intersection(f"I{i + 1}", clearance_rate=0.0, manual_control=True))
+    if demand is not None:
+        sim.set_demand(demand)
+    return sim
+
+
+def write_trace(tmp_path, rows, header="time,intersection_id,approach,count,interval"):
+    path = tmp_path / "trace.csv"
+    path.write_text("\n".join([header, *rows]) + "\n")
+    return str(path)
+
+
+def arrivals(sim, intersection_id="I1", approach="N"):
+    return sim.get_intersection(intersection_id).approaches[approach].queue
+
+
+def test_parse_time():
+    assert parse_time("07:30") == 7 * 3600 + 30 * 60
+    assert parse_time("00:01:05") == 65
+    assert parse_time(12) == 12
+    assert parse_time("12.0") == 12
+
+
+def test_profile_rates_by_lane_intersection_and_default():
+    profile = DemandProfile(default=[("00:00", 0.02), ("07:00", 0.2), ("19:00", 0.05)],
+                            lanes={"I1.N": 0.4, "I2": [("08:00", 0.3), ("18:00", 0.1)]})
+    assert profile.rate("I1", "N", parse_time("03:00")) == 0.4
+    assert profile.rate("I1", "E", parse_time("07:00")) == 0.2
+    assert profile.rate("I1", "E", parse_time("06:59:59")) == 0.02
+    assert profile.rate("I1", "E", parse_time("23:00") + 86400) == 0.05  # the day repeats
+    assert profile.rate("I2", "W", parse_time("12:00")) == 0.3
+    assert profile.rate("I2", "W", parse_time("05:00")) == 0.1  # before the first breakpoint: the previous day's last
+    assert DemandProfile(lanes={"I1": 0.3}).rate("I3", "N", 0, arrival_rate=0.15) == 0.15
+    assert DemandProfile(default=0.6, scale=2.0).rate("I1", "N", 0) == 1.0
+
+
+@pytest.mark.parametrize("schedule", [[], [("00:00", 1.5)], -0.1])
+def test_profile_rejects_bad_schedules(schedule):
+    with pytest.raises(ValueError):
+        DemandProfile(default=schedule)
+
+
+def test_profile_follows_the_rate_changes():
+    # 0 vehicles/s until second 200, then every lane gets a vehicle every second
+    sim = build(2, DemandProfile(default=[(0, 0.0), (200, 1.0)], period=400))
+    sim.run(199)
+    assert all(lane.queued == 0 for i in sim.intersections for lane in i.approaches.values())
+    sim.run(10)
+    assert all(lane.queue == tuple(range(200, 210)) for i in sim.intersections for lane in i.approaches.values())
+    sim.run(200)  # back to 0 at second 400
+    assert all(lane.queue[-1] == 399 for i in sim.intersections for lane in i.approaches.values())
+
+
+def test_demand_from_config(tmp_path):
+    assert isinstance(demand_from_config({"default": 0.1, "start": "06:00"}), DemandProfile)
+    replay = demand_from_config({"trace": write_trace(tmp_path, []), "chunk_size": 5})
+    assert isinstance(replay, TraceReplay) and replay.chunk_size == 5
+
+
+def test_replays_rows_at_their_time(tmp_path):
+    path = write_trace(tmp_path, ["0,I1,N,2,", "3,I1,N,1,", "3,I1,E,4,", "7,I1,N,1,"])
+    sim = build(demand=TraceReplay(path, chunk_size=2))
+    sim.run(3)
+    assert arrivals(sim) == (1, 1, 3)  # simulation second 0 is replayed in the first step
+    assert arrivals(sim, approach="E") == (3, 3, 3, 3)
+    sim.run(10)
+    assert arrivals(sim) == (1, 1, 3, 7)
+    assert sim.demand.rows_replayed == 4
+    assert sim.demand.vehicles == 8
+    sim.demand.close()
+
+
+def test_start_skips_rows_before_it(tmp_path):
+    path = write_trace(tmp_path, ["06:00,I1,N,30,", "06:59:59,I1,N,9,", "07:00,I1,N,2,", "07:00:04,I1,N,1,"])
+    sim = build(demand=TraceReplay(path, start="07:00"))
+    sim.run(1)
+    assert arrivals(sim) == (1, 1)
+    sim.run(5)
+    assert arrivals(sim) == (1, 1, 4)
+    assert sim.demand.skipped == 39
+    assert sim.demand.vehicles == 3
+
+
+def test_interval_spreads_vehicles_and_clips_at_start(tmp_path):
+    path = write_trace(tmp_path, ["06:59:50,I1,N,40,20", "07:00:30,I1,E,25,10"])
+    sim = build(demand=TraceReplay(path, start="07:00"))
+    sim.run(60)
+    replay = sim.demand
+    north, east = arrivals(sim), arrivals(sim, approach="E")
+    assert all(1 <= t < 10 for t in north)  # second 0 lands in the first step
+    assert len(north) + replay.skipped == 40 and 0 < replay.skipped < 40
+    assert len(east) == 25 and all(30 <= t < 40 for t in east)
+    assert list(east) == sorted(east)
+
+
+def test_end_of_trace(tmp_path):
+    path = write_trace(tmp_path, ["1,I1,N,1,", "2,I1,S,1,"])
+    sim = build(demand=TraceReplay(path, chunk_size=1))
+    sim.run(100)
+    assert sim.demand.rows_replayed == 2
+    assert sim.demand.vehicles == 2
+    sim.run(5)  # nothing left: stepping goes on without arrivals
+    assert sim.demand.vehicles == 2
+
+
+def test_unknown_lanes_are_skipped(tmp_path):
+    sim = build(2)
+    sim.add_link("I1", "I2", "N", travel_time=3)  # I2's north lane is fed by the link
+    path = write_trace(tmp_path, ["1,I9,N,5,", "1,I2,N,3,", "2,I2,E,1,"])
+    sim.set_demand(TraceReplay(path))
+    sim.run(5)
+    assert sim.demand.skipped == 8
+    assert arrivals(sim, "I2", "E") == (2,)
+
+
+def test_bad_traces_are_rejected(tmp_path):
+    sim = build(demand=TraceReplay(write_trace(tmp_path, ["1,I1,N"], header="time,intersection_id,approach")))
+    with pytest.raises(ValueError, match="lacks the columns"):
+        sim.step()
+
+    sim = build(demand=TraceReplay(write_trace(tmp_path, ["5,I1,N,1,", "4,I1,N,1,"])))
+    with pytest.raises(ValueError, match="not in time order"):
+        sim.run(10)
+
+
+def test_checkpointed_replay_resumes(tmp_path):
+    rows = [f"{t},I{t % 2 + 1},{'NESW'[t % 4]},{t % 3 + 1},{t % 5 + 1}" for t in range(0, 300, 2)]
+    sim = build(2, TraceReplay(write_trace(tmp_path, rows), chunk_size=7))
+    sim.run(101)
+    copy, _ = restore(checkpoint(sim))
+    sim.run(250)
+    copy.run(250)
+    assert copy.demand.rows_replayed == sim.demand.rows_replayed == len(rows)
+    assert [i.get_state(sim.current_time) for i in copy.intersections] == \
+        [i.get_state(sim.current_time) for i in sim.intersections]
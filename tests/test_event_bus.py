@@ -0,0 +1,162 @@
+import pytest
+
+from traffic_simulator import TrafficSimulator, Intersection, build_grid
+from event_bus import EventBus, QUEUE_CROSSING, PHASE_CHANGE, SPILLBACK, OBSERVATION
+from observer_agent import ObserverAgent
+from controller_agent import ControllerAgent
+from coordinator_agent import CoordinatorAgent
+
+
+def event(event_type, intersection_id="I1", **fields):
+    return {"type": event_type, "intersection_id": intersection_id, "step": 0, **fields}
+
+
+def test_subscribe_validates():
+    bus = EventBus()
+    with pytest.raises(ValueError):
+        bus.subscribe("unknown", print)
+    with pytest.raises(ValueError):
+        bus.subscribe(QUEUE_CROSSING, print, "I1", approach="N")  # no threshold
+    with pytest.raises(ValueError):
+        bus.subscribe(QUEUE_CROSSING, print, approach="N", threshold=5)  # no intersection
+
+
+def test_publish_order_and_filters():
+    bus = EventBus()
+    calls = []
+    bus.subscribe(PHASE_CHANGE, lambda e: calls.append("any 1"))
+    bus.subscribe(PHASE_CHANGE, lambda e: calls.append("I1"), "I1")
+    bus.subscribe(PHASE_CHANGE, lambda e: calls.append("any 2"))
+    bus.subscribe(PHASE_CHANGE, lambda e: calls.append("I1 EW"), "I1", phase="EW_GREEN")
+    bus.subscribe(PHASE_CHANGE, lambda e: calls.append("I2"), "I2")
+    bus.subscribe(SPILLBACK, lambda e: calls.append("spillback"))
+
+    bus.publish(event(PHASE_CHANGE, phase="NS_GREEN"))
+    assert calls == ["I1", "any 1", "any 2"]  # this intersection's subscribers first, each in subscription order
+    calls.clear()
+    bus.publish(event(PHASE_CHANGE, phase="EW_GREEN"))
+    assert calls == ["I1", "I1 EW", "any 1", "any 2"]
+    assert bus.published == 2
+
+
+def test_network_wide_events_reach_each_subscriber_once():
+    bus = EventBus()
+    calls = []
+    bus.subscribe(OBSERVATION, calls.append)
+    bus.publish(event(OBSERVATION, None, observations=None))
+    assert len(calls) == 1
+
+
+def test_unsubscribe_and_version():
+    bus = EventBus()
+    calls = []
+    version = bus.version
+    bus.subscribe(QUEUE_CROSSING, calls.append, "I1", approach="N", threshold=5)
+    bus.subscribe(QUEUE_CROSSING, calls.append, "I1", approach="N", threshold=9)
+    assert bus.version == version + 2
+    assert bus.queue_watches() == [("I1", "N", 5), ("I1", "N", 9)]
+    assert bus.has_subscribers(QUEUE_CROSSING) and not bus.has_subscribers(SPILLBACK)
+    bus.publish(event(QUEUE_CROSSING, approach="N", threshold=9, above=True))
+    assert len(calls) == 1
+    bus.unsubscribe(QUEUE_CROSSING, calls.append, "I1")
+    assert not bus.has_subscribers(QUEUE_CROSSING)
+    assert bus.version == version + 3
+
+
+def build(intersections=2):
+    sim = TrafficSimulator(seed=1)
+    for i in range(intersections):
+        sim.add_intersection(Intersection(f"I{i + 1}", manual_control=True))
+    return sim
+
+
+def set_queue(sim, intersection_id, approach, length):
+    sim.get_intersection(intersection_id).approaches[approach].queue = range(length)
+
+
+def test_observer_publishes_changes_then_the_observation():
+    sim = build()
+    bus = EventBus()
+    observer = ObserverAgent(sim, bus=bus)
+    events = []
+    bus.subscribe(QUEUE_CROSSING, events.append, "I1", approach="N", threshold=10)
+    bus.subscribe(PHASE_CHANGE, events.append)
+    bus.subscribe(OBSERVATION, events.append)
+
+    def observe():
+        events.clear()
+        observer.observe_arrays(sim.current_time)
+        return [(e["type"], e["intersection_id"]) for e in events]
+
+    assert observe() == [(OBSERVATION, None)]
+    set_queue(sim, "I1", "N", 11)
+    sim.get_intersection("I2").switch_light()
+    assert observe() == [(QUEUE_CROSSING, "I1"), (PHASE_CHANGE, "I2"), (OBSERVATION, None)]
+    assert events[0]["above"] is True and events[0]["queue"] == 11
+    assert events[1]["phase"] == "EW_GREEN"
+    assert observe() == [(OBSERVATION, None)]  # nothing changed
+    set_queue(sim, "I1", "N", 10)
+    assert observe() == [(QUEUE_CROSSING, "I1"), (OBSERVATION, None)]
+    assert events[0]["above"] is False
+    assert events[-1]["observations"] is observer.arrays
+
+
+def test_coordinator_and_controller_react_to_events():
+    sim = build()
+    bus = EventBus()
+    observer = ObserverAgent(sim, bus=bus)
+    controller = ControllerAgent(sim)
+    coordinator = CoordinatorAgent(controller)
+    coordinator.subscribe(bus)
+    controller.subscribe(bus)
+
+    # I1's north queue crosses 15: the coordinator biases I2 to NS before the controller decides,
+    # so I2 (EW green, nothing queued) switches in the same step
+    sim.get_intersection("I2").switch_light()
+    set_queue(sim, "I1", "N", 16)
+    observer.observe_arrays(sim.current_time)
+    assert controller.context["I2"] == {"bias": "NS"}
+    switch, reasons = controller.last_batch
+    assert switch.tolist() == [False, True]
+    assert sim.get_intersection("I2").current_green_lane == "NS_GREEN"
+
+    set_queue(sim, "I1", "N", 3)
+    observer.observe_arrays(sim.current_time)
+    assert controller.context["I2"] == {}
+
+
+def test_event_driven_controller_matches_direct_calls():
+    sims = [build(6), build(6)]
+    for sim in sims:
+        sim.arrival_rate = 0.3
+    bus = EventBus()
+    event_observer, event_controller = ObserverAgent(sims[0], bus=bus), ControllerAgent(sims[0])
+    event_controller.subscribe(bus)
+    observer, controller = ObserverAgent(sims[1]), ControllerAgent(sims[1])
+    for _ in range(200):
+        for sim in sims:
+            sim.step()
+        event_observer.observe_arrays(sims[0].current_time)
+        arrays = observer.observe_arrays(sims[1].current_time)
+        switch, reasons = controller.decide_batch(arrays.queues, arrays.phase, arrays.critical)
+        assert event_controller.last_batch[1].tolist() == reasons.tolist()
+    assert [i.get_state(200) for i in sims[0].intersections] == [i.get_state(200) for i in sims[1].intersections]
+
+
+def test_spillback_events_on_a_network():
+    sim = TrafficSimulator(seed=1)
+    build_grid(sim, 1, 2, travel_time=3, manual_control=True)
+    bus = EventBus()
+    observer = ObserverAgent(sim, bus=bus, spillback_threshold=5)
+    events = []
+    bus.subscribe(SPILLBACK, events.append)
+    observer.observe_arrays(sim.current_time)
+    fed = [(link.to_id, link.approach, link.from_id) for link in sim.links]
+    to_id, approach, from_id = fed[0]
+    set_queue(sim, to_id, approach, 6)
+    observer.observe_arrays(sim.current_time)
+    assert [(e["intersection_id"], e["approach"], e["active"], e["upstream"]) for e in events] == \
+        [(to_id, approach, True, from_id)]
+    set_queue(sim, to_id, approach, 2)
+    observer.observe_arrays(sim.current_time)
+    assert events[-1]["active"] is False
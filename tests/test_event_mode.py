@@ -0,0 +1,131 @@
+import pytest
+
+from traffic_simulator import TrafficSimulator, Intersection
+
+INTERSECTIONS = 20
+
+
+def build(event_driven, seed, arrival_rate=0.1, **kwargs):
+    sim = TrafficSimulator(event_driven=event_driven, seed=seed)
+    sim.arrival_rate = arrival_rate
+    for i in range(INTERSECTIONS):
+        sim.add_intersection(Intersection(f"I{i + 1}", **kwargs))
+    return sim
+
+
+def arrivals(sim):
+    return sum(lane.vehicles_cleared + lane.queued
+               for intersection in sim.intersections for lane in intersection.approaches.values())
+
+
+def cleared(sim):
+    return sum(lane.vehicles_cleared for intersection in sim.intersections for lane in intersection.approaches.values())
+
+
+def mean_over_seeds(scenario, event_driven, measure, seeds=range(4)):
+    return sum(measure(scenario(event_driven, seed)) for seed in seeds) / len(seeds)
+
+
+def test_arrivals_and_departures_match_fixed_tick():
+    def scenario(event_driven, seed):
+        sim = build(event_driven, seed, green_duration=10, clearance_rate=0.4)
+        sim.run(1000)
+        return sim
+
+    for measure in (arrivals, cleared):
+        tick = mean_over_seeds(scenario, False, measure)
+        event = mean_over_seeds(scenario, True, measure)
+        assert event == pytest.approx(tick, rel=0.05)
+
+
+def test_phase_timers_match_fixed_tick():
+    tick, event = build(False, 1, green_duration=7), build(True, 1, green_duration=7)
+    for sim in (tick, event):
+        sim.run(53)
+        sim.intersections[0].switch_light()  # a manual switch between steps
+        sim.run(40)
+    for a, b in zip(tick.intersections, event.intersections):
+        assert (a.current_phase_index, a.phase_timer) == (b.current_phase_index, b.phase_timer)
+
+
+def test_arrival_rate_set_after_registration():
+    def scenario(event_driven, seed):
+        sim = build(event_driven, seed, arrival_rate=0.0, clearance_rate=0.0)
+        sim.arrival_rate = 0.1
+        sim.run(500)
+        return sim
+
+    tick = mean_over_seeds(scenario, False, arrivals)
+    assert tick == pytest.approx(0.1 * 500 * 4 * INTERSECTIONS, rel=0.05)
+    assert mean_over_seeds(scenario, True, arrivals) == pytest.approx(tick, rel=0.05)
+
+
+def test_arrival_rate_changes_mid_run():
+    def scenario(event_driven, seed):
+        # Lanes wait about 100 s for an arrival at 0.01/s: the faster rate must apply before that
+        sim = build(event_driven, seed, arrival_rate=0.01, clearance_rate=0.0)
+        sim.run(300)
+        sim.arrival_rate = 0.3
+        sim.run(700)
+        return sim
+
+    expected = (0.01 * 300 + 0.3 * 700) * 4 * INTERSECTIONS
+    assert mean_over_seeds(scenario, False, arrivals) == pytest.approx(expected, rel=0.05)
+    assert mean_over_seeds(scenario, True, arrivals) == pytest.approx(expected, rel=0.05)
+
+
+def test_signal_settings_change_mid_run():
+    def change(sim):
+        for intersection in sim.intersections[:10]:
+            intersection.green_duration = 3  # shorter than the running timers
+        for intersection in sim.intersections[10:]:
+            intersection.manual_control = True
+            intersection.clearance_rate = 0.9
+
+    sims = {}
+    for event_driven in (False, True):
+        sim = build(event_driven, 3, green_duration=20, clearance_rate=0.2)
+        sim.run(110)
+        change(sim)
+        sim.run(57)
+        sims[event_driven] = sim
+    for a, b in zip(sims[False].intersections, sims[True].intersections):
+        assert (a.current_phase_index, a.phase_timer) == (b.current_phase_index, b.phase_timer)
+
+    def scenario(event_driven, seed):
+        sim = build(event_driven, seed, green_duration=20, clearance_rate=0.2)
+        sim.run(300)
+        change(sim)
+        sim.run(700)
+        return sim
+
+    tick = mean_over_seeds(scenario, False, cleared)
+    assert mean_over_seeds(scenario, True, cleared) == pytest.approx(tick, rel=0.05)
+
+
+def test_settings_changes_reschedule_only_their_intersection():
+    sim = build(True, 4, green_duration=20)
+    sim.run(5)
+    versions = list(sim._phase_version)
+    sim.intersections[3].green_duration = 20  # unchanged
+    sim.intersections[4].clearance_rate = 0.9
+    sim.intersections[4].manual_control = True
+    assert sim._phase_version == versions[:4] + [versions[4] + 2] + versions[5:]
+    sim.run(20)
+    assert sim.intersections[4].current_phase_index == 0  # the queued timer switch was dropped
+    assert all(i.current_phase_index == 1 for i in sim.intersections[:4])
+
+
+def test_advance_requires_event_mode():
+    with pytest.raises(RuntimeError):
+        TrafficSimulator().advance(1)
+
+
+def test_fixed_tick_rate_changing_every_step():
+    # Skip-ahead arrivals are redrawn on every rate change, including the second being stepped
+    sim = build(False, 5, clearance_rate=0.0)
+    steps = 2000
+    for t in range(steps):
+        sim.arrival_rate = 0.04 if t % 2 else 0.05
+        sim.step()
+    assert arrivals(sim) == pytest.approx(0.045 * steps * 4 * INTERSECTIONS, rel=0.05)
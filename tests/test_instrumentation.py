@@ -0,0 +1,75 @@
+import pytest
+
+from instrumentation import LatencyHistogram, Profiler, NUM_BUCKETS
+
+
+def test_histogram_buckets_and_percentiles():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) == 0.0
+    for seconds in [0.5e-6, 3e-6, 3e-6, 100e-6, 2.0]:
+        histogram.record(seconds)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 5
+    assert snapshot["buckets_us"] == [[1, 1], [4, 2], [128, 1], [1 << 21, 1]]
+    assert histogram.percentile(50) == 4e-6
+    assert histogram.percentile(99) == 2.0  # capped at the largest recorded value
+    assert snapshot["min_ms"] == pytest.approx(0.5e-3)
+    histogram.record(1e9)  # beyond the last bucket
+    assert histogram.buckets[NUM_BUCKETS - 1] == 1
+    histogram.reset()
+    assert histogram.snapshot()["count"] == 0 and histogram.snapshot()["min_ms"] == 0.0
+
+
+class Work:
+    def run(self, value):
+        return value * 2
+
+
+def test_instrumented_methods_are_timed_only_while_enabled():
+    profiler = Profiler()
+    work = Work()
+    profiler.instrument(work, "run", "work")
+    assert work.run(2) == 4
+    assert "run" not in vars(work)
+    assert profiler.snapshot() == {"enabled": False, "phases": {"work": LatencyHistogram().snapshot()}}
+
+    profiler.enable()
+    assert work.run(3) == 6
+    assert profiler.histograms["work"].count == 1
+    profiler.disable()
+    assert "run" not in vars(work)
+    work.run(1)
+    assert profiler.histograms["work"].count == 1
+    profiler.reset()
+    assert profiler.histograms["work"].count == 0
+
+
+def test_class_instrumentation_covers_every_instance():
+    class Patched(Work):
+        pass
+
+    profiler = Profiler(enabled=True)
+    profiler.instrument(Patched, "run", "work")
+    assert Patched().run(1) == 2 and Patched().run(2) == 4
+    assert profiler.histograms["work"].count == 2
+    profiler.disable()
+    assert Patched.run is Work.run  # the inherited method is restored
+    profiler.instrument(Patched, "run", "work")  # re-instrumenting while disabled keeps it unpatched
+    assert Patched.run is Work.run
+
+
+def test_metrics_route_toggles_the_profiler():
+    server = pytest.importorskip("server")
+    client = server.app.test_client()
+    try:
+        data = client.post("/api/metrics", json={"enabled": True, "reset": True}).get_json()
+        assert data["enabled"] is True
+        assert "controller.decide" in data["phases"]
+        assert client.get("/api/metrics").get_json()["enabled"] is True
+
+        # Session control routes are for session actions only
+        client.post("/api/control", json={"action": "set_profiling", "enabled": False})
+        assert server.profiler.enabled
+    finally:
+        data = client.post("/api/metrics", json={"enabled": False}).get_json()
+    assert data["enabled"] is False and not server.profiler.enabled
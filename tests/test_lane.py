@@ -0,0 +1,89 @@
+import pytest
+
+from traffic_simulator import Lane, LANE_SPILL, TrafficSimulator, Intersection
+
+
+def fill(lane, times):
+    for t in times:
+        lane.add_vehicle(t)
+
+
+def test_aggregates_follow_adds_and_removes():
+    lane = Lane("I1_N")
+    fill(lane, [1, 2, 4, 7])
+    assert lane.queued == 4
+    assert lane.arrival_time_sum == 14
+    assert lane.get_total_current_wait(10) == 4 * 10 - 14
+    assert lane.get_current_wait_time(10) == pytest.approx(6.5)
+
+    assert lane.remove_vehicle(10) == 9  # FIFO: the vehicle that arrived at 1
+    assert lane.queued == 3
+    assert lane.arrival_time_sum == 13
+    assert lane.vehicles_cleared == 1
+    assert lane.get_average_waiting_time() == 9
+
+
+def test_remove_from_empty_lane():
+    lane = Lane("I1_N")
+    assert lane.remove_vehicle(5) == -1
+    assert lane.get_current_wait_time(5) == 0.0
+    assert lane.get_wait_percentile(5, 95) == 0.0
+
+
+def test_long_queue_spills_to_backlog_in_order():
+    lane = Lane("I1_N")
+    times = list(range(5 * LANE_SPILL))
+    fill(lane, times)
+    assert lane.queue == tuple(times)
+    for t in times[:3 * LANE_SPILL]:
+        assert lane.remove_vehicle(1000) == 1000 - t
+    assert lane.queue == tuple(times[3 * LANE_SPILL:])
+    assert lane.arrival_time_sum == sum(times[3 * LANE_SPILL:])
+
+
+@pytest.mark.parametrize("percentile, expected", [(0, 1), (50, 5), (95, 10), (100, 10)])
+def test_wait_percentiles_are_nearest_rank(percentile, expected):
+    lane = Lane("I1_N")
+    fill(lane, range(10))  # waits at t=10: 10, 9, ..., 1
+    assert lane.get_wait_percentile(10, percentile) == expected
+
+
+def test_wait_percentiles_match_sorting_across_backlog():
+    lane = Lane("I1_N")
+    fill(lane, range(0, 6 * LANE_SPILL, 3))
+    for _ in range(LANE_SPILL // 2):
+        lane.remove_vehicle(500)
+    waits = sorted(500 - t for t in lane.queue)
+    n = len(waits)
+    for percentile in (1, 25, 50, 90, 99):
+        rank = min(max(-(-percentile * n // 100), 1), n)
+        assert lane.get_wait_percentile(500, percentile) == waits[rank - 1]
+
+
+def test_queue_setter_recomputes_aggregates():
+    sim = TrafficSimulator(seed=1)
+    sim.add_intersection(Intersection("I1", clearance_rate=0.1))
+    sim.arrival_rate = 0.5
+    sim.run(200)
+    lane = sim.intersections[0].approaches['N']
+    assert lane.arrival_time_sum > 6
+
+    lane.queue = [1, 2, 3]
+    assert lane.queued == 3
+    assert lane.arrival_time_sum == 6
+    assert lane.get_current_wait_time(10) == 8
+    assert lane.remove_vehicle(10) == 9
+    assert lane.queue == (2, 3)
+
+    lane.queue = []
+    assert lane.queued == 0 and lane.arrival_time_sum == 0
+
+
+def test_queue_getter_is_read_only():
+    lane = Lane("I1_N")
+    fill(lane, [1, 2])
+    with pytest.raises(AttributeError):
+        lane.queue.append(3)
+    with pytest.raises(AttributeError):
+        lane.queue.popleft()
+    assert lane.queued == 2
@@ -0,0 +1,58 @@
+import csv
+import json
+
+from logger import SimulationLogger
+
+
+def states(step, ids=("I1", "I2")):
+    return [{"id": i_id, "phase": "NS_GREEN" if step % 2 else "EW_GREEN",
+             "queues": {"N": step, "E": row, "S": 0, "W": 1}, "avg_waiting_time": step / 2}
+            for row, i_id in enumerate(ids)]
+
+
+def entry(step, row, i_id):
+    return {"step": step, "intersection_id": i_id, "phase": "NS_GREEN" if step % 2 else "EW_GREEN",
+            "total_queue_length": step + row + 1, "avg_waiting_time": step / 2}
+
+
+def test_streams_csv_and_json_lines(tmp_path):
+    with SimulationLogger(str(tmp_path), "run", flush_interval=0) as logger:
+        for step in range(1, 4):
+            logger.log_step(step, states(step))
+        assert len(logger.logs) == 0  # no history by default
+    expected = [entry(step, row, i_id) for step in range(1, 4) for row, i_id in enumerate(("I1", "I2"))]
+    with open(logger.jsonl_file_path) as f:
+        assert [json.loads(line) for line in f] == expected
+    with open(logger.csv_file_path) as f:
+        rows = list(csv.DictReader(f))
+    assert [row["intersection_id"] for row in rows] == ["I1", "I2"] * 3
+    assert rows[-1]["total_queue_length"] == "5"
+
+
+def test_flush_interval(tmp_path):
+    logger = SimulationLogger(str(tmp_path), "run", flush_interval=2)
+    logger.log_step(1, states(1))
+    assert (tmp_path / "run_metrics.jsonl").read_text() == ""  # still buffered
+    logger.log_step(2, states(2))
+    assert len((tmp_path / "run_metrics.jsonl").read_text().splitlines()) == 4
+    logger.close()
+    logger.close()  # closing twice is harmless
+    assert logger.closed
+
+
+def test_history_ring_buffer(tmp_path):
+    with SimulationLogger(str(tmp_path), "run", history_size=3) as logger:
+        for step in range(1, 6):
+            logger.log_step(step, states(step))
+        assert list(logger.logs) == [entry(4, 1, "I2"), entry(5, 0, "I1"), entry(5, 1, "I2")]
+
+
+def test_save_json_matches_indented_dump(tmp_path):
+    with SimulationLogger(str(tmp_path), "run") as logger:
+        logger.save_json()
+        assert (tmp_path / "run_metrics.json").read_text() == json.dumps([], indent=2)
+        for step in range(1, 3):
+            logger.log_step(step, states(step))
+        logger.save_json()
+    expected = [entry(step, row, i_id) for step in range(1, 3) for row, i_id in enumerate(("I1", "I2"))]
+    assert (tmp_path / "run_metrics.json").read_text() == json.dumps(expected, indent=2)
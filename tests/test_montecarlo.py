@@ -0,0 +1,37 @@
+import pytest
+
+from montecarlo import t_critical, confidence_interval, run_replication
+from sessions import SimulationSession
+
+
+@pytest.mark.parametrize("df, confidence, expected", [
+    (1, 0.95, 12.7062), (2, 0.95, 4.3027), (3, 0.95, 3.1824), (5, 0.95, 2.5706), (10, 0.95, 2.2281),
+    (30, 0.95, 2.0423), (1000, 0.95, 1.9623), (1, 0.99, 63.6567), (9, 0.90, 1.8331), (4, 0.99, 4.6041),
+])
+def test_t_critical_matches_tables(df, confidence, expected):
+    assert t_critical(df, confidence) == pytest.approx(expected, abs=1e-4)
+
+
+def test_t_critical_without_degrees_of_freedom():
+    assert t_critical(0) == float("inf")
+
+
+def test_confidence_interval_of_two_replications():
+    interval = confidence_interval([1.0, 3.0])
+    assert interval["mean"] == 2.0
+    assert interval["ci_high"] - interval["mean"] == pytest.approx(12.7062, abs=1e-4)  # stdev sqrt(2), n = 2
+
+
+@pytest.mark.parametrize("mode", ["AI", "BASELINE"])
+def test_replication_steps_like_a_session(mode):
+    scenario = {"intersections": 3, "arrival_rate": 0.3, "green_duration": 20, "mode": mode, "steps": 300}
+    result = run_replication(scenario, seed=11)
+
+    session = SimulationSession("s", {**scenario, "seed": 11, "demand": None})
+    queue_sum = 0
+    for _ in range(scenario["steps"]):
+        session.simulate_step([])
+        queue_sum += sum(sum(i.get_state(session.sim.current_time)["queues"].values()) for i in session.sim.intersections)
+    assert result["avg_queue"] == queue_sum / (scenario["steps"] * scenario["intersections"])
+    assert result["vehicles_cleared"] == sum(lane.vehicles_cleared for i in session.sim.intersections
+                                             for lane in i.approaches.values())
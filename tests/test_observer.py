@@ -0,0 +1,101 @@
+import pytest
+
+from traffic_simulator import TrafficSimulator, Intersection
+from observer_agent import ObserverAgent, STATUS_KEYS
+
+
+def build(intersections=2):
+    sim = TrafficSimulator(seed=1)
+    for i in range(intersections):
+        sim.add_intersection(Intersection(f"I{i + 1}", manual_control=True))
+    return sim
+
+
+def set_queue(sim, intersection_id, approach, length):
+    sim.get_intersection(intersection_id).approaches[approach].queue = range(length)
+
+
+# North queue of I1 over time, and whether it is CRITICAL with critical_threshold=20, clear_threshold=10
+QUEUES = [5, 21, 15, 11, 10, 15, 20, 21, 30, 9]
+CRITICAL = [False, True, True, True, False, False, False, True, True, False]
+
+
+def test_array_hysteresis():
+    sim = build()
+    observer = ObserverAgent(sim, critical_threshold=20, clear_threshold=10)
+    for queue, expected in zip(QUEUES, CRITICAL):
+        set_queue(sim, "I1", "N", queue)
+        arrays = observer.observe_arrays(sim.current_time)
+        assert arrays.critical[0].tolist() == [expected, False, False, False]
+        assert arrays["I1"]["critical"] == expected
+
+
+def test_dict_observation_has_the_same_hysteresis():
+    sim = build()
+    observer = ObserverAgent(sim, critical_threshold=20, clear_threshold=10)
+    for queue, expected in zip(QUEUES, CRITICAL):
+        set_queue(sim, "I1", "N", queue)
+        observation = observer.observe(sim.current_time)["I1"]
+        assert observation["critical"] == expected
+        assert observation["critical_lanes"] == (["north_queue"] if expected else [])
+
+
+def test_without_clear_threshold_there_is_no_hysteresis():
+    sim = build()
+    observer = ObserverAgent(sim, critical_threshold=20)
+    for queue in QUEUES:
+        set_queue(sim, "I1", "N", queue)
+        assert observer.observe(sim.current_time)["I1"]["critical"] == (queue > 20)
+        assert observer.observe_arrays(sim.current_time)["I1"]["critical"] == (queue > 20)
+
+
+def test_per_intersection_thresholds():
+    sim = build()
+    observer = ObserverAgent(sim, critical_threshold=20)
+    observer.observe_arrays(sim.current_time)
+    observer.set_thresholds("I2", 5, 2)
+    for intersection_id in ("I1", "I2"):
+        set_queue(sim, intersection_id, "E", 8)
+    arrays = observer.observe_arrays(sim.current_time)
+    assert arrays.critical[:, 1].tolist() == [False, True]
+    assert observer.observe(sim.current_time)["I2"]["critical_lanes"] == ["east_queue"]
+    for intersection_id in ("I1", "I2"):
+        set_queue(sim, intersection_id, "E", 3)
+    assert observer.observe_arrays(sim.current_time).critical[:, 1].tolist() == [False, True]
+    assert observer.observe(sim.current_time)["I2"]["critical"] is True
+
+
+def test_array_summaries_match_observe():
+    sim = build(3)
+    sim.arrival_rate = 0.4
+    observer = ObserverAgent(sim, critical_threshold=6)
+    for _ in range(60):
+        sim.step()
+        expected = observer.observe(sim.current_time)
+        arrays = observer.observe_arrays(sim.current_time)
+        assert list(arrays) == list(expected)
+        for intersection_id, summary in arrays.to_dicts().items():
+            wait_times = summary.pop("wait_times")
+            assert summary == expected[intersection_id]
+            assert set(wait_times) == {"N", "E", "S", "W"}
+
+
+def test_critical_state_survives_added_intersections():
+    sim = build(1)
+    observer = ObserverAgent(sim, critical_threshold=20, clear_threshold=10)
+    set_queue(sim, "I1", "S", 25)
+    observer.observe_arrays(sim.current_time)
+    set_queue(sim, "I1", "S", 15)
+    sim.add_intersection(Intersection("I2", manual_control=True))
+    arrays = observer.observe_arrays(sim.current_time)
+    assert arrays.size == 2
+    assert arrays["I1"]["critical_lanes"] == ["south_queue"]
+    assert not arrays.critical[1].any()
+
+
+@pytest.mark.parametrize("approach, key", list(zip("NESW", STATUS_KEYS)))
+def test_critical_lane_names(approach, key):
+    sim = build(1)
+    set_queue(sim, "I1", approach, 21)
+    assert ObserverAgent(sim).observe(0)["I1"]["critical_lanes"] == [key]
+    assert ObserverAgent(sim).observe_arrays(0)["I1"]["critical_lanes"] == [key]
@@ -0,0 +1,57 @@
+from concurrent.futures import Future
+
+import pytest
+
+import optimizer
+from optimizer import search_space, default_params, to_scenario, optimize, AI_DEFAULTS
+
+SCENARIO = {"intersections": 2, "arrival_rate": 0.2, "green_duration": 20, "clearance_rate": 0.5, "steps": 60}
+
+
+def test_timed_search_space_and_scenario():
+    space = search_space(SCENARIO, "TIMED")
+    assert [name for name, _, _ in space] == ["I1.ns_green", "I1.ew_green", "I1.offset",
+                                              "I2.ns_green", "I2.ew_green", "I2.offset"]
+    params = default_params(SCENARIO, "TIMED")
+    assert params["I2.ns_green"] == 20 and params["I2.offset"] == 0
+    scenario = to_scenario(SCENARIO, "TIMED", {**params, "I1.offset": 7})
+    assert scenario["mode"] == "TIMED"
+    assert scenario["timing"] == {"I1": [20, 20, 7], "I2": [20, 20, 0]}
+    assert to_scenario(SCENARIO, "AI", AI_DEFAULTS)["controller"] == AI_DEFAULTS
+    with pytest.raises(ValueError):
+        search_space(SCENARIO, "BASELINE")
+
+
+class InlineExecutor:
+    """Runs submitted calls right away, so a test can replace run_replication."""
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+def test_race_drops_clearly_worse_candidates(monkeypatch):
+    # Cost = the candidate's red_threshold plus a little per-seed noise shared by every candidate
+    def run_replication(scenario, seed, replication):
+        return {"avg_wait": scenario["controller"]["red_threshold"] + seed % 7 * 0.1}
+
+    monkeypatch.setattr(optimizer, "run_replication", run_replication)
+    candidates = [{**AI_DEFAULTS, "red_threshold": red} for red in (10, 11, 30, 40)]
+    finished, runs = optimizer._race(InlineExecutor(), SCENARIO, "AI", candidates, seeds=list(range(8)),
+                                     metric="avg_wait", race_round=2, keep=2, confidence=0.8)
+    assert sorted(finished) == [0, 1]
+    assert all(len(costs) == 8 for costs in finished.values())
+    assert runs == 4 * 2 + 2 * 6  # the worse two stop after the first round
+
+
+def test_optimize_runs_within_budget():
+    result = optimize(SCENARIO, "AI", generations=2, population=4, replications=2, race_round=1, max_workers=1)
+    assert set(result["params"]) == set(AI_DEFAULTS)
+    for name, low, high in search_space(SCENARIO, "AI"):
+        assert low <= result["params"][name] <= high
+    assert result["scenario"]["controller"] == result["params"]
+    assert result["default_params"] == AI_DEFAULTS
+    assert 0 < result["simulations"] <= result["full_budget"] == len(result["history"]) * 4 * 2
+    assert result["cost"]["mean"] <= min(entry["best"] for entry in result["history"])
+    assert result["cost"]["n"] == 2
@@ -0,0 +1,84 @@
+import pytest
+
+from traffic_simulator import TrafficSimulator, Intersection, build_grid
+from observer_agent import ObserverAgent
+from controller_agent import ControllerAgent
+from coordinator_agent import CoordinatorAgent
+from partitioned import PartitionedExecutor, partition_bounds
+from demand import DemandProfile
+
+STEPS = 150
+
+
+def build(demand=False):
+    sim = TrafficSimulator(seed=21)
+    sim.arrival_rate = 0.15
+    build_grid(sim, 3, 3, travel_time=4, green_duration=12, clearance_rate=0.5, manual_control=True)
+    if demand:
+        sim.set_demand(DemandProfile(default=[(0, 0.1), (60, 0.4)], lanes={"R0C0": 0.02}))
+    return sim
+
+
+def build_unlinked(intersections=2):
+    """No links: the coordinator falls back to its I1/I2 rule, which needs a long I1 north queue."""
+    sim = TrafficSimulator(seed=2)
+    sim.arrival_rate = 0.1
+    for i in range(intersections):
+        sim.add_intersection(Intersection(f"I{i + 1}", green_duration=12, clearance_rate=0.5, manual_control=True))
+    sim.set_demand(DemandProfile(lanes={"I1.N": 0.3}))
+    return sim
+
+
+def run_single(sim, mode, steps=STEPS):
+    """The agent sequence of a partition worker, on the whole network in this process."""
+    observer = ObserverAgent(sim)
+    controller = ControllerAgent(sim)
+    coordinator = CoordinatorAgent(controller)
+    for _ in range(steps):
+        sim.step()
+        t = sim.current_time
+        if mode == "AI":
+            observations = observer.observe(t)
+            if t % 5 == 0:
+                coordinator.coordinate(observations)
+            controller.decide_many(observations)
+        elif mode == "BASELINE":
+            for intersection in sim.intersections:
+                if intersection.phase_timer >= intersection.green_duration:
+                    intersection.switch_light()
+    return {i.intersection_id: i.get_state(sim.current_time) for i in sim.intersections}
+
+
+@pytest.mark.parametrize("intersections, partitions", [(9, 2), (9, 3), (10, 4), (3, 3)])
+def test_partition_bounds_are_contiguous_and_balanced(intersections, partitions):
+    bounds = partition_bounds(intersections, partitions)
+    sizes = [end - start for start, end in zip(bounds, bounds[1:])]
+    assert bounds[0] == 0 and bounds[-1] == intersections
+    assert len(sizes) == partitions and max(sizes) - min(sizes) <= 1
+
+
+@pytest.mark.parametrize("mode", ["AI", "BASELINE"])
+@pytest.mark.parametrize("partitions", [1, 2, 4])
+def test_matches_single_process(mode, partitions):
+    expected = run_single(build(), mode)
+    assert any(sum(state["queues"].values()) for state in expected.values())
+    with PartitionedExecutor(build(), partitions=partitions, mode=mode) as executor:
+        executor.run(STEPS)
+        assert executor.current_time == STEPS
+        assert executor.get_states() == expected
+
+
+def test_matches_single_process_with_demand():
+    expected = run_single(build(demand=True), "BASELINE")
+    with PartitionedExecutor(build(demand=True), partitions=3, mode="BASELINE") as executor:
+        executor.run(STEPS)
+        assert executor.get_states() == expected
+
+
+@pytest.mark.parametrize("intersections, partitions", [(2, 2), (4, 2), (4, 4)])
+def test_unlinked_coordination_matches_single_process(intersections, partitions):
+    expected = run_single(build_unlinked(intersections), "AI", steps=300)
+    for count in (1, partitions):
+        with PartitionedExecutor(build_unlinked(intersections), partitions=count, mode="AI") as executor:
+            executor.run(300)
+            assert executor.get_states() == expected
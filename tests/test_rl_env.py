@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from rl_env import TrafficEnv, VectorTrafficEnv, ACTIONS, FEATURES
+
+SCENARIO = {"intersections": 3, "arrival_rate": 0.3, "steps": 20}
+PHASE, PHASE_TIMER = FEATURES.index("phase"), FEATURES.index("phase_timer")
+
+
+def test_step_requires_reset():
+    with pytest.raises(RuntimeError):
+        TrafficEnv(SCENARIO).step([0, 0, 0])
+    with pytest.raises(RuntimeError):
+        VectorTrafficEnv(2, SCENARIO).step(np.zeros((2, 3)))
+
+
+def test_reset_and_step():
+    env = TrafficEnv(SCENARIO, decision_interval=2, seed=1)
+    obs, info = env.reset()
+    assert obs.shape == (3, len(FEATURES)) and obs.dtype == np.float32
+    assert not obs.any()
+
+    switch = ACTIONS.index("SWITCH")
+    obs, reward, terminated, truncated, info = env.step([switch, 0, 0])
+    assert info == {"time": 2}
+    assert obs[:, PHASE].tolist() == [1.0, 0.0, 0.0]
+    assert obs[:, PHASE_TIMER].tolist() == [2.0, 2.0, 2.0]
+    assert reward <= 0 and not terminated and not truncated
+    queued = sum(lane.queued for i in env.sim.intersections for lane in i.approaches.values())
+    assert obs[:, :4].sum() == queued
+
+    for _ in range(9):
+        *_, truncated, info = env.step(0)
+    assert truncated and info["time"] == 20
+
+
+def test_seeded_episodes_repeat():
+    def episode(seed):
+        env = TrafficEnv(SCENARIO)
+        env.reset(seed=seed)
+        return [env.step([1, 0, 1])[:2] for _ in range(10)]
+
+    first, again = episode(5), episode(5)
+    assert all(np.array_equal(a[0], b[0]) and a[1] == b[1] for a, b in zip(first, again))
+    assert any(not np.array_equal(a[0], b[0]) for a, b in zip(first, episode(6)))
+
+
+def test_vector_env_steps_and_resets_finished_episodes():
+    env = VectorTrafficEnv(4, SCENARIO, decision_interval=5, seed=2)
+    obs, info = env.reset()
+    assert obs.shape == (4, 3, len(FEATURES))
+    actions = np.zeros((4, 3), dtype=np.int64)
+    actions[1, 2] = ACTIONS.index("SWITCH")
+    obs, rewards, terminated, truncated, info = env.step(actions)
+    assert rewards.shape == (4,) and (rewards <= 0).all()
+    assert obs[1, 2, PHASE] == 1.0 and obs[0, 2, PHASE] == 0.0
+    assert not terminated.any() and not truncated.any() and info == {}
+
+    env.reset_envs([3])
+    for _ in range(3):
+        obs, rewards, terminated, truncated, info = env.step(np.zeros((4, 3)))
+    # Environments 0-2 reach 20 s; environment 3 was restarted 15 s ago
+    assert truncated.tolist() == [True, True, True, False]
+    assert info["_final_observation"].tolist() == [True, True, True, False]
+    assert info["final_observation"][0, :, PHASE_TIMER].tolist() == [20.0, 20.0, 20.0]
+    assert not obs[:3].any()
+    assert env.elapsed.tolist() == [0, 0, 0, 15]
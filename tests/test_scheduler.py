@@ -0,0 +1,79 @@
+import pytest
+
+import scheduler
+from scheduler import SimulationClock
+
+
+@pytest.fixture
+def now(monkeypatch):
+    """Fake monotonic clock: set now[0] to move time."""
+    current = [100.0]
+    monkeypatch.setattr(scheduler.time, "monotonic", lambda: current[0])
+    return current
+
+
+def test_stopped_clock_runs_nothing(now):
+    clock = SimulationClock()
+    assert not clock.running
+    assert clock.seconds_until_due() is None
+    assert clock.take_batch() == 0
+    clock.start()
+    assert clock.running
+    clock.stop()
+    assert clock.take_batch() == 0
+
+
+def test_realtime_runs_one_step_per_second(now):
+    clock = SimulationClock(mode="realtime")
+    clock.start()
+    assert clock.take_batch() == 1
+    assert clock.take_batch() == 0
+    assert clock.seconds_until_due() == 1.0
+    now[0] += 0.5
+    assert clock.take_batch() == 0
+    now[0] += 0.5
+    assert clock.take_batch() == 1
+
+
+@pytest.mark.parametrize("speed, batch, interval", [(10.0, 1, 0.1), (100.0, 10, 0.1), (5.0, 1, 0.2), (1e9, 10000, 1e-5)])
+def test_speedup_batches_per_ui_update(now, speed, batch, interval):
+    clock = SimulationClock(mode="speedup", speed=speed, ui_rate=10.0)
+    clock.start()
+    assert clock.take_batch() == batch
+    assert clock.seconds_until_due() == pytest.approx(interval)
+    assert clock.describe() == {"mode": "speedup", "speed": speed, "steps_per_second": speed}
+
+
+def test_falling_behind_does_not_burst(now):
+    clock = SimulationClock(mode="speedup", speed=10.0)
+    clock.start()
+    clock.take_batch()
+    now[0] += 5.0  # a slow batch: 50 batches are overdue, but the clock resumes its pace instead of running them
+    assert clock.take_batch() == 1
+    assert clock.take_batch() == 1
+    assert clock.take_batch() == 0
+    assert clock.seconds_until_due() == pytest.approx(0.1)
+
+
+def test_max_mode_sizes_batches_from_step_time(now):
+    clock = SimulationClock(mode="max", ui_rate=10.0, max_batch=500)
+    clock.start()
+    assert clock.seconds_until_due() == 0.0
+    assert clock.take_batch() == 1
+    clock.record(1, 0.001)
+    assert clock.take_batch() == 100  # 0.1 s per update at 1 ms per step
+    for _ in range(50):
+        clock.record(10, 1e-5)
+    assert clock.take_batch() == 500  # capped at max_batch
+    assert clock.describe()["steps_per_second"] is None
+
+
+def test_configure_validates():
+    clock = SimulationClock()
+    with pytest.raises(ValueError):
+        clock.configure("warp")
+    for speed in (0, -1, float("inf"), True, "10"):
+        with pytest.raises(ValueError):
+            clock.configure("speedup", speed)
+    clock.configure("realtime")
+    assert clock.speed == 10.0 and clock.steps_per_second() == 1.0
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+server = pytest.importorskip("server")
+
+
+@pytest.fixture
+def client():
+    return server.app.test_client()
+
+
+@pytest.fixture
+def session(client):
+    created = client.post("/api/sessions", json={"intersections": 2, "seed": 3}).get_json()
+    yield server.manager.get(created["session_id"])
+    client.delete(f"/api/sessions/{created['session_id']}")
+
+
+def test_state_is_served_from_the_snapshot(client, session):
+    url = f"/api/sessions/{session.session_id}/state"
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.data == session.snapshot.payload
+    assert response.headers["ETag"] == f'"{session.snapshot.etag}"'
+    assert response.headers["X-Sim-Step"] == "0"
+    assert json.loads(response.data)["session_id"] == session.session_id
+
+
+def test_unchanged_state_returns_304(client, session):
+    url = f"/api/sessions/{session.session_id}/state"
+    etag = client.get(url).headers["ETag"]
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+
+    session.run_batch(5)
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.headers["X-Sim-Step"] == "5"
+
+
+def test_snapshots_are_replaced_not_mutated(session):
+    old = session.snapshot
+    payload = old.payload
+    session.run_batch(3)
+    assert session.snapshot is not old
+    assert old.payload == payload and json.loads(payload)["step"] == 0
+    assert session.snapshot.step == 3
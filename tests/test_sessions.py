@@ -0,0 +1,176 @@
+import json
+import threading
+import time
+
+import pytest
+
+from sessions import (SimulationSession, SessionManager, SessionError, MAX_LOGS, BYTES_PER_INTERSECTION,
+                      RECENT_HISTORY_POINTS, MAX_DELTA_HISTORY_STEPS)
+from timeseries import TimeSeriesStore, history_nbytes
+
+
+@pytest.mark.parametrize("config", [
+    {"mode": "TURBO"},
+    {"intersections": 0},
+    {"intersections": 1.5},
+    {"intersections": True},
+    {"green_duration": 0},
+    {"green_duration": "30"},
+    {"arrival_rate": "x"},
+    {"arrival_rate": 1.5},
+    {"clearance_rate": None},
+    {"clearance_rate": -0.1},
+    {"seed": [1, 2]},
+    {"seed": 1.5},
+    {"speed": "x"},
+    {"speed": 0},
+    {"clock_mode": "warp"},
+    {"demand": {"lanes": {"I1.N": 2.0}}},
+    {"demand": {"unknown": 1}},
+])
+def test_invalid_config_is_rejected(config):
+    with pytest.raises(SessionError) as error:
+        SimulationSession("s", config)
+    assert error.value.status == 400
+
+
+@pytest.mark.parametrize("config", [
+    {},
+    {"seed": 7, "arrival_rate": 0.2, "clearance_rate": 1, "green_duration": 5},
+    {"seed": "run-a", "intersections": 3, "demand": None, "mode": "BASELINE"},
+    {"clock_mode": "max", "speed": 2},
+])
+def test_valid_config_is_accepted(config):
+    session = SimulationSession("s", config)
+    session.run_batch(5)
+    assert session.state["step"] == 5
+
+
+def test_same_seed_same_run():
+    a, b = SimulationSession("a", {"seed": 3}), SimulationSession("b", {"seed": 3})
+    a.run_batch(200)
+    b.run_batch(200)
+    assert a.state["intersections"] == b.state["intersections"]
+
+
+def test_ai_logs_keep_the_newest_decisions():
+    session = SimulationSession("s", {"intersections": 150, "seed": 1})
+    session.run_batch(2)
+    logs = session.state["logs"]
+    assert len(logs) == MAX_LOGS
+    assert [entry["agent"] for entry in logs] == [f"Controller_I{i}" for i in range(51, 151)]
+    assert all(entry["step"] == 2 for entry in logs)
+    assert {entry["decision"] for entry in logs} <= {"HOLD", "SWITCH"}
+
+
+def test_memory_estimate_counts_the_history():
+    assert TimeSeriesStore(["I1", "I2", "I3"]).nbytes == history_nbytes(3)
+    session = SimulationSession("s", {"intersections": 3})
+    assert session.estimated_memory() >= 3 * BYTES_PER_INTERSECTION + history_nbytes(3)
+
+
+def test_history_query_does_not_wait_for_a_batch():
+    session = SimulationSession("s", {"intersections": 3, "seed": 2})
+    session.run_batch(50)
+    results = []
+    reader = threading.Thread(target=lambda: results.append(session.query_history("I3", start=1)), daemon=True)
+    with session.lock:  # as while a batch runs
+        reader.start()
+        reader.join(timeout=5)
+    assert results and results[0]["t"] == list(range(1, 51))
+    with pytest.raises(SessionError) as error:
+        session.query_history("I9")
+    assert error.value.status == 404
+    with pytest.raises(SessionError) as error:
+        session.query_history(resolution=7)
+    assert error.value.status == 400
+
+
+def test_snapshot_keeps_recent_history():
+    session = SimulationSession("s", {"seed": 4})
+    session.run_batch(RECENT_HISTORY_POINTS + 30)
+    history = json.loads(session.snapshot.payload)["history"]
+    assert [point["step"] for point in history] == list(range(31, RECENT_HISTORY_POINTS + 31))
+    expected = session.query_history("I1", start=31, resolution=1)
+    assert [point["total_queue"] for point in history] == expected["total_queue"]["mean"]
+    assert [point["avg_wait"] for point in history] == expected["avg_wait"]["mean"]
+    assert {point["intersection_id"] for point in history} == {"I1"}
+    session.control("reset", {})
+    assert json.loads(session.snapshot.payload)["history"] == []
+
+
+def last_delta(session):
+    broadcaster = session.broadcaster
+    return json.loads(broadcaster.since(broadcaster.seq - 1)[0][1])
+
+
+def test_delta_sends_a_phase_timer_that_did_not_just_keep_counting():
+    # No traffic: only the baseline timer changes anything
+    session = SimulationSession("s", {"mode": "BASELINE", "green_duration": 4, "arrival_rate": 0, "demand": None})
+    session.run_batch(1)
+    assert set(last_delta(session)["intersections"]) == {"I1", "I2"}
+    session.run_batch(2)
+    assert last_delta(session)["intersections"] == {}  # the timers advanced by the batch's steps
+
+    # Eight steps switch the phase away and back: phase and queues are as before, the timer is not
+    before = session.state["intersections"]["I1"]
+    session.run_batch(8)
+    delta = last_delta(session)
+    after = session.state["intersections"]["I1"]
+    assert after["phase"] == before["phase"]
+    assert after["phase_timer"] != before["phase_timer"] + 8
+    assert delta["intersections"]["I1"]["phase_timer"] == after["phase_timer"]
+
+
+def test_delta_carries_every_step_of_the_batch():
+    session = SimulationSession("s", {"intersections": 3, "seed": 6})
+    session.run_batch(5)
+    history = last_delta(session)["history"]
+    assert history["t"] == [1, 2, 3, 4, 5]
+    for intersection_id in ("I1", "I2", "I3"):
+        expected = session.query_history(intersection_id, start=1)
+        assert history["total_queue"][intersection_id] == expected["total_queue"]["mean"]
+        assert history["avg_wait"][intersection_id] == expected["avg_wait"]["mean"]
+
+    session.run_batch(MAX_DELTA_HISTORY_STEPS + 40)
+    history = last_delta(session)["history"]
+    assert history["t"] == list(range(46, MAX_DELTA_HISTORY_STEPS + 46))  # longer batches: the newest steps
+    assert len(history["avg_wait"]["I2"]) == MAX_DELTA_HISTORY_STEPS
+
+
+@pytest.fixture
+def manager():
+    manager = SessionManager(max_sessions=2, max_workers=1)
+    yield manager
+    for session_id in list(manager.sessions):
+        manager.delete(session_id)
+
+
+def test_manager_limits(manager):
+    with pytest.raises(SessionError) as error:
+        manager.create({"intersections": -1})
+    assert error.value.status == 400
+    manager.create({"seed": 1})
+    manager.create({"seed": 2})
+    with pytest.raises(SessionError) as error:
+        manager.create()
+    assert error.value.status == 429
+    with pytest.raises(SessionError) as error:
+        manager.get("missing")
+    assert error.value.status == 404
+
+
+def test_failing_session_is_paused(manager):
+    session = manager.create({"seed": 1})
+
+    def fail():
+        raise RuntimeError("boom")
+
+    session.sim.step = fail
+    session.control("start", {})
+    manager.wake()
+    deadline = time.monotonic() + 5
+    while session.paused_reason is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert session.paused_reason == "error: RuntimeError: boom"
+    assert session.describe()["running"] is False
@@ -0,0 +1,29 @@
+from state_stream import StateBroadcaster, format_sse
+
+
+def test_event_ids_carry_the_epoch():
+    broadcaster = StateBroadcaster()
+    seq = broadcaster.publish({"type": "delta"})
+    event_id = broadcaster.event_id(seq)
+    assert event_id == f"{broadcaster.epoch}:{seq}"
+    assert broadcaster.parse_event_id(event_id) == seq
+    assert f"id: {event_id}\n" in format_sse("{}", event_id=event_id)
+
+
+def test_ids_from_another_epoch_are_rejected():
+    old, new = StateBroadcaster(), StateBroadcaster()
+    old.publish({})
+    new.publish({})
+    assert new.parse_event_id(old.event_id(1)) is None
+    for event_id in (None, "", "1", f"{new.epoch}:", f"{new.epoch}:x"):
+        assert new.parse_event_id(event_id) is None
+
+
+def test_replays_missed_deltas_or_asks_for_a_resync():
+    broadcaster = StateBroadcaster(backlog=3)
+    for _ in range(5):
+        broadcaster.publish({})
+    assert [seq for seq, _ in broadcaster.since(3)] == [4, 5]
+    assert broadcaster.since(5) == []
+    assert broadcaster.since(1) is None  # already left the backlog
+    assert broadcaster.since(9) is None  # from the future, e.g. before a restart
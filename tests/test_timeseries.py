@@ -0,0 +1,115 @@
+import threading
+
+import numpy as np
+import pytest
+
+from timeseries import TimeSeriesStore, history_nbytes
+
+
+def filled(seconds, ids=("I1", "I2")):
+    """Store whose total_queue at second t is t for I1 and 2t for I2; avg_wait is t % 7."""
+    store = TimeSeriesStore(ids)
+    for t in range(1, seconds + 1):
+        store.record(t, np.array([[t * (row + 1), t % 7] for row in range(len(ids))], dtype=np.float64))
+    return store
+
+
+def test_empty_store():
+    result = TimeSeriesStore(["I1"]).query("I1")
+    assert result["t"] == [] and result["total_queue"]["mean"] == []
+
+
+def test_unknown_intersection_and_resolution():
+    store = filled(20)
+    with pytest.raises(KeyError):
+        store.query("I9")
+    with pytest.raises(ValueError):
+        store.query("I1", resolution=5)
+
+
+def test_one_second_points_are_exact():
+    store = filled(120)
+    result = store.query("I2", start=101, end=110)
+    assert result["resolution"] == 1
+    assert result["t"] == list(range(101, 111))
+    assert result["total_queue"]["mean"] == [2.0 * t for t in range(101, 111)]
+    assert result["total_queue"]["min"] == result["total_queue"]["max"] == result["total_queue"]["mean"]
+
+
+def test_coarse_points_hold_mean_min_and_max():
+    store = filled(125)
+    result = store.query("I1", start=0, resolution=10)
+    assert result["t"] == list(range(0, 130, 10))
+    queue = result["total_queue"]
+    assert queue["mean"][1:12] == [t + 4.5 for t in range(10, 120, 10)]
+    assert queue["min"][1:12] == [float(t) for t in range(10, 120, 10)]
+    assert queue["max"][1:12] == [t + 9.0 for t in range(10, 120, 10)]
+    # Second 0 was never recorded, and the bucket still being filled (120..125) is the newest point
+    assert queue["mean"][0] == 5.0
+    assert (queue["mean"][-1], queue["min"][-1], queue["max"][-1]) == (122.5, 120.0, 125.0)
+
+    minutes = store.query("I1", start=0, resolution=60)
+    assert minutes["t"] == [0, 60, 120]
+    assert minutes["total_queue"]["mean"] == [30.0, 89.5, 122.5]
+
+
+def test_level_follows_range_and_retention():
+    store = filled(2000)
+    assert store.query("I1", start=1500, max_points=600)["resolution"] == 1
+    assert store.query("I1", start=1500, max_points=100)["resolution"] == 10
+    # The 1 s ring keeps 900 points: an older start needs the 10 s level
+    old = store.query("I1", start=500, end=600, max_points=600)
+    assert old["resolution"] == 10
+    assert old["t"][0] == 500
+
+
+def test_downsampling_respects_max_points():
+    store = filled(600)
+    result = store.query("I1", start=1, end=600, resolution=1, max_points=100)
+    assert len(result["t"]) <= 100
+    assert result["resolution"] == 6
+    assert result["t"][:2] == [1, 7]
+    assert result["total_queue"]["mean"][0] == pytest.approx(3.5)  # mean of 1..6
+    assert result["total_queue"]["max"][0] == 6.0
+    assert result["total_queue"]["min"][1] == 7.0
+
+
+def test_recent_points():
+    store = filled(50)
+    times, values = store.recent(5)
+    assert times.tolist() == [46, 47, 48, 49, 50]
+    assert values.shape == (5, 2, 2)
+    times, values = store.recent(100, 1)
+    assert len(times) == 50
+    assert values[:, 0].tolist() == [2.0 * t for t in range(1, 51)]
+    assert len(store.recent(0)[0]) == 0
+
+
+def test_memory_is_constant():
+    store = filled(10)
+    nbytes = store.nbytes
+    assert nbytes == history_nbytes(2)
+    for t in range(11, 5000):
+        store.record(t, np.zeros((2, 2)))
+    assert store.nbytes == nbytes
+
+
+def test_queries_from_other_threads():
+    store = TimeSeriesStore(["I1"])
+    errors = []
+
+    def query():
+        try:
+            for _ in range(200):
+                result = store.query("I1", max_points=50)
+                assert len(result["t"]) <= 50
+                assert result["t"] == sorted(result["t"])
+        except Exception as e:
+            errors.append(e)
+
+    reader = threading.Thread(target=query)
+    reader.start()
+    for t in range(1, 5000):
+        store.record(t, np.array([[t, 1.0]]))
+    reader.join()
+    assert errors == []
@@ -0,0 +1,78 @@
+import math
+
+import numpy as np
+import pytest
+
+from traffic_simulator import TrafficSimulator, Intersection
+from vectorized_simulator import VectorizedTrafficSimulator, LANES
+
+
+def queued_times(sim, handle, lane):
+    return [int(sim.arrivals[handle, lane, (sim.head[handle, lane] + k) % sim.depth])
+            for k in range(sim.queue[handle, lane])]
+
+
+def test_state_has_the_python_engine_keys():
+    python_sim = TrafficSimulator(seed=1)
+    python_sim.add_intersection(Intersection("I1"))
+    sim = VectorizedTrafficSimulator(seed=1)
+    sim.add_intersection(intersection_id="I1")
+    assert sim.get_intersection_state(0, 0).keys() == python_sim.intersections[0].get_state(0).keys()
+
+
+def test_queues_are_fifo_rings():
+    sim = VectorizedTrafficSimulator(seed=2, capacity=2, depth=1)
+    sim.arrival_rate = 0.4
+    for i in range(10):  # outgrows the initial capacity and depth
+        sim.add_intersection(intersection_id=f"I{i + 1}", green_duration=25, clearance_rate=0.3)
+    for t in range(1500):
+        sim.step()
+        if t == 700:
+            sim.reset_intersections([2, 3])
+
+    now = sim.current_time
+    for handle in range(sim.size):
+        state = sim.get_intersection_state(handle, now)
+        for lane, key in enumerate(LANES):
+            times = queued_times(sim, handle, lane)
+            assert times == sorted(times)
+            assert sum(times) == sim.arrival_sum[handle, lane]
+            waits = sorted(now - t for t in times)
+            for name, percentile in (("p50", 50), ("p95", 95)):
+                rank = min(max(math.ceil(percentile / 100 * len(waits)), 1), len(waits)) if waits else 0
+                assert state["wait_percentiles"][key][name] == (waits[rank - 1] if waits else 0.0)
+
+
+def test_copies_an_intersection_queue():
+    intersection = Intersection("X")
+    for t in range(5):
+        intersection.add_vehicle('N', t)
+    sim = VectorizedTrafficSimulator()
+    view = sim.add_intersection(intersection)
+    view.add_vehicle('N', 7)
+    assert queued_times(sim, 0, 0) == [0, 1, 2, 3, 4, 7]
+    intersection.add_vehicle('N', 7)
+    assert sim.get_intersection_state(0, 10)['wait_percentiles'] == intersection.get_state(10)['wait_percentiles']
+
+
+def mean_current_wait(vectorized, seed):
+    """avg_waiting_time of get_state, averaged over 50 intersections and every 10th of 2000 steps."""
+    sim = VectorizedTrafficSimulator(seed=seed) if vectorized else TrafficSimulator(seed=seed)
+    sim.arrival_rate = 0.12
+    for i in range(50):
+        if vectorized:
+            sim.add_intersection(intersection_id=f"I{i}", green_duration=20, clearance_rate=0.3)
+        else:
+            sim.add_intersection(Intersection(f"I{i}", green_duration=20, clearance_rate=0.3))
+    samples = []
+    for t in range(2000):
+        sim.step()
+        if t % 10 == 0:
+            samples.extend(view.get_state(sim.current_time)["avg_waiting_time"] for view in sim.intersections)
+    return np.mean(samples)
+
+
+def test_waits_match_the_python_engine():
+    python_wait = np.mean([mean_current_wait(False, seed) for seed in range(3)])
+    vectorized_wait = np.mean([mean_current_wait(True, seed) for seed in range(3)])
+    assert vectorized_wait == pytest.approx(python_wait, rel=0.1)
@@ -0,0 +1,226 @@
+import math
+import threading
+import numpy as np
+from typing import Dict, Any, Optional, Sequence
+
+# Metrics recorded per intersection (same names as the dashboard's history points)
+SERIES_METRICS = ("total_queue", "avg_wait")
+
+# (seconds per point, points kept): 15 minutes at 1 s, 90 minutes at 10 s, 12 hours at 1 min
+LEVELS = ((1, 900), (10, 540), (60, 720))
+
+DEFAULT_MAX_POINTS = 600
+
+
+def history_nbytes(intersections: int, metrics: int = len(SERIES_METRICS), levels=LEVELS) -> int:
+    """Bytes a TimeSeriesStore of this shape allocates (its nbytes), without building one."""
+    total = 0
+    for resolution, capacity in levels:
+        summaries = 1 if resolution == 1 else 3  # mean, plus min and max for rolled-up levels
+        total += capacity * (8 + 4 + summaries * 4 * intersections * metrics)
+    return total
+
+
+class _Ring:
+    """Fixed-capacity ring of points for every intersection: times (cap,), mean/min/max (cap, n, metrics)."""
+
+    def __init__(self, resolution: int, capacity: int, size: int, metrics: int):
+        self.resolution = resolution
+        self.capacity = capacity
+        self.head = 0  # slot of the next point
+        self.length = 0
+        self.times = np.zeros(capacity, dtype=np.int64)
+        self.counts = np.zeros(capacity, dtype=np.int32)  # samples behind each point
+        self.mean = np.zeros((capacity, size, metrics), dtype=np.float32)
+        if resolution == 1:
+            self.min = self.max = self.mean  # one sample per point
+        else:
+            self.min = np.zeros_like(self.mean)
+            self.max = np.zeros_like(self.mean)
+
+    def append(self, time: int, count: int, mean, low, high):
+        slot = self.head
+        self.times[slot] = time
+        self.counts[slot] = count
+        self.mean[slot] = mean
+        if self.min is not self.mean:
+            self.min[slot] = low
+            self.max[slot] = high
+        self.head = (slot + 1) % self.capacity
+        self.length = min(self.length + 1, self.capacity)
+
+    def slots(self):
+        """Slot indices in time order."""
+        return np.arange(self.head - self.length, self.head) % self.capacity
+
+    def oldest(self) -> float:
+        return float(self.times[(self.head - self.length) % self.capacity]) if self.length else math.inf
+
+    def holds(self, time: int) -> bool:
+        """Whether no point from `time` on has been overwritten yet."""
+        return self.length < self.capacity or self.oldest() <= time
+
+    @property
+    def nbytes(self) -> int:
+        arrays = {id(a): a for a in (self.times, self.counts, self.mean, self.min, self.max)}
+        return sum(a.nbytes for a in arrays.values())
+
+
+class TimeSeriesStore:
+    """
+    Multi-resolution history of SERIES_METRICS for every intersection, in constant memory.
+
+    record() takes one sample per simulation second for all intersections at once and appends it
+    to a ring of 1 s points. When a bucket of a coarser level (LEVELS) is complete, it is rolled up
+    from the next finer ring into one point holding the mean, min and max of its samples; the bucket
+    still being filled is summarized on demand as the newest point of its level. query() answers a
+    time range for one intersection from the finest level that covers it, downsampling to at most
+    max_points.
+
+    record() and query() may run in different threads. They share a lock of the store only while
+    points are appended or copied out, so a large query never stalls the simulation for long.
+    """
+
+    def __init__(self, ids: Sequence[str], metrics: Sequence[str] = SERIES_METRICS, levels=LEVELS):
+        self.ids = list(ids)
+        self.index = {intersection_id: handle for handle, intersection_id in enumerate(self.ids)}
+        self.metrics = tuple(metrics)
+        self.rings = [_Ring(resolution, capacity, len(self.ids), len(self.metrics)) for resolution, capacity in levels]
+        self.latest = None
+        self._bucket = [None] * len(self.rings)  # per coarse level, the bucket being filled
+        self._lock = threading.Lock()
+
+    def record(self, time: int, values):
+        """Adds the sample of second `time`: values (intersections, metrics), rows in `ids` order."""
+        with self._lock:
+            self._record(time, values)
+
+    def _record(self, time: int, values):
+        self.latest = time
+        self.rings[0].append(time, 1, values, values, values)
+        for level in range(1, len(self.rings)):
+            bucket = time // self.rings[level].resolution
+            if bucket != self._bucket[level]:
+                # A bucket is complete once a later sample arrives: roll it up from the finer level
+                if self._bucket[level] is not None:
+                    summary = self._summary(level, self._bucket[level])
+                    if summary is not None:
+                        self.rings[level].append(self._bucket[level] * self.rings[level].resolution, *summary)
+                self._bucket[level] = bucket
+
+    def _summary(self, level: int, bucket: int, rows=slice(None)):
+        """
+        (sample count, mean, min, max) of one bucket of a coarse level, from the points of the next
+        finer level that fall into it (and that level's own bucket still being filled), or None if empty.
+        """
+        ring, finer = self.rings[level], self.rings[level - 1]
+        start = bucket * ring.resolution
+        end = start + ring.resolution
+        recent = min(finer.length, ring.resolution // finer.resolution + 1)
+        slots = np.arange(finer.head - recent, finer.head) % finer.capacity
+        slots = slots[(finer.times[slots] >= start) & (finer.times[slots] < end)]
+        counts = [finer.counts[slots]]
+        means, lows, highs = [finer.mean[slots, rows]], [finer.min[slots, rows]], [finer.max[slots, rows]]
+        if level > 1 and self._bucket[level - 1] is not None and start <= self._bucket[level - 1] * finer.resolution < end:
+            partial = self._summary(level - 1, self._bucket[level - 1], rows)
+            if partial is not None:
+                counts.append(np.array([partial[0]]))
+                means.append(partial[1][None])
+                lows.append(partial[2][None])
+                highs.append(partial[3][None])
+
+        counts = np.concatenate(counts)
+        total = int(counts.sum())
+        if not total:
+            return None
+        weights = counts.reshape((-1,) + (1,) * (means[0].ndim - 1))
+        mean = (np.concatenate(means) * weights).sum(axis=0) / total
+        return total, mean, np.concatenate(lows).min(axis=0), np.concatenate(highs).max(axis=0)
+
+    def query(self, intersection_id: str, start: Optional[int] = None, end: Optional[int] = None,
+              resolution: Optional[int] = None, max_points: int = DEFAULT_MAX_POINTS) -> Dict[str, Any]:
+        """
+        Points of one intersection with start <= time <= end (by default everything still kept),
+        as columns: {"t": [...], metric: {"mean": [...], "min": [...], "max": [...]}}. The level is
+        the finest that still holds `start` and has at most max_points points in the range, unless
+        `resolution` picks one; adjacent points are merged if the range still has too many.
+        Raises KeyError for an unknown intersection and ValueError for an unknown resolution.
+        """
+        handle = self.index[intersection_id]
+        max_points = max(1, max_points)
+        with self._lock:
+            # Copy out the points in range; downsampling and encoding run without the lock
+            if self.latest is None:
+                return {"intersection_id": intersection_id, "resolution": resolution or self.rings[0].resolution,
+                        "start": start, "end": end, "t": [],
+                        **{metric: {"mean": [], "min": [], "max": []} for metric in self.metrics}}
+            end = self.latest if end is None else end
+            if resolution is not None:
+                levels = [level for level, ring in enumerate(self.rings) if ring.resolution == resolution]
+                if not levels:
+                    raise ValueError(f"Unknown resolution {resolution} (expected one of {[r.resolution for r in self.rings]})")
+                level = levels[0]
+            else:
+                if start is None:
+                    start = min((ring.oldest() for ring in self.rings), default=0)
+                level = len(self.rings) - 1
+                for candidate, ring in enumerate(self.rings):
+                    if ring.holds(start) and (end - start) / ring.resolution <= max_points:
+                        level = candidate
+                        break
+            ring = self.rings[level]
+            if start is None:
+                start = min(ring.oldest(), self.latest)
+
+            slots = ring.slots()
+            times = ring.times[slots]
+            counts = ring.counts[slots]
+            mean = ring.mean[slots, handle]
+            low = ring.min[slots, handle]
+            high = ring.max[slots, handle]
+            partial = self._summary(level, self._bucket[level], handle) if level else None
+            if partial is not None:
+                # The bucket being filled is the newest point
+                times = np.append(times, self._bucket[level] * ring.resolution)
+                counts = np.append(counts, partial[0])
+                mean = np.vstack([mean, partial[1]])
+                low = np.vstack([low, partial[2]])
+                high = np.vstack([high, partial[3]])
+            # A point covers [t, t + resolution): include the one that starts before `start`
+            keep = (times + ring.resolution > start) & (times <= end)
+            times, counts, mean, low, high = times[keep], counts[keep], mean[keep], low[keep], high[keep]
+
+        step = 1
+        if len(times) > max_points:
+            step = math.ceil(len(times) / max_points)
+            groups = np.arange(0, len(times), step)
+            weights = counts[:, None].astype(np.float64)
+            group_counts = np.add.reduceat(counts, groups)
+            mean = np.add.reduceat(mean * weights, groups) / group_counts[:, None]
+            low = np.minimum.reduceat(low, groups)
+            high = np.maximum.reduceat(high, groups)
+            times, counts = times[groups], group_counts
+
+        result = {
+            "intersection_id": intersection_id,
+            "resolution": ring.resolution * step,
+            "start": int(start),
+            "end": int(end),
+            "t": times.tolist()
+        }
+        for column, metric in enumerate(self.metrics):
+            result[metric] = {name: np.round(values[:, column].astype(np.float64), 3).tolist()
+                              for name, values in (("mean", mean), ("min", low), ("max", high))}
+        return result
+
+    def recent(self, count: int, rows=slice(None)):
+        """Copies of the newest `count` 1 s points, oldest first: (times (k,), values (k, rows, metrics))."""
+        with self._lock:
+            ring = self.rings[0]
+            count = max(0, min(count, ring.length))
+            slots = np.arange(ring.head - count, ring.head) % ring.capacity
+            return ring.times[slots], ring.mean[slots, rows]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(ring.nbytes for ring in self.rings)
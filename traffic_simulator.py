@@ -1,44 +1,144 @@
+import heapq
+import math
+import os
 import random
-from collections import deque
+from array import array
 from typing import List, Dict, Optional
 
+# A lane keeps up to 2 * LANE_SPILL of its newest vehicles in a plain list; beyond that, the oldest
+# LANE_SPILL of them move to the lane's compact array at once.
+LANE_SPILL = 32
+
 class Lane:
+    """
+    One approach lane. The arrival times of the queued vehicles, oldest first, are split between a
+    typed array of 32-bit ints (4 bytes per vehicle, enough for 68 years of simulated seconds) for
+    the older part of a long queue and a short list of the newest vehicles. Typical queues never
+    leave the list, which is cheaper per operation, while a gridlocked network stores millions of
+    queued vehicles as a few bytes each instead of a deque slot plus a boxed int.
+    """
+    __slots__ = ('lane_id', 'queued', '_recent', '_backlog', '_head', 'arrival_time_sum', 'total_waiting_time',
+                 'vehicles_cleared')
+
     def __init__(self, lane_id: str):
         self.lane_id = lane_id
-        self.queue = deque()  # Stores arrival times of vehicles
+        self.queued = 0  # Number of vehicles in the queue
+        self._recent = []  # Newest arrival times
+        self._backlog = None  # array of older arrival times (the queue front is _backlog[_head]), None while empty
+        self._head = 0
+        self.arrival_time_sum = 0  # Running sum of the arrival times in the queue
         self.total_waiting_time = 0
         self.vehicles_cleared = 0
 
+    @property
+    def queue(self) -> tuple:
+        """
+        Arrival times of the queued vehicles, oldest first, as a read-only snapshot: vehicles join
+        and leave through add_vehicle / remove_vehicle, which keep the aggregates in step.
+        """
+        times = self._backlog[self._head:] if self._backlog else array('i')
+        times.extend(self._recent)
+        return tuple(times)
+
+    @queue.setter
+    def queue(self, arrival_times):
+        """Replaces the queue (oldest first), recomputing its length and arrival-time sum."""
+        self._backlog = array('i', arrival_times) or None
+        self._recent = []
+        self._head = 0
+        self.queued = len(self._backlog or ())
+        self.arrival_time_sum = sum(self._backlog or ())
+
     def add_vehicle(self, current_time: int):
         """Adds a vehicle to the queue with the current timestamp."""
-        self.queue.append(current_time)
+        recent = self._recent
+        recent.append(current_time)
+        if len(recent) == 2 * LANE_SPILL:
+            if self._backlog is None:
+                self._backlog = array('i')
+            self._backlog.extend(recent[:LANE_SPILL])
+            del recent[:LANE_SPILL]
+        self.queued += 1
+        self.arrival_time_sum += current_time
 
     def remove_vehicle(self, current_time: int) -> int:
         """Removes a vehicle and returns its waiting time. Returns -1 if empty."""
-        if not self.queue:
+        if not self.queued:
             return -1
-        arrival_time = self.queue.popleft()
+        backlog = self._backlog
+        if backlog is None:
+            arrival_time = self._recent.pop(0)
+        else:
+            head = self._head
+            arrival_time = backlog[head]
+            head += 1
+            if head == len(backlog):
+                self._backlog = None
+                head = 0
+            elif head >= LANE_SPILL and 2 * head >= len(backlog):
+                del backlog[:head]  # drop the departed prefix, amortized O(1) per vehicle
+                head = 0
+            self._head = head
+        self.queued -= 1
+        self.arrival_time_sum -= arrival_time
         waiting_time = current_time - arrival_time
         self.total_waiting_time += waiting_time
         self.vehicles_cleared += 1
         return waiting_time
 
     def get_queue_length(self) -> int:
-        return len(self.queue)
+        return self.queued
 
     def get_average_waiting_time(self) -> float:
         if self.vehicles_cleared == 0:
             return 0.0
         return self.total_waiting_time / self.vehicles_cleared
 
+    def get_total_current_wait(self, current_time: int) -> float:
+        """Returns the summed wait time of vehicles currently in the queue."""
+        return self.queued * current_time - self.arrival_time_sum
+
     def get_current_wait_time(self, current_time: int) -> float:
         """Returns the average wait time of vehicles currently in the queue."""
-        if not self.queue:
+        if not self.queued:
+            return 0.0
+        return self.get_total_current_wait(current_time) / self.queued
+
+    def get_wait_percentile(self, current_time: int, percentile: float) -> float:
+        """
+        Returns the nearest-rank percentile of the current wait times.
+        The queue is FIFO, so it is already ordered by arrival time (longest wait first) and the
+        k-th longest wait is read by position instead of sorting the queue.
+        """
+        if not self.queued:
             return 0.0
-        total_wait = sum(current_time - arrival_time for arrival_time in self.queue)
-        return total_wait / len(self.queue)
+        n = self.queued
+        rank = min(max(math.ceil(percentile / 100 * n), 1), n)  # rank among waits sorted ascending
+        k = n - rank  # position from the front of the queue
+        backlog = len(self._backlog) - self._head if self._backlog else 0
+        return current_time - (self._backlog[self._head + k] if k < backlog else self._recent[k - backlog])
+
+class RandomStream(random.Random):
+    """
+    Seedable random generator owned by one simulator, instead of the shared module-level one.
+    A random.Random, so every draw is still a single C call. substream(key) derives an independent
+    stream from (seed, key) that is the same in every process, so per-intersection streams don't
+    depend on stepping order, partitioning or other simulators in the process.
+    """
+
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = int.from_bytes(os.urandom(8), 'big')  # unseeded: fresh entropy, kept so the run can be reproduced
+        self.key = seed
+        super().__init__(seed)
+
+    def substream(self, key) -> 'RandomStream':
+        return RandomStream(f"{self.key}:{key}")
 
 class Intersection:
+    __slots__ = ('intersection_id', 'approaches', 'phases', 'current_phase_index', 'phase_timer', '_green_duration',
+                 '_clearance_rate', '_manual_control', 'event_listener', 'rng')
+
     def __init__(self, intersection_id: str, green_duration: int = 10, clearance_rate: float = 0.5, manual_control: bool = False):
         self.intersection_id = intersection_id
         # Approaches: North, East, South, West
@@ -51,9 +151,11 @@ class Intersection:
         self.phases = ['NS_GREEN', 'EW_GREEN']
         self.current_phase_index = 0
         self.phase_timer = 0
-        self.green_duration = green_duration
-        self.clearance_rate = clearance_rate # Vehicles per second per lane
-        self.manual_control = manual_control
+        self.event_listener = None  # Set by an event-driven TrafficSimulator to hear phase changes, arrivals and settings
+        self._green_duration = green_duration
+        self._clearance_rate = clearance_rate # Vehicles per second per lane
+        self._manual_control = manual_control
+        self.rng = random  # Source of random draws; a TrafficSimulator gives each intersection its own RandomStream
 
     @property
     def north_queue(self): return self.approaches['N'].get_queue_length()
@@ -68,33 +170,66 @@ class Intersection:
     def current_green_lane(self):
         return self.phases[self.current_phase_index]
 
-    def step(self, current_time: int):
-        """Executes one time step of the intersection logic."""
+    # Signal settings. Changing one tells the event listener, whose queued events were drawn for the old value.
+    @property
+    def green_duration(self): return self._green_duration
+    @green_duration.setter
+    def green_duration(self, value):
+        self._set_setting('_green_duration', value)
+
+    @property
+    def clearance_rate(self): return self._clearance_rate
+    @clearance_rate.setter
+    def clearance_rate(self, value):
+        self._set_setting('_clearance_rate', value)
+
+    @property
+    def manual_control(self): return self._manual_control
+    @manual_control.setter
+    def manual_control(self, value):
+        self._set_setting('_manual_control', value)
+
+    def _set_setting(self, slot: str, value):
+        if getattr(self, slot) != value:
+            setattr(self, slot, value)
+            if self.event_listener:
+                self.event_listener.on_settings_change(self)
+
+    def step(self, current_time: int) -> List[str]:
+        """Executes one time step of the intersection logic. Returns the approaches a vehicle departed from."""
         self.phase_timer += 1
         
         # Switch phase if duration exceeded AND NOT manual control
-        if not self.manual_control and self.phase_timer >= self.green_duration:
+        if not self._manual_control and self.phase_timer >= self._green_duration:
             self.switch_phase()
         
+        # Process departures for green lanes (a lane without a queue can't discharge, so it skips its draw)
+        departures = []
+        for lane_key in self.green_approaches():
+            lane = self.approaches[lane_key]
+            if lane.queued and self.rng.random() < self._clearance_rate:
+                lane.remove_vehicle(current_time)
+                departures.append(lane_key)
+        return departures
+
+    def green_approaches(self) -> List[str]:
+        """Returns the approaches that have a green light in the current phase."""
         current_phase = self.phases[self.current_phase_index]
-        
-        # Determine which lanes have green light
-        green_lanes = []
         if current_phase == 'NS_GREEN':
-            green_lanes = ['N', 'S']
+            return ['N', 'S']
         elif current_phase == 'EW_GREEN':
-            green_lanes = ['E', 'W']
-            
-        # Process departures for green lanes
-        for lane_key in green_lanes:
-            lane = self.approaches[lane_key]
-            if random.random() < self.clearance_rate:
-                lane.remove_vehicle(current_time)
+            return ['E', 'W']
+        return []
 
     def switch_phase(self):
         """Manually switches to the next phase."""
-        self.current_phase_index = (self.current_phase_index + 1) % len(self.phases)
+        self._set_phase((self.current_phase_index + 1) % len(self.phases))
+
+    def _set_phase(self, phase_index: int):
+        self.current_phase_index = phase_index
         self.phase_timer = 0
+        if self.event_listener:
+            self.event_listener.on_phase_change(self)
         
     def switch_light(self, direction: str = None):
         """
@@ -104,21 +239,21 @@ class Intersection:
         """
         if direction:
             if direction == 'NS' and self.phases[self.current_phase_index] != 'NS_GREEN':
-                self.current_phase_index = self.phases.index('NS_GREEN')
-                self.phase_timer = 0
+                self._set_phase(self.phases.index('NS_GREEN'))
             elif direction == 'EW' and self.phases[self.current_phase_index] != 'EW_GREEN':
-                self.current_phase_index = self.phases.index('EW_GREEN')
-                self.phase_timer = 0
+                self._set_phase(self.phases.index('EW_GREEN'))
         else:
             self.switch_phase()
 
     def add_vehicle(self, approach: str, current_time: int):
         if approach in self.approaches:
             self.approaches[approach].add_vehicle(current_time)
+            if self.event_listener:
+                self.event_listener.on_vehicle_added(self, approach)
 
     def get_state(self, current_time: int = 0) -> Dict:
         # Calculate average wait time of CURRENTLY waiting vehicles
-        total_current_wait = sum(lane.get_current_wait_time(current_time) * lane.get_queue_length() for lane in self.approaches.values())
+        total_current_wait = sum(lane.get_total_current_wait(current_time) for lane in self.approaches.values())
         total_queue = sum(lane.get_queue_length() for lane in self.approaches.values())
         
         # Weighted average
@@ -130,6 +265,11 @@ class Intersection:
             'phase_timer': self.phase_timer,
             'queues': {k: v.get_queue_length() for k, v in self.approaches.items()},
             'avg_waiting_time': avg_wait,
+            'total_waiting_time': total_current_wait,
+            'wait_percentiles': {
+                k: {'p50': v.get_wait_percentile(current_time, 50), 'p95': v.get_wait_percentile(current_time, 95)}
+                for k, v in self.approaches.items()
+            },
             # Add specific queue keys for easier access if needed
             'north_queue': self.north_queue,
             'south_queue': self.south_queue,
@@ -147,58 +287,552 @@ class Intersection:
             'current_green_lane': self.current_green_lane
         }
 
+class Link:
+    """
+    Directed road carrying the vehicles that leave `approach` of one intersection into the same
+    approach of the next one (through movement: a vehicle that waited on the N approach is heading
+    south, so it joins the N approach of the intersection to the south).
+
+    Vehicles in transit are only counted, in a ring of `travel_time` per-second buckets indexed by
+    arrival time modulo travel_time: pushing and popping are O(1) and a link costs the same whether
+    it carries one vehicle or a hundred.
+
+    from_handle / to_handle are None for the end of a boundary link that is simulated in another
+    partition (see partitioned.py).
+    """
+
+    def __init__(self, from_id: str, to_id: str, approach: str, travel_time: int,
+                 from_handle: Optional[int], to_handle: Optional[int]):
+        if travel_time < 1:
+            raise ValueError("travel_time must be at least 1 second")
+        self.from_id = from_id
+        self.to_id = to_id
+        self.approach = approach
+        self.travel_time = travel_time
+        self.from_handle = from_handle
+        self.to_handle = to_handle
+        self.buckets = [0] * travel_time  # vehicles arriving at time t are counted in buckets[t % travel_time]
+        self.in_transit = 0
+        self.vehicles_delivered = 0
+
+    def push(self, current_time: int, count: int = 1) -> bool:
+        """Vehicles enter the link; they arrive at current_time + travel_time. Returns True if they are the first for that second."""
+        slot = current_time % self.travel_time
+        first = self.buckets[slot] == 0
+        self.buckets[slot] += count
+        self.in_transit += count
+        return first
+
+    def pop(self, current_time: int) -> int:
+        """Removes and returns the number of vehicles arriving at current_time."""
+        slot = current_time % self.travel_time
+        count = self.buckets[slot]
+        if count:
+            self.buckets[slot] = 0
+            self.in_transit -= count
+            self.vehicles_delivered += count
+        return count
+
+    def arriving_within(self, current_time: int, horizon: int) -> int:
+        """Vehicles that will arrive in the next `horizon` seconds."""
+        if horizon >= self.travel_time:
+            return self.in_transit
+        buckets, size = self.buckets, self.travel_time
+        return sum(buckets[(current_time + k) % size] for k in range(1, horizon + 1))
+
+    def get_state(self, current_time: int, horizon: int = 10) -> Dict:
+        return {
+            'from': self.from_id,
+            'to': self.to_id,
+            'approach': self.approach,
+            'travel_time': self.travel_time,
+            'in_transit': self.in_transit,
+            'arriving_soon': self.arriving_within(current_time, horizon),
+            'vehicles_delivered': self.vehicles_delivered
+        }
+
+# Through movement: vehicles waiting on an approach leave towards the opposite side.
+# (row, column) offset of the downstream intersection in a grid, rows counted southwards.
+THROUGH_OFFSETS = {'N': (1, 0), 'S': (-1, 0), 'E': (0, -1), 'W': (0, 1)}
+
+# Highest per-lane arrival rate for which the fixed-tick mode draws arrival times ahead instead of
+# drawing every lane every second (measured crossover on CPython: ~0.08).
+SKIP_AHEAD_RATE = 0.05
+
+# Event kinds for the event-driven mode. Events at the same time are processed in this order,
+# which mirrors a fixed tick: arrivals and link transfers, then the phase timer, then departures.
+EVENT_ARRIVAL = 0
+EVENT_TRANSFER = 1
+EVENT_PHASE_SWITCH = 2
+EVENT_DEPARTURE = 3
+
+
+def sample_trials(probability: float, rng=random) -> Optional[int]:
+    """
+    Number of per-second Bernoulli(probability) trials up to and including the first success.
+    Sampled as the ceiling of an exponential inter-event time with rate -ln(1 - p), which is exactly
+    geometric: drawing the next success ahead is equivalent to drawing every second.
+    """
+    if probability <= 0:
+        return None
+    if probability >= 1:
+        return 1
+    return max(1, math.ceil(rng.expovariate(-math.log1p(-probability))))
+
+
 class TrafficSimulator:
-    def __init__(self, logger=None):
+    def __init__(self, logger=None, event_driven: bool = False, seed=None):
         self.intersections: List[Intersection] = []
+        self.index: Dict[str, int] = {}  # intersection_id -> stable integer handle (position in self.intersections)
         self.current_time = 0
         self.arrival_rate = 0.1 # Vehicles per second per lane (Poisson lambda)
         self.logger = logger
+        # Every intersection draws from its own substream of the simulator's RandomStream, derived from
+        # (seed, intersection_id), so results don't depend on the order intersections are stepped in,
+        # on how they are partitioned, or on other simulators in the process. Without a seed one is
+        # picked at random (and kept in self.seed, so the run can be reproduced).
+        self.rng = RandomStream(seed)
+        self.seed = self.rng.key
+
+        # Road network: links between intersections, and per handle the outgoing links by source
+        # approach, the incoming links by destination approach and the approaches that still get
+        # random external arrivals (those not fed by a link).
+        self.links: List[Link] = []
+        self._out_links: List[Dict[str, Link]] = []
+        self._in_links: List[Dict[str, Link]] = []
+        self._arrival_approaches: List[List[str]] = []
 
-    def add_intersection(self, intersection: Intersection):
+        # Fixed-tick arrivals at low rates (up to SKIP_AHEAD_RATE): per handle, the time of each arrival
+        # lane's next vehicle, drawn ahead, and the earliest of them, so a step only compares it with
+        # the clock. At higher rates most lanes see an arrival within a few seconds and one draw per
+        # lane per second is cheaper.
+        self._arrival_due: List[Dict[str, float]] = []
+        self._next_arrival: List[float] = []
+        self._sampled_rate = None  # arrival_rate the schedule was drawn for; None while it is not used
+        # Optional demand model (demand.py) that adds the arrivals instead of arrival_rate
+        self.demand = None
+
+        # Event-driven (next-event) mode: instead of drawing a random number per lane per second,
+        # arrivals, timer phase switches and departures are scheduled in a priority queue and the
+        # simulator jumps straight from one event to the next.
+        self.event_driven = event_driven
+        self._events = []  # heap of (time, kind, seq, handle, approach, version)
+        self._event_seq = 0
+        self._phase_version: List[int] = []  # bumped on every phase change to invalidate queued events
+        self._phase_started: List[int] = []
+        self._pending_departures = set()  # (handle, approach) with a departure event queued
+        self._processing_events = False
+        # The arrival_rate the queued arrival events were drawn for, checked by advance() (arrival events
+        # carry _arrival_version, bumped when it changes). Intersections report their own settings
+        # changes through on_settings_change.
+        self._scheduled_rate = None
+        self._arrival_version = 0
+
+    def add_intersection(self, intersection: Intersection) -> int:
+        """Registers an intersection and returns its integer handle."""
+        if intersection.intersection_id in self.index:
+            raise ValueError(f"Intersection {intersection.intersection_id} already registered")
+        if not self.event_driven and self.demand is None:
+            self._check_arrival_rate(self.current_time)
+        handle = len(self.intersections)
+        intersection.rng = self.rng.substream(intersection.intersection_id)
         self.intersections.append(intersection)
+        self.index[intersection.intersection_id] = handle
+        self._out_links.append({})
+        self._in_links.append({})
+        self._arrival_approaches.append(list(intersection.approaches))
+        self._arrival_due.append({})
+        self._next_arrival.append(math.inf)
+        if self._sampled_rate is not None:
+            self._draw_arrivals(handle, self.current_time)
+        if self.event_driven:
+            self._phase_version.append(0)
+            self._phase_started.append(self.current_time - intersection.phase_timer)
+            if self._scheduled_rate is None:
+                self._scheduled_rate = self.arrival_rate
+            intersection.event_listener = self
+            for approach in intersection.approaches:
+                self._schedule_arrival(handle, approach, self.current_time + 1)
+            self._schedule_phase_switch(handle)
+            for approach in intersection.green_approaches():
+                self._schedule_departure(handle, approach, self.current_time + 1)
+        return handle
+
+    def add_link(self, from_id: str, to_id: str, approach: str, travel_time: int = 10) -> Link:
+        """
+        Connects two registered intersections: vehicles departing from `approach` of from_id arrive
+        `travel_time` seconds later on the same approach of to_id, which stops receiving random arrivals.
+        """
+        from_handle, to_handle = self.index.get(from_id), self.index.get(to_id)
+        if from_handle is None or to_handle is None:
+            raise ValueError(f"Unknown intersection in link {from_id} -> {to_id}")
+        return self._add_link(from_id, to_id, approach, travel_time, from_handle, to_handle)
+
+    def add_boundary_link(self, from_id: str, to_id: str, approach: str, travel_time: int = 10) -> Link:
+        """
+        Adds a link with only one end in this simulator, the other being simulated elsewhere.
+        Departures onto an outgoing boundary link stay in its ring until the caller hands them over
+        with link.pop(current_time); an incoming boundary link is fed with link.push(departure_time, count).
+        """
+        if self.event_driven:
+            raise ValueError("Boundary links require the fixed-tick mode")
+        from_handle, to_handle = self.index.get(from_id), self.index.get(to_id)
+        if (from_handle is None) == (to_handle is None):
+            raise ValueError(f"Boundary link {from_id} -> {to_id} must have exactly one end in this simulator")
+        return self._add_link(from_id, to_id, approach, travel_time, from_handle, to_handle)
+
+    def _add_link(self, from_id: str, to_id: str, approach: str, travel_time: int,
+                  from_handle: Optional[int], to_handle: Optional[int]) -> Link:
+        if approach not in THROUGH_OFFSETS:
+            raise ValueError(f"Unknown approach {approach!r}")
+        if from_handle is not None and approach in self._out_links[from_handle]:
+            raise ValueError(f"{from_id} {approach} already has an outgoing link")
+        if to_handle is not None and approach in self._in_links[to_handle]:
+            raise ValueError(f"{to_id} {approach} already has an incoming link")
+        link = Link(from_id, to_id, approach, travel_time, from_handle, to_handle)
+        self.links.append(link)
+        if from_handle is not None:
+            self._out_links[from_handle][approach] = link
+        if to_handle is not None:
+            self._in_links[to_handle][approach] = link
+            self._arrival_approaches[to_handle].remove(approach)
+            due = self._arrival_due[to_handle]
+            due.pop(approach, None)
+            self._next_arrival[to_handle] = min(due.values(), default=math.inf)
+        return link
+
+    def get_incoming_links(self, intersection_id: str) -> Dict[str, Link]:
+        """Links feeding an intersection, by destination approach."""
+        handle = self.index.get(intersection_id)
+        return dict(self._in_links[handle]) if handle is not None else {}
+
+    def get_outgoing_links(self, intersection_id: str) -> Dict[str, Link]:
+        """Links leaving an intersection, by source approach."""
+        handle = self.index.get(intersection_id)
+        return dict(self._out_links[handle]) if handle is not None else {}
+
+    def get_handle(self, intersection_id: str) -> Optional[int]:
+        return self.index.get(intersection_id)
+
+    def get_intersection(self, intersection_id: str) -> Optional[Intersection]:
+        handle = self.index.get(intersection_id)
+        return self.intersections[handle] if handle is not None else None
 
     def step(self):
+        if self.event_driven:
+            self.advance(1)
+            return
         self.current_time += 1
-        intersection_states = []
-        for intersection in self.intersections:
-            # Simulate Arrivals (Poisson)
-            for approach in intersection.approaches:
-                if random.random() < self.arrival_rate:
-                    intersection.add_vehicle(approach, self.current_time)
+        if self.links:
+            self._deliver_links(self.current_time)
+        demand = self.demand
+        if demand is not None:
+            demand.add_arrivals(self, self.current_time)
+        skip_ahead = demand is None and self._check_arrival_rate(self.current_time - 1)
+        next_arrival = self._next_arrival
+        for handle, intersection in enumerate(self.intersections):
+            # Simulate Arrivals (Bernoulli per second) on lanes that are not fed by a link
+            if skip_ahead:
+                if next_arrival[handle] <= self.current_time:
+                    self._arrive(handle, intersection, self.current_time)
+            elif demand is None:
+                rng = intersection.rng
+                for approach in self._arrival_approaches[handle]:
+                    if rng.random() < self.arrival_rate:
+                        intersection.add_vehicle(approach, self.current_time)
             
-            # Simulate Intersection Logic
-            intersection.step(self.current_time)
-            intersection_states.append(intersection.get_state(self.current_time))
+            # Simulate Intersection Logic; departures onto a link travel to the next intersection
+            departures = intersection.step(self.current_time)
+            if departures and self._out_links[handle]:
+                out_links = self._out_links[handle]
+                for approach in departures:
+                    link = out_links.get(approach)
+                    if link is not None:
+                        link.push(self.current_time)
             
         if self.logger:
-            self.logger.log_step(self.current_time, intersection_states)
+            self.logger.log_step(self.current_time, [i.get_state(self.current_time) for i in self.intersections])
 
     def run(self, steps: int):
-        for _ in range(steps):
-            self.step()
+        if self.event_driven:
+            self.advance(steps)
+        else:
+            for _ in range(steps):
+                self.step()
         if self.logger:
             self.logger.save_json()
 
+    def set_demand(self, demand):
+        """
+        Replaces the arrival_rate draws with a demand model from demand.py (a DemandProfile or a
+        TraceReplay); None restores them. Only the fixed-tick mode supports demand models.
+        """
+        if demand is not None and self.event_driven:
+            raise ValueError("Demand models need a fixed-tick TrafficSimulator")
+        self.demand = demand
+        self._sampled_rate = None  # any arrivals drawn ahead are stale
+        if self.current_time == 0:
+            # Restart the streams (add_intersection may have drawn arrivals ahead), so a run does not
+            # depend on whether the demand was set before or after the network was built
+            for intersection in self.intersections:
+                intersection.rng = self.rng.substream(intersection.intersection_id)
+
+    def _check_arrival_rate(self, after: int) -> bool:
+        """
+        Returns whether arrivals are drawn ahead at the current arrival_rate, (re)drawing every
+        pending arrival when that starts or the rate changed. The draws start after second `after`,
+        the last one whose arrivals are already settled (inside a step, the previous second), and
+        are memoryless, so this is exact.
+        """
+        skip_ahead = self.arrival_rate <= SKIP_AHEAD_RATE
+        if skip_ahead and self.arrival_rate != self._sampled_rate:
+            self._sampled_rate = self.arrival_rate
+            for handle in range(len(self.intersections)):
+                self._draw_arrivals(handle, after)
+        elif not skip_ahead:
+            self._sampled_rate = None
+        return skip_ahead
+
+    def _draw_arrivals(self, handle: int, after: int):
+        rng = self.intersections[handle].rng
+        due = self._arrival_due[handle]
+        for approach in self._arrival_approaches[handle]:
+            due[approach] = self._next_arrival_time(after, rng)
+        self._next_arrival[handle] = min(due.values(), default=math.inf)
+
+    def _next_arrival_time(self, current_time: int, rng) -> float:
+        trials = sample_trials(self.arrival_rate, rng)
+        return math.inf if trials is None else current_time + trials
+
+    def _arrive(self, handle: int, intersection: Intersection, current_time: int):
+        due = self._arrival_due[handle]
+        for approach, time in due.items():
+            if time <= current_time:
+                intersection.add_vehicle(approach, current_time)
+                due[approach] = self._next_arrival_time(current_time, intersection.rng)
+        self._next_arrival[handle] = min(due.values())
+
+    def _deliver_links(self, current_time: int):
+        """Moves the vehicles whose link travel ends at current_time into their downstream lanes."""
+        intersections = self.intersections
+        for link in self.links:
+            if link.in_transit and link.to_handle is not None:
+                for _ in range(link.pop(current_time)):
+                    intersections[link.to_handle].add_vehicle(link.approach, current_time)
+
+    # --- Event-driven mode ---
+    def advance(self, duration: int, record_steps: bool = True):
+        """
+        Advances an event-driven simulation by `duration` seconds, processing only the events that
+        fall in that window. If a logger is attached and record_steps is True, the same per-step
+        metrics as the fixed-tick mode are logged for every second; otherwise the simulator jumps
+        straight to the end of the window.
+        """
+        if not self.event_driven:
+            raise RuntimeError("advance() requires an event-driven TrafficSimulator")
+        self._check_scheduled_rate()
+        target = self.current_time + duration
+        if self.logger and record_steps:
+            for t in range(self.current_time + 1, target + 1):
+                self._process_events(t)
+                self.current_time = t
+                self._sync_phase_timers()
+                self.logger.log_step(t, [i.get_state(t) for i in self.intersections])
+        else:
+            self._process_events(target)
+            self.current_time = target
+            self._sync_phase_timers()
+
+    def _check_scheduled_rate(self):
+        """
+        Redraws the queued arrivals if they were scheduled for an arrival_rate that has changed since
+        (the fixed-tick mode reads it every second). Draws are memoryless, so the new ones start from
+        the next second.
+        """
+        if self.arrival_rate != self._scheduled_rate and self.intersections:
+            self._scheduled_rate = self.arrival_rate
+            self._arrival_version += 1
+            start = self.current_time + 1
+            for handle, approaches in enumerate(self._arrival_approaches):
+                for approach in approaches:
+                    self._schedule_arrival(handle, approach, start)
+
+    def on_settings_change(self, intersection: Intersection):
+        """Intersection callback: redraws the timer/departure events queued for its old signal settings."""
+        self._reschedule_signal(self.index[intersection.intersection_id], self._next_trial_time())
+
+    def on_phase_change(self, intersection: Intersection):
+        """Intersection callback: invalidates queued timer/departure events and reschedules them."""
+        handle = self.index[intersection.intersection_id]
+        self._phase_started[handle] = self.current_time
+        self._reschedule_signal(handle, self._next_trial_time())
+
+    def _reschedule_signal(self, handle: int, start: int):
+        """Invalidates the queued timer/departure events of an intersection and schedules new ones."""
+        self._phase_version[handle] += 1
+        intersection = self.intersections[handle]
+        for approach in intersection.approaches:
+            self._pending_departures.discard((handle, approach))
+        self._schedule_phase_switch(handle)
+        for approach in intersection.green_approaches():
+            self._schedule_departure(handle, approach, start)
+
+    def on_vehicle_added(self, intersection: Intersection, approach: str):
+        """Intersection callback: a vehicle joining an empty green lane needs a departure event."""
+        if approach in intersection.green_approaches():
+            self._schedule_departure(self.index[intersection.intersection_id], approach, self._next_trial_time())
+
+    def _next_trial_time(self) -> int:
+        # Inside a step the current second still gets its departure draw (as in Intersection.step);
+        # changes made between steps (e.g. by ControllerAgent) take effect from the next second.
+        return self.current_time if self._processing_events else self.current_time + 1
+
+    def _push_event(self, time: int, kind: int, handle: int, approach: Optional[str] = None, version: Optional[int] = None):
+        self._event_seq += 1
+        if version is None:
+            version = self._phase_version[handle]
+        heapq.heappush(self._events, (time, kind, self._event_seq, handle, approach, version))
+
+    def _schedule_arrival(self, handle: int, approach: str, start: int):
+        trials = sample_trials(self.arrival_rate, self.intersections[handle].rng)
+        if trials is not None:
+            self._push_event(start + trials - 1, EVENT_ARRIVAL, handle, approach, self._arrival_version)
+
+    def _schedule_phase_switch(self, handle: int):
+        intersection = self.intersections[handle]
+        if not intersection.manual_control:
+            # A timer that already ran past a shortened green_duration switches at the next second
+            due = max(self._phase_started[handle] + max(intersection.green_duration, 1), self.current_time + 1)
+            self._push_event(due, EVENT_PHASE_SWITCH, handle)
+
+    def _schedule_departure(self, handle: int, approach: str, start: int):
+        key = (handle, approach)
+        intersection = self.intersections[handle]
+        if key in self._pending_departures or not intersection.approaches[approach].queued:
+            return
+        trials = sample_trials(intersection.clearance_rate, intersection.rng)
+        if trials is not None:
+            self._pending_departures.add(key)
+            self._push_event(start + trials - 1, EVENT_DEPARTURE, handle, approach)
+
+    def _process_events(self, until: int):
+        events = self._events
+        self._processing_events = True
+        try:
+            while events and events[0][0] <= until:
+                time, kind, _, handle, approach, version = heapq.heappop(events)
+                self.current_time = time
+                intersection = self.intersections[handle]
+                if kind == EVENT_ARRIVAL:
+                    # Skipped if drawn for an old arrival_rate or the lane is now fed by a link
+                    if version == self._arrival_version and approach in self._arrival_approaches[handle]:
+                        intersection.add_vehicle(approach, time)
+                        self._schedule_arrival(handle, approach, time + 1)
+                elif kind == EVENT_TRANSFER:
+                    for _ in range(self._in_links[handle][approach].pop(time)):
+                        intersection.add_vehicle(approach, time)
+                elif version != self._phase_version[handle]:
+                    continue  # Scheduled under a phase that has since changed
+                elif kind == EVENT_PHASE_SWITCH:
+                    intersection.switch_phase()
+                elif kind == EVENT_DEPARTURE:
+                    self._pending_departures.discard((handle, approach))
+                    link = self._out_links[handle].get(approach)
+                    if intersection.approaches[approach].remove_vehicle(time) >= 0 and link is not None:
+                        # One transfer event per link and arrival second, however many vehicles it carries
+                        if link.push(time):
+                            self._push_event(time + link.travel_time, EVENT_TRANSFER, link.to_handle, approach)
+                    self._schedule_departure(handle, approach, time + 1)
+        finally:
+            self._processing_events = False
+
+    def _sync_phase_timers(self):
+        for handle, intersection in enumerate(self.intersections):
+            intersection.phase_timer = self.current_time - self._phase_started[handle]
+
     # --- Tool Wrappers for Agents ---
     def get_traffic_status(self, intersection_id: str) -> Dict:
         """Returns current queue lengths for all lanes."""
-        for intersection in self.intersections:
-            if intersection.intersection_id == intersection_id:
-                return intersection.get_status()
-        return {"error": "Intersection not found"}
+        intersection = self.get_intersection(intersection_id)
+        if intersection is None:
+            return {"error": "Intersection not found"}
+        return intersection.get_status()
+
+    def get_traffic_status_many(self, intersection_ids: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Batch form of get_traffic_status. Returns {intersection_id: status}, all intersections by default."""
+        if intersection_ids is None:
+            return {i.intersection_id: i.get_status() for i in self.intersections}
+        return {i_id: self.get_traffic_status(i_id) for i_id in intersection_ids}
+
+    def get_link_status(self, intersection_id: str, horizon: int = 10) -> Dict:
+        """Returns the occupancy of the links feeding an intersection, by approach."""
+        if intersection_id not in self.index:
+            return {"error": "Intersection not found"}
+        return {approach: link.get_state(self.current_time, horizon)
+                for approach, link in self.get_incoming_links(intersection_id).items()}
+
+    def get_incoming_traffic_many(self, horizon: int = 10) -> Dict[str, Dict[str, int]]:
+        """Vehicles arriving over links in the next `horizon` seconds: {intersection_id: {approach: count}}."""
+        incoming = {}
+        for link in self.links:
+            if link.in_transit and link.to_handle is not None:
+                incoming.setdefault(link.to_id, {})[link.approach] = link.arriving_within(self.current_time, horizon)
+        return incoming
+
+    def fill_traffic_arrays(self, queues, phase, wait, current_time: Optional[int] = None):
+        """
+        Array form of get_traffic_status_many: writes every intersection's queue lengths and current
+        average waits ((n, 4), lanes N, E, S, W) and phase index ((n,)) into the given arrays.
+        """
+        if current_time is None:
+            current_time = self.current_time
+        for handle, intersection in enumerate(self.intersections):
+            phase[handle] = intersection.current_phase_index
+            for lane, approach in enumerate(intersection.approaches.values()):
+                length = approach.queued
+                queues[handle, lane] = length
+                wait[handle, lane] = (length * current_time - approach.arrival_time_sum) / length if length else 0.0
 
     def execute_signal_change(self, intersection_id: str, action: str) -> str:
         """Executes a signal change. Action can be 'HOLD' or 'SWITCH'."""
-        for intersection in self.intersections:
-            if intersection.intersection_id == intersection_id:
-                if action == "SWITCH":
-                    intersection.switch_light()
-                    return f"Signal SWITCHED for {intersection_id}"
-                elif action == "HOLD":
-                    return f"Signal HELD for {intersection_id}"
-                # Support directional switch if needed, e.g. "SWITCH_NS"
-                elif action.startswith("SWITCH_"):
-                    direction = action.split("_")[1]
-                    intersection.switch_light(direction)
-                    return f"Signal SWITCHED to {direction} for {intersection_id}"
+        intersection = self.get_intersection(intersection_id)
+        if intersection is not None:
+            if action == "SWITCH":
+                intersection.switch_light()
+                return f"Signal SWITCHED for {intersection_id}"
+            elif action == "HOLD":
+                return f"Signal HELD for {intersection_id}"
+            # Support directional switch if needed, e.g. "SWITCH_NS"
+            elif action.startswith("SWITCH_"):
+                direction = action.split("_")[1]
+                intersection.switch_light(direction)
+                return f"Signal SWITCHED to {direction} for {intersection_id}"
         return "Intersection not found or Invalid Action"
+
+    def execute_signal_changes(self, actions: Dict[str, str]) -> Dict[str, str]:
+        """Batch form of execute_signal_change. Takes {intersection_id: action}, returns {intersection_id: result}."""
+        return {i_id: self.execute_signal_change(i_id, action) for i_id, action in actions.items()}
+
+    def execute_signal_switches(self, handles) -> int:
+        """Toggles the phase of every intersection in `handles` (integer handles, e.g. from decide_batch). Returns the count."""
+        for handle in handles:
+            self.intersections[handle].switch_light()
+        return len(handles)
+
+
+def build_grid(sim: TrafficSimulator, rows: int, cols: int, travel_time: int = 10, **intersection_kwargs) -> List[List[str]]:
+    """
+    Adds a rows x cols grid of intersections ("R{row}C{col}", row 0 in the north) linked to their
+    neighbours in all four directions. Only lanes on the edge of the grid get random arrivals.
+    Returns the intersection ids by row.
+    """
+    ids = [[f"R{r}C{c}" for c in range(cols)] for r in range(rows)]
+    for row in ids:
+        for intersection_id in row:
+            sim.add_intersection(Intersection(intersection_id, **intersection_kwargs))
+    for r in range(rows):
+        for c in range(cols):
+            for approach, (dr, dc) in THROUGH_OFFSETS.items():
+                if 0 <= r + dr < rows and 0 <= c + dc < cols:
+                    sim.add_link(ids[r][c], ids[r + dr][c + dc], approach, travel_time)
+    return ids
@@ -0,0 +1,340 @@
+import math
+import numpy as np
+from typing import Dict, List, Optional
+
+# Lane order used for the columns of every per-lane array (same as Intersection.approaches)
+LANES = ('N', 'E', 'S', 'W')
+PHASES = ('NS_GREEN', 'EW_GREEN')
+
+# GREEN_MASK[phase] -> which lanes are allowed to discharge in that phase
+GREEN_MASK = np.array([
+    [True, False, True, False],   # NS_GREEN: N, S
+    [False, True, False, True],   # EW_GREEN: E, W
+])
+
+
+class IntersectionView:
+    """
+    Lightweight stand-in for an Intersection whose state lives in a VectorizedTrafficSimulator.
+    Exposes the attributes and methods the agents and server use, reading/writing the shared arrays.
+    """
+
+    def __init__(self, sim: 'VectorizedTrafficSimulator', handle: int, intersection_id: str):
+        self.sim = sim
+        self.handle = handle
+        self.intersection_id = intersection_id
+        self.phases = list(PHASES)
+
+    @property
+    def current_phase_index(self) -> int:
+        return int(self.sim.phase[self.handle])
+
+    @property
+    def phase_timer(self) -> int:
+        return int(self.sim.phase_timer[self.handle])
+
+    @property
+    def green_duration(self) -> int:
+        return int(self.sim.green_duration[self.handle])
+
+    @property
+    def clearance_rate(self) -> float:
+        return float(self.sim.clearance_rate[self.handle])
+
+    @property
+    def manual_control(self) -> bool:
+        return bool(self.sim.manual_control[self.handle])
+
+    @property
+    def north_queue(self): return int(self.sim.queue[self.handle, 0])
+    @property
+    def east_queue(self): return int(self.sim.queue[self.handle, 1])
+    @property
+    def south_queue(self): return int(self.sim.queue[self.handle, 2])
+    @property
+    def west_queue(self): return int(self.sim.queue[self.handle, 3])
+
+    @property
+    def current_green_lane(self):
+        return PHASES[self.current_phase_index]
+
+    def switch_phase(self):
+        self.sim.phase[self.handle] ^= 1
+        self.sim.phase_timer[self.handle] = 0
+
+    def switch_light(self, direction: str = None):
+        """Same semantics as Intersection.switch_light: 'NS'/'EW' selects a phase, None toggles."""
+        if direction:
+            phase_name = f"{direction}_GREEN"
+            if phase_name in PHASES and self.current_phase_index != PHASES.index(phase_name):
+                self.switch_phase()
+        else:
+            self.switch_phase()
+
+    def add_vehicle(self, approach: str, current_time: int):
+        if approach in LANES:
+            self.sim.push_vehicles(self.handle, LANES.index(approach), [current_time])
+
+    def get_state(self, current_time: int = 0) -> Dict:
+        return self.sim.get_intersection_state(self.handle, current_time)
+
+    def get_status(self) -> Dict:
+        return {
+            'north_queue': self.north_queue,
+            'south_queue': self.south_queue,
+            'east_queue': self.east_queue,
+            'west_queue': self.west_queue,
+            'current_green_lane': self.current_green_lane
+        }
+
+
+class VectorizedTrafficSimulator:
+    """
+    Array-backed alternative to TrafficSimulator for large grids.
+
+    All per-intersection state (queues, phase, phase timer, wait aggregates) is stored in NumPy
+    arrays of shape (N,) or (N, 4) and a step is advanced with two batched random draws instead of
+    a Python loop over intersections and lanes. The arrival times of the queued vehicles are kept
+    per lane in a FIFO ring, `arrivals` (N, 4, depth) of 32-bit ints, so departures remove the
+    oldest vehicle and waits and wait percentiles are exact, as in the Python engine. `depth` is
+    shared by all lanes and doubles whenever a queue outgrows it, so the rings cost
+    16 * depth bytes per intersection, about the longest queue's length.
+    """
+
+    def __init__(self, logger=None, seed: Optional[int] = None, capacity: int = 16, depth: int = 16):
+        self.current_time = 0
+        self.arrival_rate = 0.1  # Vehicles per second per lane (Poisson lambda)
+        self.logger = logger
+        self.rng = np.random.default_rng(seed)
+
+        self.size = 0
+        self.ids: List[str] = []
+        self.index: Dict[str, int] = {}  # intersection_id -> handle (row in the state arrays)
+        self.intersections: List[IntersectionView] = []
+        self.depth = max(depth, 1)
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        self.capacity = max(capacity, 1)
+        self.queue = np.zeros((self.capacity, 4), dtype=np.int64)
+        self.arrivals = np.zeros((self.capacity, 4, self.depth), dtype=np.int32)  # ring of queued arrival times
+        self.head = np.zeros((self.capacity, 4), dtype=np.int64)  # ring slot of each lane's oldest vehicle
+        self.arrival_sum = np.zeros((self.capacity, 4), dtype=np.float64)
+        self.total_waiting_time = np.zeros((self.capacity, 4), dtype=np.float64)
+        self.vehicles_cleared = np.zeros((self.capacity, 4), dtype=np.int64)
+        self.phase = np.zeros(self.capacity, dtype=np.int8)
+        self.phase_timer = np.zeros(self.capacity, dtype=np.int64)
+        self.green_duration = np.zeros(self.capacity, dtype=np.int64)
+        self.clearance_rate = np.zeros(self.capacity, dtype=np.float64)
+        self.manual_control = np.zeros(self.capacity, dtype=bool)
+
+    def _grow(self):
+        """Doubles the backing arrays so that adding N intersections costs O(N) overall."""
+        old = {name: getattr(self, name) for name in (
+            'queue', 'arrivals', 'head', 'arrival_sum', 'total_waiting_time', 'vehicles_cleared',
+            'phase', 'phase_timer', 'green_duration', 'clearance_rate', 'manual_control')}
+        self._allocate(self.capacity * 2)
+        for name, array in old.items():
+            getattr(self, name)[:len(array)] = array
+
+    def _deepen(self, length: int):
+        """Grows the arrival rings (doubling) to hold `length` vehicles per lane, unrolling them so every head is 0."""
+        depth = self.depth
+        while depth < length:
+            depth *= 2
+        order = (self.head[:, :, None] + np.arange(self.depth)) % self.depth
+        arrivals = np.zeros((self.capacity, 4, depth), dtype=np.int32)
+        arrivals[:, :, :self.depth] = np.take_along_axis(self.arrivals, order, axis=2)
+        self.arrivals = arrivals
+        self.head[:] = 0
+        self.depth = depth
+
+    def push_vehicles(self, handle: int, lane: int, arrival_times):
+        """Appends vehicles (arrival times, oldest first) to the back of one lane's queue."""
+        count = len(arrival_times)
+        length = int(self.queue[handle, lane])
+        if length + count > self.depth:
+            self._deepen(length + count)
+        slots = (self.head[handle, lane] + length + np.arange(count)) % self.depth
+        self.arrivals[handle, lane, slots] = arrival_times
+        self.queue[handle, lane] += count
+        self.arrival_sum[handle, lane] += sum(arrival_times)
+
+    def add_intersection(self, intersection=None, intersection_id: str = None, green_duration: int = 10,
+                         clearance_rate: float = 0.5, manual_control: bool = False) -> IntersectionView:
+        """
+        Registers an intersection. Accepts either an existing Intersection (its configuration and
+        current queue lengths are copied) or the same keyword arguments Intersection takes.
+        """
+        if intersection is not None:
+            intersection_id = intersection.intersection_id
+            green_duration = intersection.green_duration
+            clearance_rate = intersection.clearance_rate
+            manual_control = intersection.manual_control
+        if intersection_id in self.index:
+            raise ValueError(f"Intersection {intersection_id} already registered")
+        if self.size == self.capacity:
+            self._grow()
+
+        handle = self.size
+        self.size += 1
+        self.green_duration[handle] = green_duration
+        self.clearance_rate[handle] = clearance_rate
+        self.manual_control[handle] = manual_control
+
+        view = IntersectionView(self, handle, intersection_id)
+        self.ids.append(intersection_id)
+        self.index[intersection_id] = handle
+        self.intersections.append(view)
+
+        if intersection is not None:
+            self.phase[handle] = intersection.current_phase_index
+            self.phase_timer[handle] = intersection.phase_timer
+            for lane, key in enumerate(LANES):
+                self.push_vehicles(handle, lane, intersection.approaches[key].queue)
+        return view
+
+    def reset_intersections(self, handles):
+        """Empties the queues of the given intersections and restarts them in NS_GREEN with zeroed statistics."""
+        handles = np.asarray(handles, dtype=np.intp)
+        for name in ('queue', 'head', 'arrival_sum', 'total_waiting_time', 'vehicles_cleared', 'phase', 'phase_timer'):
+            getattr(self, name)[handles] = 0
+
+    def get_handle(self, intersection_id: str) -> Optional[int]:
+        return self.index.get(intersection_id)
+
+    def get_intersection(self, intersection_id: str) -> Optional[IntersectionView]:
+        handle = self.index.get(intersection_id)
+        return self.intersections[handle] if handle is not None else None
+
+    def step(self):
+        self.current_time += 1
+        n = self.size
+        queue = self.queue[:n]
+        arrival_sum = self.arrival_sum[:n]
+        phase = self.phase[:n]
+        phase_timer = self.phase_timer[:n]
+
+        # Simulate Arrivals (Poisson), one draw per lane, appended to the back of the lane's ring
+        arrivals = self.rng.random((n, 4)) < self.arrival_rate
+        rows, lanes = np.nonzero(arrivals)
+        if len(rows):
+            lengths = queue[rows, lanes]
+            if lengths.max() >= self.depth:
+                self._deepen(int(lengths.max()) + 1)
+            self.arrivals[rows, lanes, (self.head[rows, lanes] + lengths) % self.depth] = self.current_time
+        queue += arrivals
+        arrival_sum += arrivals * self.current_time
+
+        # Timer-driven phase switches for intersections not under manual control
+        phase_timer += 1
+        expired = ~self.manual_control[:n] & (phase_timer >= self.green_duration[:n])
+        phase ^= expired.astype(np.int8)
+        phase_timer[expired] = 0
+
+        # Departures from non-empty green lanes: the oldest vehicle of the lane leaves
+        draws = self.rng.random((n, 4)) < self.clearance_rate[:n, None]
+        departs = GREEN_MASK[phase] & draws & (queue > 0)
+        rows, lanes = np.nonzero(departs)
+        if len(rows):
+            head = self.head[rows, lanes]
+            oldest = self.arrivals[rows, lanes, head]
+            self.total_waiting_time[rows, lanes] += self.current_time - oldest
+            arrival_sum[rows, lanes] -= oldest
+            self.head[rows, lanes] = (head + 1) % self.depth
+        self.vehicles_cleared[:n] += departs
+        queue -= departs
+
+        if self.logger:
+            self.logger.log_step(self.current_time, [self.get_intersection_state(i, self.current_time) for i in range(n)])
+
+    def run(self, steps: int):
+        for _ in range(steps):
+            self.step()
+        if self.logger:
+            self.logger.save_json()
+
+    def get_wait_percentile(self, handle: int, lane: int, current_time: int, percentile: float) -> float:
+        """Nearest-rank percentile of the current waits on one lane (see Lane.get_wait_percentile)."""
+        n = int(self.queue[handle, lane])
+        if not n:
+            return 0.0
+        rank = min(max(math.ceil(percentile / 100 * n), 1), n)
+        slot = (self.head[handle, lane] + n - rank) % self.depth
+        return float(current_time - self.arrivals[handle, lane, slot])
+
+    def get_intersection_state(self, handle: int, current_time: int = 0) -> Dict:
+        """Builds the same state dict as Intersection.get_state for one intersection."""
+        queues = self.queue[handle]
+        total_queue = int(queues.sum())
+        total_wait = total_queue * current_time - float(self.arrival_sum[handle].sum())
+        avg_wait = total_wait / total_queue if total_queue > 0 else 0.0
+        return {
+            'id': self.ids[handle],
+            'phase': PHASES[self.phase[handle]],
+            'phase_timer': int(self.phase_timer[handle]),
+            'queues': {key: int(queues[lane]) for lane, key in enumerate(LANES)},
+            'avg_waiting_time': avg_wait,
+            'total_waiting_time': total_wait,
+            'wait_percentiles': {
+                key: {'p50': self.get_wait_percentile(handle, lane, current_time, 50),
+                      'p95': self.get_wait_percentile(handle, lane, current_time, 95)}
+                for lane, key in enumerate(LANES)
+            },
+            'north_queue': int(queues[0]),
+            'south_queue': int(queues[2]),
+            'east_queue': int(queues[1]),
+            'west_queue': int(queues[3])
+        }
+
+    # --- Tool Wrappers for Agents ---
+    def get_traffic_status(self, intersection_id: str) -> Dict:
+        """Returns current queue lengths for all lanes."""
+        handle = self.index.get(intersection_id)
+        if handle is None:
+            return {"error": "Intersection not found"}
+        return self.intersections[handle].get_status()
+
+    def get_traffic_status_many(self, intersection_ids: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """Batch form of get_traffic_status. Returns {intersection_id: status}, all intersections by default."""
+        if intersection_ids is None:
+            return {view.intersection_id: view.get_status() for view in self.intersections}
+        return {i_id: self.get_traffic_status(i_id) for i_id in intersection_ids}
+
+    def fill_traffic_arrays(self, queues, phase, wait, current_time: Optional[int] = None):
+        """Array form of get_traffic_status_many; see TrafficSimulator.fill_traffic_arrays."""
+        if current_time is None:
+            current_time = self.current_time
+        n = self.size
+        queue = self.queue[:n]
+        queues[:] = queue
+        phase[:] = self.phase[:n]
+        wait[:] = 0.0
+        np.divide(queue * current_time - self.arrival_sum[:n], queue, out=wait, where=queue > 0)
+
+    def execute_signal_change(self, intersection_id: str, action: str) -> str:
+        """Executes a signal change. Action can be 'HOLD', 'SWITCH' or 'SWITCH_<NS|EW>'."""
+        handle = self.index.get(intersection_id)
+        if handle is not None:
+            intersection = self.intersections[handle]
+            if action == "SWITCH":
+                intersection.switch_light()
+                return f"Signal SWITCHED for {intersection_id}"
+            elif action == "HOLD":
+                return f"Signal HELD for {intersection_id}"
+            elif action.startswith("SWITCH_"):
+                direction = action.split("_")[1]
+                intersection.switch_light(direction)
+                return f"Signal SWITCHED to {direction} for {intersection_id}"
+        return "Intersection not found or Invalid Action"
+
+    def execute_signal_changes(self, actions: Dict[str, str]) -> Dict[str, str]:
+        """Batch form of execute_signal_change. Takes {intersection_id: action}, returns {intersection_id: result}."""
+        return {i_id: self.execute_signal_change(i_id, action) for i_id, action in actions.items()}
+
+    def execute_signal_switches(self, handles) -> int:
+        """Toggles the phase of every intersection in `handles` (integer handles, e.g. from decide_batch). Returns the count."""
+        handles = np.asarray(handles, dtype=np.intp)
+        self.phase[handles] ^= 1
+        self.phase_timer[handles] = 0
+        return len(handles)